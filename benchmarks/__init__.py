@@ -0,0 +1 @@
+"""Load generation and benchmarks for the pipeline, API and database hot paths."""
@@ -0,0 +1,136 @@
+"""In-process HTTP fake for the GitHub API with injectable latency and failures.
+
+The LLM side is ``orchestrator.fake_llm``, started in-process with ``FakeLLMServer``.
+"""
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+PR_ALIAS = re.compile(r"pr(\d+):")
+PULL_PATH = re.compile(r"^/repos/[^/]+/[^/]+/pulls/(\d+)$")
+COMMENT_PATH = re.compile(r"^/repos/[^/]+/[^/]+/issues/(\d+)/comments$")
+
+
+@dataclass
+class FakeGitHubConfig:
+    github_latency_ms: float = 30.0
+    github_failure_rate: float = 0.0
+    # Status checks a PR reports as pending before going green.
+    ci_pending_checks: int = 0
+    seed: Optional[int] = None
+
+
+class FakeGitHub:
+    """A threaded HTTP server answering the GitHub endpoints the pipeline uses."""
+
+    def __init__(self, config: FakeGitHubConfig) -> None:
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.ci_checks: Counter = Counter()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-github", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGitHub":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _chance(self, rate: float) -> bool:
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def _sleep(self, latency_ms: float) -> None:
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.requests[name] += 1
+
+    def _ci_green(self, pr_number: int) -> bool:
+        with self.lock:
+            self.ci_checks[pr_number] += 1
+            return self.ci_checks[pr_number] > self.config.ci_pending_checks
+
+    def _pr_node(self, pr_number: int) -> Dict[str, Any]:
+        green = self._ci_green(pr_number)
+        return {
+            "number": pr_number,
+            "headRefOid": f"{pr_number:040x}",
+            "mergeStateStatus": "CLEAN" if green else "BLOCKED",
+            "commits": {"nodes": [{"commit": {"statusCheckRollup": {"state": "SUCCESS" if green else "PENDING"}}}]},
+        }
+
+    def _github(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        self._sleep(self.config.github_latency_ms)
+        if self._chance(self.config.github_failure_rate):
+            return 502, {"message": "synthetic GitHub failure"}
+        if method == "POST" and path == "/graphql":
+            numbers = [int(n) for n in PR_ALIAS.findall(body.get("query", ""))]
+            return 200, {"data": {"repository": {f"pr{n}": self._pr_node(n) for n in numbers}}}
+        match = PULL_PATH.match(path)
+        if method == "GET" and match:
+            pr_number = int(match.group(1))
+            green = self._ci_green(pr_number)
+            return 200, {"number": pr_number, "mergeable_state": "clean" if green else "blocked"}
+        match = COMMENT_PATH.match(path)
+        if method == "POST" and match:
+            return 201, {"id": self.random.randint(1, 10**9), "body": body.get("body", "")}
+        if method == "POST" and path.endswith("/git/refs"):
+            return 201, {"ref": body.get("ref")}
+        return 404, {"message": "Not Found"}
+
+    def _handler_class(self):
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return None
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length)) if length else {}
+
+            def _send(self, status: int, payload: Any) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-RateLimit-Limit", "5000")
+                self.send_header("X-RateLimit-Remaining", "4999")
+                self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:  # noqa: N802
+                github._count(f"github GET {PULL_PATH.sub('/pulls/N', self.path)}")
+                self._send(*github._github("GET", self.path, {}))
+
+            def do_POST(self) -> None:  # noqa: N802
+                body = self._body()
+                github._count(f"github POST {COMMENT_PATH.sub('/issues/N/comments', self.path)}")
+                self._send(*github._github("POST", self.path, body))
+
+        return Handler
+
+
+__all__ = ["FakeGitHubConfig", "FakeGitHub"]
@@ -0,0 +1,6 @@
+-- Run claiming for multiple workers
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(128);
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS ix_runs_pending_queue ON runs (status, created_at) WHERE status = 'PENDING';
+CREATE INDEX IF NOT EXISTS ix_runs_running_claimed_at ON runs (claimed_at) WHERE status = 'RUNNING';
@@ -0,0 +1,9 @@
+-- WAITING run status for runs parked until an external event (e.g. human approval)
+DO $$
+BEGIN
+    -- Only needed where the schema was created from the ORM with a native enum type.
+    IF EXISTS (SELECT 1 FROM pg_type WHERE typname = 'runstatus') THEN
+        ALTER TYPE runstatus ADD VALUE IF NOT EXISTS 'WAITING';
+    END IF;
+END
+$$;
@@ -0,0 +1,2 @@
+-- Deferred runs: claimers skip a pending run until not_before has passed
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS not_before TIMESTAMP;
@@ -0,0 +1,12 @@
+-- PR status recorded from GitHub webhooks, and the task <-> PR link used to wake CI_WAIT runs
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS pr_number INTEGER;
+CREATE INDEX IF NOT EXISTS ix_tasks_pr_number ON tasks (pr_number);
+
+CREATE TABLE IF NOT EXISTS pull_request_statuses (
+    pr_number INTEGER PRIMARY KEY,
+    head_sha VARCHAR(64),
+    mergeable_state VARCHAR(32),
+    checks_status VARCHAR(32),
+    checks_conclusion VARCHAR(32),
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
@@ -0,0 +1,3 @@
+-- Indexes for incremental, per-kind artifact lookups when building stage context
+CREATE INDEX IF NOT EXISTS ix_artifacts_task_id_id ON artifacts (task_id, id);
+CREATE INDEX IF NOT EXISTS ix_artifacts_task_id_kind ON artifacts (task_id, kind);
@@ -0,0 +1,5 @@
+-- Artifact payloads move to the content-addressed blob store; rows keep hash, size and a summary
+ALTER TABLE artifacts ALTER COLUMN data DROP NOT NULL;
+ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS blob_sha256 VARCHAR(64);
+ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS size INTEGER;
+ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS summary JSONB;
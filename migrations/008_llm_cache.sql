@@ -0,0 +1,12 @@
+-- Durable tier of the LLM response cache
+CREATE TABLE IF NOT EXISTS llm_cache_entries (
+    key VARCHAR(64) PRIMARY KEY,
+    role VARCHAR(64) NOT NULL,
+    response JSONB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_llm_cache_entries_created_at ON llm_cache_entries (created_at);
+CREATE INDEX IF NOT EXISTS ix_llm_cache_entries_expires_at ON llm_cache_entries (expires_at);
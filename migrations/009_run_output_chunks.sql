@@ -0,0 +1,10 @@
+-- Incrementally persisted output of streaming LLM runs
+CREATE TABLE IF NOT EXISTS run_output_chunks (
+    id SERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_run_output_chunks_run_id_seq ON run_output_chunks (run_id, seq);
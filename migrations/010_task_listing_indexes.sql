@@ -0,0 +1,4 @@
+-- Indexes for the paginated task, run and decision listings
+CREATE INDEX IF NOT EXISTS ix_tasks_status_id ON tasks (status, id);
+CREATE INDEX IF NOT EXISTS ix_runs_task_id_id ON runs (task_id, id);
+CREATE INDEX IF NOT EXISTS ix_decisions_task_id ON decisions (task_id);
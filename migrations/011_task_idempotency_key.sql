@@ -0,0 +1,3 @@
+-- Client idempotency keys so retried bulk imports resolve to the tasks they already created
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(255);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_tasks_idempotency_key ON tasks (idempotency_key);
@@ -0,0 +1,2 @@
+-- Per-task version, bumped on every committed change, used as the ETag for task reads
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
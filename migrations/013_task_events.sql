@@ -0,0 +1,13 @@
+-- Per-task log of pipeline transitions served by GET /tasks/{id}/events
+CREATE TABLE IF NOT EXISTS task_events (
+    id SERIAL PRIMARY KEY,
+    task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    run_id INTEGER REFERENCES runs(id) ON DELETE CASCADE,
+    kind VARCHAR(32) NOT NULL,
+    stage VARCHAR(32),
+    status VARCHAR(32),
+    data JSON,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_task_events_task_id_id ON task_events (task_id, id);
@@ -0,0 +1,5 @@
+-- Trace id of the task a run belongs to, so spans from every worker join into one trace
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS trace_id VARCHAR(32);
+UPDATE runs
+SET trace_id = substr(encode(sha256(convert_to('orchestrator-task-' || task_id, 'UTF8')), 'hex'), 1, 32)
+WHERE trace_id IS NULL AND status IN ('PENDING', 'RUNNING', 'WAITING');
@@ -0,0 +1,7 @@
+-- Indexes for the remaining hot lookups: per-task stage/status checks, deferred-run wakeups,
+-- active-run counts and the run_id foreign keys hit when runs are deleted
+CREATE INDEX IF NOT EXISTS ix_runs_task_id_stage_status ON runs (task_id, stage, status);
+CREATE INDEX IF NOT EXISTS ix_runs_pending_not_before ON runs (not_before) WHERE status = 'PENDING' AND not_before IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_runs_active_stage_status ON runs (stage, status) WHERE status IN ('PENDING', 'RUNNING', 'WAITING');
+CREATE INDEX IF NOT EXISTS ix_artifacts_run_id ON artifacts (run_id);
+CREATE INDEX IF NOT EXISTS ix_task_events_run_id ON task_events (run_id);
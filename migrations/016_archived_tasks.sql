@@ -0,0 +1,15 @@
+-- Cold storage for finished tasks moved out of tasks/runs/artifacts/decisions by orchestrator.archive
+CREATE TABLE IF NOT EXISTS archived_tasks (
+    task_id INTEGER PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    status VARCHAR(32) NOT NULL,
+    version INTEGER NOT NULL,
+    finished_at TIMESTAMP NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT now(),
+    codec VARCHAR(8) NOT NULL,
+    size INTEGER NOT NULL,
+    document BYTEA NOT NULL
+);
+
+-- Finds archivable tasks without scanning the ones still in flight
+CREATE INDEX IF NOT EXISTS ix_tasks_finished_updated_at ON tasks (updated_at) WHERE status IN ('DONE', 'FAILED');
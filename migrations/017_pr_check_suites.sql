@@ -0,0 +1,2 @@
+-- Per-suite check state, so one fast suite cannot mark a PR green while others are pending or failed
+ALTER TABLE pull_request_statuses ADD COLUMN IF NOT EXISTS check_suites JSONB;
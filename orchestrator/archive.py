@@ -0,0 +1,153 @@
+"""Moves long-finished tasks out of the hot tables into compressed archive documents."""
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, selectinload
+
+from orchestrator import context
+from orchestrator.blobstore import compress, decompress
+from orchestrator.config import get_settings
+from orchestrator.db import session_scope
+from orchestrator.models import (
+    ArchivedTask,
+    Artifact,
+    Decision,
+    Run,
+    RunOutputChunk,
+    Task,
+    TaskEvent,
+    TaskStatus,
+)
+from orchestrator.schemas import ArtifactOut, DecisionOut, RunOut, TaskEventOut, TaskSummaryOut
+from orchestrator.util import logger
+
+settings = get_settings()
+
+FINISHED_STATUSES = (TaskStatus.DONE, TaskStatus.FAILED)
+
+
+def _document(task: Task, events: List[TaskEvent]) -> Dict[str, Any]:
+    artifacts = []
+    for artifact in sorted(task.artifacts, key=lambda a: a.id):
+        out = ArtifactOut.from_orm(artifact).dict()
+        # Blob-backed payloads stay in the (content-addressed) blob store; only legacy inline data moves.
+        out["data"] = artifact.data
+        out["run_id"] = artifact.run_id
+        artifacts.append(out)
+    return jsonable_encoder(
+        {
+            "task": TaskSummaryOut.from_orm(task),
+            "runs": [RunOut.from_orm(run) for run in sorted(task.runs, key=lambda r: r.id)],
+            "artifacts": artifacts,
+            "decisions": [DecisionOut.from_orm(d) for d in sorted(task.decisions, key=lambda d: d.id)],
+            "events": [TaskEventOut.from_orm(e) for e in events],
+        }
+    )
+
+
+def archive_batch(session: Session, finished_before: datetime, limit: int) -> List[int]:
+    """Archive up to ``limit`` tasks that finished before ``finished_before``; returns their ids.
+
+    Candidate rows are locked with SKIP LOCKED, so concurrent archivers take disjoint batches and
+    never wait on a task a worker or the API is still touching.
+    """
+    stmt = (
+        select(Task)
+        .where(Task.status.in_(FINISHED_STATUSES), Task.updated_at < finished_before)
+        .order_by(Task.updated_at.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=Task)
+        .options(selectinload(Task.runs), selectinload(Task.artifacts), selectinload(Task.decisions))
+    )
+    tasks = list(session.scalars(stmt))
+    if not tasks:
+        return []
+    task_ids = [task.id for task in tasks]
+    events: Dict[int, List[TaskEvent]] = {}
+    for event in session.scalars(select(TaskEvent).where(TaskEvent.task_id.in_(task_ids)).order_by(TaskEvent.id)):
+        events.setdefault(event.task_id, []).append(event)
+
+    now = datetime.utcnow()
+    archived = []
+    for task in tasks:
+        raw = json.dumps(_document(task, events.get(task.id, [])), separators=(",", ":")).encode()
+        archived.append(
+            {
+                "task_id": task.id,
+                "title": task.title,
+                "status": task.status.value,
+                "version": task.version,
+                "finished_at": task.updated_at,
+                "archived_at": now,
+                "codec": settings.archive_compression,
+                "size": len(raw),
+                "document": compress(settings.archive_compression, raw),
+            }
+        )
+    # Nothing below goes through the unit of work, so version tracking and cascades stay out of it.
+    session.expunge_all()
+    session.execute(ArchivedTask.__table__.insert(), archived)
+    run_ids = select(Run.id).where(Run.task_id.in_(task_ids))
+    for stmt in (
+        delete(RunOutputChunk).where(RunOutputChunk.run_id.in_(run_ids)),
+        delete(TaskEvent).where(TaskEvent.task_id.in_(task_ids)),
+        delete(Artifact).where(Artifact.task_id.in_(task_ids)),
+        delete(Decision).where(Decision.task_id.in_(task_ids)),
+        delete(Run).where(Run.task_id.in_(task_ids)),
+        delete(Task).where(Task.id.in_(task_ids)),
+    ):
+        session.execute(stmt.execution_options(synchronize_session=False))
+    for task_id in task_ids:
+        context.invalidate(task_id)
+    return task_ids
+
+
+def archive_finished(
+    older_than_days: Optional[int] = None, batch_size: Optional[int] = None, max_batches: Optional[int] = None
+) -> int:
+    """Archive finished tasks in short transactions of ``batch_size`` tasks each; returns how many moved."""
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    size = batch_size or settings.archive_batch_size
+    batches = settings.archive_max_batches if max_batches is None else max_batches
+    finished_before = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    for _ in range(batches):
+        with session_scope() as session:
+            moved = archive_batch(session, finished_before, size)
+        total += len(moved)
+        if len(moved) < size:
+            break
+    if total:
+        logger.info("Archived %s tasks finished before %s", total, finished_before.isoformat())
+    return total
+
+
+def load_archived(session: Session, task_id: int) -> Optional[ArchivedTask]:
+    return session.get(ArchivedTask, task_id)
+
+
+def archived_document(archived: ArchivedTask) -> Dict[str, Any]:
+    return json.loads(decompress(archived.codec, archived.document))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Archive finished tasks.")
+    parser.add_argument("--days", type=int, help="Archive tasks finished more than this many days ago.")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--max-batches", type=int, default=10**9, help="Defaults to running until nothing is left.")
+    args = parser.parse_args(argv)
+    moved = archive_finished(args.days, args.batch_size, args.max_batches)
+    print(f"Archived {moved} task(s)")
+
+
+__all__ = ["archive_batch", "archive_finished", "load_archived", "archived_document"]
+
+
+if __name__ == "__main__":
+    main()
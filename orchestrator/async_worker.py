@@ -0,0 +1,197 @@
+"""Asyncio worker runtime that keeps many runs in flight per process."""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+from orchestrator import llm, profiling, tracing
+from orchestrator.config import get_settings
+from orchestrator.db import session_scope
+from orchestrator.github_client import AsyncGitHubClient
+from orchestrator.models import Run, RunStatus, Stage, Task
+from orchestrator.notify import RUNS_CHANNEL, get_notifier
+from orchestrator.streaming import RunOutputWriter, streams_output
+from orchestrator.util import logger
+from orchestrator.worker import (
+    MERGE_COMMENT,
+    Handler,
+    apply_llm_result,
+    archive_if_due,
+    claim_runs,
+    complete_merge,
+    ensure_partitions_if_due,
+    heartbeat,
+    idle_wait_seconds,
+    is_llm_stage,
+    llm_request_for,
+    pr_number_for,
+    process_claimed_run,
+    release_stale_claims_if_due,
+    sweep_ci_if_due,
+)
+
+settings = get_settings()
+
+# (kind, value) describing the I/O a run needs before it can be completed.
+Prepared = Tuple[str, Any]
+# (run_id, trace_id, stage) of a freshly claimed run.
+Claimed = Tuple[int, Optional[str], Stage]
+
+
+def _claim(limit: int) -> Tuple[List[Claimed], float]:
+    with session_scope() as session:
+        claimed = [(run.id, run.trace_id, run.stage) for run in claim_runs(session, limit)]
+        timeout = settings.worker_poll_interval_seconds
+        if not claimed:
+            timeout = idle_wait_seconds(session)
+        return claimed, timeout
+
+
+def _prepare(run_id: int, stage: Optional[Stage] = None) -> Optional[Prepared]:
+    """Read what an I/O-bound stage needs in a short session; None means run it synchronously."""
+    # Building the request is where LLM stages spend their CPU, so it joins the stage's profile.
+    with profiling.profile(stage.value, count=False) if stage else nullcontext(), session_scope() as session:
+        run = session.get(Run, run_id)
+        if not run or run.status != RunStatus.RUNNING or run.claimed_by != settings.worker_id:
+            return ("skip", None)
+        task = session.get(Task, run.task_id)
+        if not task:
+            return ("skip", None)
+        if is_llm_stage(run.stage):
+            return ("stream" if streams_output(run.stage) else "llm", llm_request_for(session, task, run))
+        if run.stage == Stage.MERGE:
+            return ("merge", pr_number_for(task))
+        return None
+
+
+async def _stream_llm(run_id: int, role: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Stream a model call, committing output increments in short sessions off the event loop."""
+    writer = RunOutputWriter(run_id)
+
+    async def on_chunk(chunk: str) -> None:
+        if writer.append(chunk):
+            await asyncio.to_thread(writer.flush)
+
+    try:
+        return await llm.astream_call(role, payload, on_chunk)
+    finally:
+        await asyncio.to_thread(writer.close)
+
+
+def _raising(exc: BaseException) -> Handler:
+    def handler(session, task, run) -> None:
+        raise exc
+
+    return handler
+
+
+async def process_run_async(
+    run_id: int, github: AsyncGitHubClient, trace_id: Optional[str] = None, stage: Optional[Stage] = None
+) -> None:
+    # asyncio.to_thread copies the context, so process_run's spans nest under this one.
+    name = f"run.{stage.value}" if stage else "run"
+    with heartbeat.track([run_id]), tracing.start_trace(
+        trace_id, name, run_id=run_id, stage=stage.value if stage else None
+    ):
+        if stage is None:
+            await _process_run_async(run_id, github)
+            return
+        # One sampling decision covers _prepare and process_run's profile, like a single sync handler.
+        with profiling.sampled(stage.value):
+            await _process_run_async(run_id, github, stage)
+
+
+async def _process_run_async(run_id: int, github: AsyncGitHubClient, stage: Optional[Stage] = None) -> None:
+    try:
+        prepared = await asyncio.to_thread(_prepare, run_id, stage)
+    except Exception as exc:  # noqa: BLE001
+        # A run whose request cannot be built must still fail and retry; left RUNNING it would only
+        # be released by release_stale_claims and claimed again without counting an attempt.
+        await asyncio.to_thread(process_claimed_run, run_id, _raising(exc))
+        return
+    if prepared is None:
+        await asyncio.to_thread(process_claimed_run, run_id)
+        return
+    kind, value = prepared
+    if kind == "skip":
+        return
+    handler: Handler
+    try:
+        if kind in ("llm", "stream"):
+            role, payload = value
+            if kind == "stream":
+                result: Dict[str, Any] = await _stream_llm(run_id, role, payload)
+            else:
+                result = await llm.acall(role, payload)
+            handler = lambda s, t, r: apply_llm_result(s, t, r, result)  # noqa: E731
+        else:
+            pr_number = value
+            if pr_number:
+                await github.comment_pull_request(pr_number, MERGE_COMMENT)
+            handler = lambda s, t, r: complete_merge(s, t, r, pr_number)  # noqa: E731
+    except Exception as exc:  # noqa: BLE001
+        # Let process_run record the failure and schedule a retry exactly as the sync path does.
+        handler = _raising(exc)
+    await asyncio.to_thread(process_claimed_run, run_id, handler)
+
+
+async def _listen(subscription, wake: asyncio.Event, executor: ThreadPoolExecutor) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await loop.run_in_executor(executor, subscription.wait, settings.worker_poll_interval_seconds)
+        wake.set()
+
+
+async def run_async_worker(concurrency: int) -> None:
+    logger.info("Starting async worker %s with concurrency %s", settings.worker_id, concurrency)
+    loop = asyncio.get_running_loop()
+    # Database work runs on a bounded pool so at most worker_db_threads sessions are open at once,
+    # however many runs are awaiting the LLM or GitHub.
+    loop.set_default_executor(ThreadPoolExecutor(settings.worker_db_threads, thread_name_prefix="db"))
+    listen_executor = ThreadPoolExecutor(1, thread_name_prefix="listen")
+    subscription = await loop.run_in_executor(listen_executor, get_notifier().subscribe, RUNS_CHANNEL)
+    github = AsyncGitHubClient(max_connections=concurrency)
+    wake = asyncio.Event()
+    heartbeat.start()
+    listener = asyncio.create_task(_listen(subscription, wake, listen_executor))
+    inflight: set[asyncio.Task] = set()
+
+    def _done(fut: asyncio.Task) -> None:
+        inflight.discard(fut)
+        if not fut.cancelled() and fut.exception():
+            logger.error("Async run failed outside its handler", exc_info=fut.exception())
+        wake.set()
+
+    try:
+        while True:
+            wake.clear()
+            await asyncio.to_thread(sweep_ci_if_due)
+            await asyncio.to_thread(archive_if_due)
+            await asyncio.to_thread(ensure_partitions_if_due)
+            await asyncio.to_thread(release_stale_claims_if_due)
+            free = concurrency - len(inflight)
+            claimed: List[Claimed] = []
+            timeout = settings.worker_poll_interval_seconds
+            if free > 0:
+                claimed, timeout = await asyncio.to_thread(_claim, free)
+            for run_id, trace_id, stage in claimed:
+                fut = asyncio.create_task(process_run_async(run_id, github, trace_id, stage))
+                inflight.add(fut)
+                fut.add_done_callback(_done)
+            if len(claimed) < free or free <= 0:
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        listener.cancel()
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+        await github.aclose()
+        subscription.close()
+        listen_executor.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["run_async_worker", "process_run_async"]
@@ -0,0 +1,167 @@
+"""Content-addressed blob storage for artifact payloads."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from orchestrator.config import get_settings
+from orchestrator.util import canonical_json
+
+try:  # optional, better ratio and speed than zlib when installed
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+SUMMARY_MAX_FIELDS = 20
+SUMMARY_MAX_STRING = 200
+
+
+def compress(codec: str, raw: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(raw, 6)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(raw)
+    return raw
+
+
+def decompress(codec: str, stored: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(stored)
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(stored)
+    return stored
+
+
+class BlobStore(ABC):
+    """Stores immutable payloads under the SHA-256 of their uncompressed bytes."""
+
+    @abstractmethod
+    def put(self, raw: bytes) -> str:
+        """Store ``raw`` (if not already present) and return its hex digest."""
+
+    @abstractmethod
+    def get(self, digest: str) -> bytes:
+        """Return the uncompressed bytes stored under ``digest``."""
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool:
+        ...
+
+
+class LocalBlobStore(BlobStore):
+    """Filesystem backend: ``<root>/<digest[:2]>/<digest>.<codec>``."""
+
+    CODECS = ("zstd", "zlib", "raw")
+
+    def __init__(self, root: str, compression: str = "zlib") -> None:
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("BLOB_STORE_COMPRESSION=zstd requires the zstandard package")
+        if compression not in self.CODECS:
+            raise ValueError(f"Unknown blob compression {compression!r}")
+        self.root = Path(root)
+        self.compression = compression
+
+    def _path(self, digest: str, codec: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.{codec}"
+
+    def _find(self, digest: str) -> Tuple[Path, str] | None:
+        for codec in self.CODECS:
+            path = self._path(digest, codec)
+            if path.exists():
+                return path, codec
+        return None
+
+    def exists(self, digest: str) -> bool:
+        return self._find(digest) is not None
+
+    def put(self, raw: bytes) -> str:
+        digest = hashlib.sha256(raw).hexdigest()
+        if self.exists(digest):
+            return digest
+        path = self._path(digest, self.compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent writers of the same digest never expose a partial file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(compress(self.compression, raw))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        found = self._find(digest)
+        if found is None:
+            raise KeyError(f"Blob {digest} not found")
+        path, codec = found
+        return decompress(codec, path.read_bytes())
+
+
+BACKENDS: Dict[str, Callable[..., BlobStore]] = {
+    "local": lambda settings: LocalBlobStore(settings.blob_store_path, settings.blob_store_compression),
+}
+
+
+def register_backend(name: str, factory: Callable[..., BlobStore]) -> None:
+    """Register a backend (e.g. S3) constructed from Settings when BLOB_STORE_BACKEND=name."""
+    BACKENDS[name] = factory
+    get_blob_store.cache_clear()
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    settings = get_settings()
+    try:
+        factory = BACKENDS[settings.blob_store_backend]
+    except KeyError:
+        raise RuntimeError(f"Unknown blob store backend {settings.blob_store_backend!r}") from None
+    return factory(settings)
+
+
+def store_payload(data: Any) -> Tuple[str, int]:
+    # Canonical JSON so identical payloads hash (and deduplicate) identically.
+    raw = canonical_json(data)
+    return get_blob_store().put(raw), len(raw)
+
+
+def load_payload(digest: str) -> Any:
+    return json.loads(get_blob_store().get(digest))
+
+
+def summarize(data: Any) -> Dict[str, Any]:
+    """Small, row-sized view of a payload: its top-level scalar fields and key names."""
+    if not isinstance(data, dict):
+        return {}
+    summary: Dict[str, Any] = {}
+    for key, value in data.items():
+        if len(summary) >= SUMMARY_MAX_FIELDS:
+            break
+        if isinstance(value, str):
+            summary[key] = value[:SUMMARY_MAX_STRING]
+        elif value is None or isinstance(value, (bool, int, float)):
+            summary[key] = value
+    summary["_keys"] = list(data.keys())[:50]
+    return summary
+
+
+__all__ = [
+    "BlobStore",
+    "LocalBlobStore",
+    "register_backend",
+    "get_blob_store",
+    "store_payload",
+    "load_payload",
+    "summarize",
+    "compress",
+    "decompress",
+]
@@ -1,18 +1,93 @@
-"""CI wait helper."""
-import time
+"""CI wait helpers: status checks, bulk status sweeps and re-check scheduling."""
+import random
+from datetime import datetime, timedelta
+from typing import List
 
-from orchestrator.github_client import GitHubClient
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import Session
+
+from orchestrator.config import get_settings
+from orchestrator.github_client import get_github_client
+from orchestrator.models import PullRequestStatus, Run, RunStatus, Stage, Task
 from orchestrator.util import logger
+from orchestrator.webhooks import FAILED_CONCLUSIONS, GREEN_CONCLUSIONS, record_pr_state, wake_ci_waits
+
+CI_GREEN = "green"
+CI_FAILED = "failed"
+CI_PENDING = "pending"
+
+# Arbitrary constant identifying the sweep's Postgres advisory lock.
+CI_SWEEP_LOCK_KEY = 0x43495357
+
+GREEN_MERGEABLE_STATES = {"clean", "has_hooks"}
+
+
+def checks_green(pr_number: int) -> bool:
+    green = get_github_client().check_pr_status(pr_number)
+    logger.info("PR %s checks are %s", pr_number, "green" if green else "not green yet")
+    return green
+
+
+def recorded_state(status: PullRequestStatus) -> str:
+    """Failed if any check suite failed; green once all suites passed or GitHub reports the PR mergeable."""
+    if status.checks_conclusion in FAILED_CONCLUSIONS:
+        return CI_FAILED
+    if status.checks_conclusion in GREEN_CONCLUSIONS or status.mergeable_state in GREEN_MERGEABLE_STATES:
+        return CI_GREEN
+    return CI_PENDING
+
+
+def ci_state(session: Session, pr_number: int) -> str:
+    """CI state from recent webhook data, polling GitHub only when none has arrived."""
+    settings = get_settings()
+    status = session.get(PullRequestStatus, pr_number)
+    fresh_after = datetime.utcnow() - timedelta(seconds=settings.ci_webhook_stale_seconds)
+    if status and status.updated_at >= fresh_after:
+        return recorded_state(status)
+    if settings.ci_sweep_interval_seconds > 0:
+        # The next sweep fetches this PR along with every other waiting one and wakes the run.
+        return CI_PENDING
+    return CI_GREEN if checks_green(pr_number) else CI_PENDING
+
+
+def next_check_delay(checks_done: int) -> float:
+    """Exponential backoff between re-checks, jittered so waiting runs do not poll in lockstep."""
+    settings = get_settings()
+    delay = min(settings.ci_poll_initial_seconds * (2 ** checks_done), settings.ci_poll_max_seconds)
+    return delay * random.uniform(0.8, 1.2)
+
 
+def sweep_ci_waits(session: Session) -> List[int]:
+    """Refresh every waiting PR whose status is older than one sweep interval in one GraphQL call.
 
-def wait_for_checks(pr_number: int, timeout_seconds: int = 600, poll_seconds: int = 15) -> bool:
-    client = GitHubClient()
-    start = time.time()
-    while time.time() - start < timeout_seconds:
-        if client.check_pr_status(pr_number):
-            logger.info("PR %s checks are green", pr_number)
-            return True
-        logger.info("Waiting for checks on PR %s...", pr_number)
-        time.sleep(poll_seconds)
-    logger.error("Timeout waiting for checks on PR %s", pr_number)
-    return False
+    Returns the PR numbers whose checks settled; their CI_WAIT runs are woken.
+    """
+    settings = get_settings()
+    if session.get_bind().dialect.name == "postgresql":
+        # One sweeper at a time across workers; the others skip rather than queue up.
+        if not session.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": CI_SWEEP_LOCK_KEY}):
+            return []
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.ci_sweep_interval_seconds)
+    stmt = (
+        select(Task.pr_number)
+        .join(Run, Run.task_id == Task.id)
+        .outerjoin(PullRequestStatus, PullRequestStatus.pr_number == Task.pr_number)
+        .where(
+            Run.stage == Stage.CI_WAIT,
+            Run.status == RunStatus.PENDING,
+            Task.pr_number.is_not(None),
+            or_(PullRequestStatus.pr_number.is_(None), PullRequestStatus.updated_at < stale_before),
+        )
+        .distinct()
+    )
+    pr_numbers = sorted(session.scalars(stmt))
+    if not pr_numbers:
+        return []
+    statuses = get_github_client().bulk_pr_status(pr_numbers)
+    settled = []
+    for pr_number, state in statuses.items():
+        if recorded_state(record_pr_state(session, pr_number, state)) != CI_PENDING:
+            settled.append(pr_number)
+    wake_ci_waits(session, settled)
+    logger.info("CI sweep checked %s PRs; %s settled", len(pr_numbers), len(settled))
+    return settled
@@ -1,17 +1,98 @@
 """Configuration settings for the WMS orchestrator."""
+import os
+import socket
 from functools import lru_cache
 from pydantic import BaseSettings, Field
 
 
 class Settings(BaseSettings):
     database_url: str = Field("postgresql+psycopg2://wms:wms@db:5432/wms", env="DATABASE_URL")
+    # Derived from DATABASE_URL (asyncpg / aiosqlite) when unset.
+    async_database_url: str | None = Field(default=None, env="ASYNC_DATABASE_URL")
+    db_pool_size: int = Field(default=10, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, env="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: int = Field(default=30, env="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=1800, env="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(default=True, env="DB_POOL_PRE_PING")
     github_token: str | None = Field(default=None, env="GITHUB_TOKEN")
     github_repo: str | None = Field(default=None, env="GITHUB_REPO")
+    github_api_url: str = Field(default="https://api.github.com", env="GITHUB_API_URL")
+    github_pool_size: int = Field(default=20, env="GITHUB_POOL_SIZE")
+    github_max_retries: int = Field(default=4, env="GITHUB_MAX_RETRIES")
+    github_backoff_base_seconds: float = Field(default=0.5, env="GITHUB_BACKOFF_BASE_SECONDS")
+    github_etag_cache_size: int = Field(default=1024, env="GITHUB_ETAG_CACHE_SIZE")
+    github_graphql_batch_size: int = Field(default=50, env="GITHUB_GRAPHQL_BATCH_SIZE")
+    github_webhook_secret: str | None = Field(default=None, env="GITHUB_WEBHOOK_SECRET")
     llm_endpoint: str | None = Field(default=None, env="LLM_ENDPOINT")
-    worker_poll_interval_seconds: int = Field(default=5, env="WORKER_POLL_INTERVAL_SECONDS")
+    llm_timeout_seconds: int = Field(default=120, env="LLM_TIMEOUT_SECONDS")
+    llm_batch_max_size: int = Field(default=8, env="LLM_BATCH_MAX_SIZE")
+    llm_batch_max_wait_ms: int = Field(default=20, env="LLM_BATCH_MAX_WAIT_MS")
+    # Comma-separated stages whose LLM output is streamed and persisted incrementally.
+    llm_stream_stages: str = Field(default="BACKEND,DOCS", env="LLM_STREAM_STAGES")
+    llm_stream_flush_bytes: int = Field(default=4096, env="LLM_STREAM_FLUSH_BYTES")
+    stream_poll_seconds: float = Field(default=0.5, env="STREAM_POLL_SECONDS")
+    llm_cache_enabled: bool = Field(default=True, env="LLM_CACHE_ENABLED")
+    llm_cache_ttl_seconds: int = Field(default=86400, env="LLM_CACHE_TTL_SECONDS")
+    llm_cache_memory_size: int = Field(default=512, env="LLM_CACHE_MEMORY_SIZE")
+    llm_cache_max_entries: int = Field(default=10000, env="LLM_CACHE_MAX_ENTRIES")
+    # Comma-separated roles whose output must always be fresh, e.g. "Product,Docs".
+    llm_cache_disabled_roles: str = Field(default="", env="LLM_CACHE_DISABLED_ROLES")
+    worker_poll_interval_seconds: int = Field(default=30, env="WORKER_POLL_INTERVAL_SECONDS")
+    worker_id: str = Field(default_factory=lambda: f"{socket.gethostname()}-{os.getpid()}", env="WORKER_ID")
+    worker_claim_batch_size: int = Field(default=1, env="WORKER_CLAIM_BATCH_SIZE")
+    worker_claim_timeout_seconds: int = Field(default=900, env="WORKER_CLAIM_TIMEOUT_SECONDS")
+    worker_concurrency: int = Field(default=1, env="WORKER_CONCURRENCY")
+    worker_db_threads: int = Field(default=8, env="WORKER_DB_THREADS")
+    ci_poll_initial_seconds: int = Field(default=15, env="CI_POLL_INITIAL_SECONDS")
+    ci_poll_max_seconds: int = Field(default=120, env="CI_POLL_MAX_SECONDS")
+    ci_timeout_seconds: int = Field(default=600, env="CI_TIMEOUT_SECONDS")
+    # Seconds between bulk PR status sweeps for all CI_WAIT runs; 0 polls each PR individually instead.
+    ci_sweep_interval_seconds: int = Field(default=30, env="CI_SWEEP_INTERVAL_SECONDS")
+    ci_webhook_stale_seconds: int = Field(default=300, env="CI_WEBHOOK_STALE_SECONDS")
+    blob_store_backend: str = Field(default="local", env="BLOB_STORE_BACKEND")
+    blob_store_path: str = Field(default="data/blobs", env="BLOB_STORE_PATH")
+    blob_store_compression: str = Field(default="zlib", env="BLOB_STORE_COMPRESSION")
+    context_cache_size: int = Field(default=1024, env="CONTEXT_CACHE_SIZE")
+    events_poll_seconds: float = Field(default=2.0, env="EVENTS_POLL_SECONDS")
+    events_heartbeat_seconds: float = Field(default=15.0, env="EVENTS_HEARTBEAT_SECONDS")
+    events_long_poll_max_seconds: float = Field(default=60.0, env="EVENTS_LONG_POLL_MAX_SECONDS")
+    task_response_cache_size: int = Field(default=1024, env="TASK_RESPONSE_CACHE_SIZE")
+    task_batch_chunk_size: int = Field(default=500, env="TASK_BATCH_CHUNK_SIZE")
     max_attempts: int = Field(default=3, env="MAX_ATTEMPTS")
     api_host: str = Field(default="0.0.0.0", env="API_HOST")
     api_port: int = Field(default=8000, env="API_PORT")
+    # Bearer token required by the /admin endpoints; while unset they answer 503.
+    admin_token: str | None = Field(default=None, env="ADMIN_TOKEN")
+    # Fraction of tasks traced (decided per task); 0 turns tracing off.
+    tracing_sample_rate: float = Field(default=0.0, env="TRACING_SAMPLE_RATE")
+    tracing_exporter: str = Field(default="jsonl", env="TRACING_EXPORTER")
+    tracing_dir: str = Field(default="data/traces", env="TRACING_DIR")
+    tracing_file_max_bytes: int = Field(default=10_000_000, env="TRACING_FILE_MAX_BYTES")
+    tracing_file_backups: int = Field(default=3, env="TRACING_FILE_BACKUPS")
+    tracing_otlp_endpoint: str | None = Field(default=None, env="TRACING_OTLP_ENDPOINT")
+    # Apply pending migrations (orchestrator.migrate) when the API starts.
+    db_migrate_on_startup: bool = Field(default=True, env="DB_MIGRATE_ON_STARTUP")
+    # Comma-separated subset of "runs,artifacts" to range-partition by month on created_at (Postgres only).
+    db_partitioned_tables: str = Field(default="", env="DB_PARTITIONED_TABLES")
+    db_partition_months_ahead: int = Field(default=3, env="DB_PARTITION_MONTHS_AHEAD")
+    # How often each worker creates upcoming monthly partitions; 0 leaves it to startup and the CLI.
+    db_partition_interval_seconds: int = Field(default=3600, env="DB_PARTITION_INTERVAL_SECONDS")
+    # Tasks DONE/FAILED for longer than this many days move to archived_tasks; 0 disables the archiver.
+    archive_after_days: int = Field(default=30, env="ARCHIVE_AFTER_DAYS")
+    archive_batch_size: int = Field(default=200, env="ARCHIVE_BATCH_SIZE")
+    # Batches per pass; each batch is its own short transaction.
+    archive_max_batches: int = Field(default=20, env="ARCHIVE_MAX_BATCHES")
+    archive_interval_seconds: int = Field(default=3600, env="ARCHIVE_INTERVAL_SECONDS")
+    # zlib, zstd (needs the zstandard package) or none.
+    archive_compression: str = Field(default="zlib", env="ARCHIVE_COMPRESSION")
+    # Fraction of handler invocations run under cProfile (capped at profiling.MAX_SAMPLE_RATE); 0 turns it off.
+    profiling_sample_rate: float = Field(default=0.0, env="PROFILING_SAMPLE_RATE")
+    # Comma-separated stages to profile; empty profiles every stage.
+    profiling_stages: str = Field(default="", env="PROFILING_STAGES")
+    profiling_dir: str = Field(default="data/profiles", env="PROFILING_DIR")
+    profiling_dump_interval_seconds: int = Field(default=300, env="PROFILING_DUMP_INTERVAL_SECONDS")
+    # Port for the worker's /metrics endpoint; 0 disables it. The API serves /metrics itself.
+    metrics_port: int = Field(default=0, env="METRICS_PORT")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,95 @@
+"""Selective ContextPack builder backed by a per-task artifact cache."""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from orchestrator.blobstore import load_payload
+from orchestrator.config import get_settings
+from orchestrator.models import Artifact, Stage, Task
+from orchestrator.schemas import ContextPack, TaskSpec
+
+# Artifact kinds each stage reads; only the latest artifact of each kind goes into its ContextPack.
+STAGE_CONTEXT_KINDS: Dict[Stage, Tuple[str, ...]] = {
+    Stage.ORCHESTRATE: ("TaskSpec",),
+    Stage.BACKEND: ("TaskSpec", "ContextPack", "QA-BACKEND", "SecurityReview"),
+    Stage.QA_BACKEND: ("TaskSpec", "BackendPlan"),
+    Stage.SECURITY: ("BackendPlan",),
+    Stage.FRONTEND: ("TaskSpec", "ContextPack", "QA-FRONTEND"),
+    Stage.QA_FRONTEND: ("TaskSpec", "FrontendPlan"),
+    Stage.DOCS: ("TaskSpec", "BackendPlan", "FrontendPlan"),
+}
+
+
+@dataclass
+class TaskArtifacts:
+    latest: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+_cache: "OrderedDict[int, TaskArtifacts]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def latest_artifacts(session: Session, task_id: int) -> Dict[str, Dict[str, Any]]:
+    """Latest artifact per kind for a task.
+
+    Each call lists the newest artifact id per kind (one query on the (task_id, kind) index) and
+    loads payloads only for kinds whose newest id differs from the cached one. A newly recorded
+    artifact, here or in another worker, therefore replaces its kind's cached entry. Ids are not
+    used as a watermark: SERIAL ids from parallel branches can become visible out of order.
+    """
+    with _lock:
+        entry = _cache.pop(task_id, None) or TaskArtifacts()
+    newest = dict(
+        session.execute(
+            select(Artifact.kind, func.max(Artifact.id)).where(Artifact.task_id == task_id).group_by(Artifact.kind)
+        ).all()
+    )
+    latest = {kind: cached for kind, cached in entry.latest.items() if newest.get(kind) == cached["id"]}
+    stale = [artifact_id for kind, artifact_id in newest.items() if kind not in latest]
+    if stale:
+        stmt = select(Artifact.id, Artifact.kind, Artifact.data, Artifact.blob_sha256, Artifact.run_id).where(
+            Artifact.id.in_(stale)
+        )
+        for artifact_id, kind, data, digest, run_id in session.execute(stmt):
+            if data is None:
+                data = load_payload(digest)
+            latest[kind] = {"id": artifact_id, "kind": kind, "data": data, "run_id": run_id}
+    with _lock:
+        _cache[task_id] = TaskArtifacts(latest=latest)
+        while len(_cache) > get_settings().context_cache_size:
+            _cache.popitem(last=False)
+    return latest
+
+
+def invalidate(task_id: int | None = None) -> None:
+    with _lock:
+        if task_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(task_id, None)
+
+
+def build_context(session: Session, task: Task, stage: Stage) -> ContextPack:
+    latest = latest_artifacts(session, task.id)
+    selected = sorted(
+        (latest[kind] for kind in STAGE_CONTEXT_KINDS.get(stage, ()) if kind in latest),
+        key=lambda a: a["id"],
+    )
+    artifacts = [{"kind": a["kind"], "data": a["data"], "run_id": a["run_id"]} for a in selected]
+    task_spec_artifact = latest.get("TaskSpec")
+    task_spec_data = task_spec_artifact["data"] if task_spec_artifact else {
+        "goal": task.title,
+        "acceptance_criteria": [],
+        "constraints": [],
+    }
+    task_spec = TaskSpec(**task_spec_data)
+    return ContextPack(task_id=task.id, title=task.title, task_spec=task_spec, stage=stage, artifacts=artifacts)
+
+
+__all__ = ["STAGE_CONTEXT_KINDS", "build_context", "latest_artifacts", "invalidate"]
@@ -1,24 +1,98 @@
-"""Database engine and session management."""
-from contextlib import contextmanager
+"""Database engines and session management."""
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from orchestrator import tracing
 from orchestrator.config import get_settings
+from orchestrator.metrics import DB_SESSION_DURATION
 
 settings = get_settings()
-engine = create_engine(settings.database_url, echo=False, future=True)
+
+# Sync driver -> asyncio driver for the same database.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _pool_options(url: str) -> Dict[str, Any]:
+    """Pool sizing from Settings; SQLite's file locking makes a sized pool pointless there."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def async_database_url() -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No asyncio driver known for {backend!r}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+engine = create_engine(settings.database_url, echo=False, future=True, **_pool_options(settings.database_url))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    # Created on first use so the worker, which never touches it, needs no asyncio driver.
+    # asyncpg, unlike psycopg2, binds typed parameters: native enum columns would be sent as
+    # ``$1::<enumtype>``, so the models keep enums as VARCHAR to match the migrated schema.
+    url = async_database_url()
+    return create_async_engine(url, echo=False, **_pool_options(url))
+
+
+@lru_cache()
+def get_async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
 @contextmanager
 def session_scope():
     """Provide a transactional scope around a series of operations."""
     session = SessionLocal()
-    try:
-        yield session
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
+    started = time.perf_counter()
+    outcome = "commit"
+    with tracing.leaf_span("db.session", mode="sync"):
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            outcome = "rollback"
+            session.rollback()
+            raise
+        finally:
+            session.close()
+            DB_SESSION_DURATION.observe(time.perf_counter() - started, mode="sync", outcome=outcome)
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    """Async counterpart of session_scope; sync pipeline helpers run through ``session.run_sync``."""
+    session = get_async_sessionmaker()()
+    started = time.perf_counter()
+    outcome = "commit"
+    with tracing.leaf_span("db.session", mode="async"):
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            outcome = "rollback"
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+            DB_SESSION_DURATION.observe(time.perf_counter() - started, mode="async", outcome=outcome)
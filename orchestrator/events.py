@@ -0,0 +1,162 @@
+"""Fan-out of task events to SSE and long-poll watchers from a single listener per process."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set
+
+from sqlalchemy import func, or_, select
+
+from orchestrator.config import get_settings
+from orchestrator.db import async_session_scope
+from orchestrator.models import TaskEvent
+from orchestrator.notify import TASK_EVENTS_CHANNEL, get_notifier
+from orchestrator.schemas import TaskEventOut
+from orchestrator.util import logger
+
+settings = get_settings()
+
+FETCH_LIMIT = 500
+# Ids below the cursor that were not visible yet (their transaction committed late) are
+# re-queried for this long before being treated as rolled back.
+GAP_TIMEOUT_SECONDS = 30.0
+MAX_GAPS = 1000
+# How long a long poll waits for ids below its newest event to commit before answering.
+SETTLE_SECONDS = 0.5
+
+
+class EventBroker:
+    """Reads new events for every task in one query per notification and hands them to watchers.
+
+    However many clients watch, the database sees one LISTEN and one query per wake-up.
+    """
+
+    def __init__(self) -> None:
+        self.watchers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self.cursor = 0
+        self.gaps: Dict[int, float] = {}
+        self._fetched: asyncio.Condition | None = None
+        self._task: asyncio.Task | None = None
+        self._fetching: asyncio.Future | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._subscription = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._fetched = asyncio.Condition()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="events")
+        # Subscribe before reading the cursor so nothing committed in between is missed.
+        self._subscription = await loop.run_in_executor(self._executor, get_notifier().subscribe, TASK_EVENTS_CHANNEL)
+        async with async_session_scope() as session:
+            self.cursor = await session.scalar(select(func.max(TaskEvent.id))) or 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._fetching is not None:
+            await asyncio.gather(self._fetching, return_exceptions=True)
+            self._fetching = None
+        if self._subscription is not None:
+            self._subscription.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def subscribe(self, task_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self.watchers[task_id].add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: int, queue: asyncio.Queue) -> None:
+        queues = self.watchers.get(task_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.watchers[task_id]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Polling is the safety net for commits made where this process can't hear them.
+            await loop.run_in_executor(self._executor, self._subscription.wait, settings.events_poll_seconds)
+            # Shielded so stop() never abandons a query halfway and leaves its connection checked out.
+            self._fetching = asyncio.ensure_future(self.fetch())
+            try:
+                await asyncio.shield(self._fetching)
+            except Exception:  # noqa: BLE001
+                logger.exception("Failed to fetch task events")
+
+    async def fetch(self) -> None:
+        while True:
+            async with async_session_scope() as session:
+                condition = TaskEvent.id > self.cursor
+                if self.gaps:
+                    condition = or_(condition, TaskEvent.id.in_(list(self.gaps)))
+                stmt = select(TaskEvent).where(condition).order_by(TaskEvent.id.asc()).limit(FETCH_LIMIT)
+                rows = list(await session.scalars(stmt))
+            now = time.monotonic()
+            for row in rows:
+                if row.id > self.cursor:
+                    # Sequence ids are handed out before commit, so a lower id can become visible later.
+                    for missing in range(self.cursor + 1, row.id):
+                        self.gaps[missing] = now
+                    self.cursor = row.id
+                else:
+                    self.gaps.pop(row.id, None)
+                queues = self.watchers.get(row.task_id)
+                if queues:
+                    event = TaskEventOut.from_orm(row)
+                    for queue in queues:
+                        queue.put_nowait(event)
+            self._expire_gaps(now)
+            if len(rows) < FETCH_LIMIT:
+                break
+        if self._fetched is not None:
+            async with self._fetched:
+                self._fetched.notify_all()
+
+    async def settled(self, event_id: int, timeout: float) -> None:
+        """Wait up to ``timeout`` until every event id up to ``event_id`` is visible or given up on.
+
+        Ids are allocated before commit, so a transaction still in flight can add an event below
+        one already read; once this returns, such events have reached the watchers' queues.
+        """
+        if self._fetched is None:
+            return
+
+        def done() -> bool:
+            return self.cursor >= event_id and not any(gap <= event_id for gap in self.gaps)
+
+        async with self._fetched:
+            try:
+                await asyncio.wait_for(self._fetched.wait_for(done), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _expire_gaps(self, now: float) -> None:
+        for gap, seen_at in list(self.gaps.items()):
+            if now - seen_at > GAP_TIMEOUT_SECONDS:
+                del self.gaps[gap]
+        while len(self.gaps) > MAX_GAPS:
+            del self.gaps[min(self.gaps)]
+
+
+async def events_since(task_id: int, since: int, limit: int = FETCH_LIMIT) -> List[TaskEventOut]:
+    async with async_session_scope() as session:
+        stmt = (
+            select(TaskEvent)
+            .where(TaskEvent.task_id == task_id, TaskEvent.id > since)
+            .order_by(TaskEvent.id.asc())
+            .limit(limit)
+        )
+        return [TaskEventOut.from_orm(row) for row in await session.scalars(stmt)]
+
+
+broker = EventBroker()
+
+
+__all__ = ["EventBroker", "FETCH_LIMIT", "SETTLE_SECONDS", "broker", "events_since"]
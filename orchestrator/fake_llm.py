@@ -0,0 +1,209 @@
+"""Fake LLM batch endpoint for local runs, tests and benchmarks.
+
+Run with ``uvicorn orchestrator.fake_llm:app --port 9000`` and set ``LLM_ENDPOINT=http://localhost:9000``,
+or start it in-process with ``FakeLLMServer``. Latency, failures and QA rejections are set through
+``FAKE_LLM_*`` environment variables or ``configure``.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="Fake LLM")
+
+STREAM_CHUNK_CHARS = 32
+
+
+@dataclass(frozen=True)
+class FakeLLMConfig:
+    latency_ms: float = 0.0
+    # Uniform +/- jitter around the latency.
+    jitter_ms: float = 0.0
+    # Share of requests answered with a 500.
+    failure_rate: float = 0.0
+    qa_reject_rate: float = 0.0
+    # Padding added to every output, to exercise artifact and blob storage.
+    payload_bytes: int = 0
+    # Backend outputs carry ``pr_number`` (the task id), so CI_WAIT and MERGE have a PR to talk about.
+    pr_numbers: bool = False
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("FAKE_LLM_JITTER_MS", "0")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            qa_reject_rate=float(os.getenv("FAKE_LLM_QA_REJECT_RATE", "0")),
+            payload_bytes=int(os.getenv("FAKE_LLM_PAYLOAD_BYTES", "0")),
+            pr_numbers=os.getenv("FAKE_LLM_PR_NUMBERS", "").lower() in ("1", "true", "yes"),
+            seed=int(seed) if seed else None,
+        )
+
+
+config = FakeLLMConfig.from_env()
+batch_sizes: Counter = Counter()
+# Requests per "<endpoint> <role>", e.g. "batch QA".
+request_counts: Counter = Counter()
+_random = random.Random(config.seed)
+_lock = threading.Lock()
+
+
+def get_config() -> FakeLLMConfig:
+    """The current config; ``configure`` replaces it, so read it through here rather than importing it."""
+    return config
+
+
+def configure(**overrides: Any) -> FakeLLMConfig:
+    """Replace config fields, reseed the failure/rejection draws and reset the counters."""
+    global config, _random
+    with _lock:
+        config = replace(config, **overrides)
+        _random = random.Random(config.seed)
+        batch_sizes.clear()
+        request_counts.clear()
+    return config
+
+
+def _chance(rate: float) -> bool:
+    with _lock:
+        return rate > 0 and _random.random() < rate
+
+
+def _latency() -> float:
+    with _lock:
+        delay = config.latency_ms + _random.uniform(-config.jitter_ms, config.jitter_ms)
+    return max(delay, 0.0) / 1000
+
+
+class BatchRequest(BaseModel):
+    role: str
+    prompt: str = ""
+    inputs: List[Dict[str, Any]]
+
+
+def respond(role: str, prompt: str, input_json: Dict[str, Any]) -> Dict[str, Any]:
+    if role == "Product":
+        raw = input_json.get("raw_request", "")
+        output: Dict[str, Any] = {"goal": raw, "acceptance_criteria": [f"Implements: {raw}"], "constraints": []}
+    elif role == "QA":
+        passed = not _chance(config.qa_reject_rate)
+        output = {"passed": passed, "issues": [] if passed else ["Synthetic QA rejection"], "suggestions": []}
+    else:
+        output = {"role": role, "summary": f"{role} output", "files_to_change": [], "diff_plan": []}
+        task_id = input_json.get("task_id") or (input_json.get("context") or {}).get("task_id")
+        if role == "Backend" and config.pr_numbers and task_id:
+            output["pr_number"] = int(task_id)
+    if config.payload_bytes:
+        output["notes"] = "x" * config.payload_bytes
+    return output
+
+
+def _failure() -> Optional[JSONResponse]:
+    if _chance(config.failure_rate):
+        return JSONResponse({"error": "synthetic LLM failure"}, status_code=500)
+    return None
+
+
+@app.post("/v1/batch")
+async def batch(payload: BatchRequest):
+    batch_sizes[len(payload.inputs)] += 1
+    request_counts[f"batch {payload.role}"] += 1
+    delay = _latency()
+    if delay:
+        await asyncio.sleep(delay)
+    failure = _failure()
+    if failure is not None:
+        return failure
+    return {"outputs": [respond(payload.role, payload.prompt, item) for item in payload.inputs]}
+
+
+class StreamRequest(BaseModel):
+    role: str
+    prompt: str = ""
+    input: Dict[str, Any]
+
+
+@app.post("/v1/stream")
+async def stream(payload: StreamRequest):
+    request_counts[f"stream {payload.role}"] += 1
+    failure = _failure()
+    if failure is not None:
+        return failure
+    text = json.dumps(respond(payload.role, payload.prompt, payload.input))
+    delay = _latency()
+
+    async def chunks():
+        pieces = range(0, len(text), STREAM_CHUNK_CHARS)
+        for start in pieces:
+            if delay:
+                await asyncio.sleep(delay / len(pieces))
+            yield text[start : start + STREAM_CHUNK_CHARS]
+
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "batch_sizes": dict(batch_sizes),
+        "requests": sum(batch_sizes.values()),
+        "by_endpoint": dict(request_counts),
+    }
+
+
+class FakeLLMServer:
+    """Serves ``app`` from a background thread on a free local port."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        import uvicorn
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(
+            target=self.server.run, kwargs={"sockets": [self.socket]}, name="fake-llm", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout: float = 10.0) -> "FakeLLMServer":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Fake LLM server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+        self.socket.close()
+
+
+__all__ = [
+    "FakeLLMConfig",
+    "FakeLLMServer",
+    "app",
+    "batch_sizes",
+    "configure",
+    "get_config",
+    "request_counts",
+    "respond",
+]
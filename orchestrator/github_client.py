@@ -1,20 +1,261 @@
-"""Minimal GitHub client placeholder."""
-from typing import Optional
+"""GitHub REST client with pooling, rate-limit pacing, retries and conditional GETs."""
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
+from orchestrator import tracing
 from orchestrator.config import get_settings
+from orchestrator.metrics import GITHUB_REQUEST_DURATION, CallbackMetric
 from orchestrator.util import logger
 
+RETRY_STATUSES = {500, 502, 503, 504}
+# Safe to resend after a 5xx or a dropped connection; a POST may already have taken effect.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+PR_STATUS_FIELDS = """
+    number
+    headRefOid
+    mergeStateStatus
+    commits(last: 1) { nodes { commit { statusCheckRollup { state } } } }
+"""
+ROLLUP_CONCLUSIONS = {"SUCCESS": "success", "FAILURE": "failure", "ERROR": "failure"}
+
+
+def _bulk_status_query(pr_numbers: List[int]) -> str:
+    fields = "\n".join(f"pr{n}: pullRequest(number: {int(n)}) {{ {PR_STATUS_FIELDS} }}" for n in pr_numbers)
+    return f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {fields} }} }}"
+
+
+def _parse_pr_status(node: Dict[str, Any]) -> Dict[str, Any]:
+    """GraphQL PR node -> the REST/webhook vocabulary stored in pull_request_statuses."""
+    commits = (node.get("commits") or {}).get("nodes") or []
+    rollup = ((commits[0].get("commit") or {}).get("statusCheckRollup") or {}) if commits else {}
+    state = rollup.get("state")
+    return {
+        "head_sha": node.get("headRefOid"),
+        "mergeable_state": (node.get("mergeStateStatus") or "unknown").lower(),
+        "checks_status": "completed" if state in ROLLUP_CONCLUSIONS else "in_progress",
+        "checks_conclusion": ROLLUP_CONCLUSIONS.get(state),
+    }
+
+
+def _default_headers(token: str | None) -> Dict[str, str]:
+    headers = {"Accept": "application/vnd.github+json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+class RateLimiter:
+    """Token bucket sized and refilled from GitHub's ``X-RateLimit-*`` headers.
+
+    Each request takes a token; the bucket refills to ``X-RateLimit-Limit`` at
+    ``X-RateLimit-Reset``. ``Retry-After`` (secondary limits) blocks all callers until it passes.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+
+    def acquire(self) -> float:
+        """Take a token; returns how long the caller must wait first (0 if none)."""
+        now = time.time()
+        with self.lock:
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.remaining is None:
+                return 0.0
+            if now >= self.reset_at and self.limit is not None:
+                self.remaining = self.limit
+            if self.remaining > 0:
+                self.remaining -= 1
+                return 0.0
+            return max(self.reset_at - now, 0.0)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        with self.lock:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+            retry_after = headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                self.blocked_until = max(self.blocked_until, time.time() + int(retry_after))
+
+
+class ETagCache:
+    """Bounded LRU of ``url -> (etag, body)`` for conditional GETs."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+
+    def get(self, url: str) -> Optional[Tuple[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, etag: str, body: Any) -> None:
+        with self.lock:
+            self.entries[url] = (etag, body)
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def _is_rate_limited(status: int, headers: Mapping[str, str]) -> bool:
+    return status == 429 or (status == 403 and ("Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0"))
+
+
+def _retry_delay(attempt: int, status: Optional[int], headers: Mapping[str, str]) -> float:
+    settings = get_settings()
+    retry_after = headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    if status is not None and headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+        return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1
+    # Full jitter so retrying workers don't synchronize.
+    return random.uniform(0, settings.github_backoff_base_seconds * (2**attempt))
+
+
+class _Response:
+    """Status and decoded body, whether fresh or served from the ETag cache on a 304."""
+
+    def __init__(self, status_code: int, data: Any, text: str, from_cache: bool = False) -> None:
+        self.status_code = status_code
+        self.data = data
+        self.text = text
+        self.from_cache = from_cache
+
+
+class _Exchange:
+    """Rate-limit, retry and ETag decisions for one logical request.
+
+    Holds no I/O, so the sync and async clients share it and differ only in how they send and sleep.
+    Non-idempotent requests are retried only when GitHub rate-limited them, as it then did not
+    process them; a 5xx or transport error may have come after a POST took effect.
+    """
+
+    def __init__(self, client: Any, method: str, url: str, idempotent: Optional[bool] = None) -> None:
+        self.method = method
+        self.url = url
+        self.limiter: RateLimiter = client.limiter
+        self.etags: ETagCache = client.etags
+        self.max_retries = client.settings.github_max_retries
+        self.idempotent = method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        self.cached = self.etags.get(url) if method == "GET" else None
+        self.headers = {"If-None-Match": self.cached[0]} if self.cached else {}
+        self.attempt = 0
+
+    def wait(self) -> float:
+        """Seconds to sleep before sending, to stay inside the rate limit."""
+        wait = self.limiter.acquire()
+        if wait:
+            logger.warning("[GitHub] rate limit reached; waiting %.1fs", wait)
+        return wait
+
+    def _retry(self, delay: float) -> float:
+        self.attempt += 1
+        return delay
+
+    def failed(self, elapsed: float) -> Optional[float]:
+        """After a transport error: seconds until the retry, or None to re-raise."""
+        GITHUB_REQUEST_DURATION.observe(elapsed, method=self.method, status="error")
+        if not self.idempotent or self.attempt >= self.max_retries:
+            return None
+        return self._retry(_retry_delay(self.attempt, None, {}))
+
+    def received(self, status: int, headers: Mapping[str, str], elapsed: float) -> Optional[float]:
+        """After a response: seconds until the retry, or None if it is final."""
+        GITHUB_REQUEST_DURATION.observe(elapsed, method=self.method, status=str(status))
+        self.limiter.update(headers)
+        rate_limited = _is_rate_limited(status, headers)
+        retryable = rate_limited or (self.idempotent and status in RETRY_STATUSES)
+        if not retryable or self.attempt >= self.max_retries:
+            return None
+        delay = _retry_delay(self.attempt, status, headers)
+        logger.warning("[GitHub] %s %s -> %s; retrying in %.1fs", self.method, self.url, status, delay)
+        return self._retry(delay)
+
+    def response(
+        self, status: int, headers: Mapping[str, str], content: bytes, json: Callable[[], Any], text: str
+    ) -> _Response:
+        if status == 304 and self.cached:
+            return _Response(200, self.cached[1], "", from_cache=True)
+        data = json() if content and status < 400 else None
+        if self.method == "GET" and status == 200 and headers.get("ETag"):
+            self.etags.put(self.url, headers["ETag"], data)
+        return _Response(status, data, text)
+
+
+_rate_limiter = RateLimiter()
+
+CallbackMetric(
+    "orchestrator_github_rate_limit_remaining", "Requests left in the current GitHub rate-limit window.", "gauge", [],
+    lambda: [({}, _rate_limiter.remaining)] if _rate_limiter.remaining is not None else [],
+)
+CallbackMetric(
+    "orchestrator_github_rate_limit_reset_seconds", "Seconds until the GitHub rate-limit window resets.", "gauge", [],
+    lambda: [({}, max(_rate_limiter.reset_at - time.time(), 0.0))] if _rate_limiter.reset_at else [],
+)
+
+
+@lru_cache()
+def _etag_cache() -> ETagCache:
+    return ETagCache(get_settings().github_etag_cache_size)
+
 
 class GitHubClient:
     def __init__(self) -> None:
         self.settings = get_settings()
-        self.base_url = "https://api.github.com"
+        self.base_url = self.settings.github_api_url.rstrip("/")
         self.session = requests.Session()
-        if self.settings.github_token:
-            self.session.headers.update({"Authorization": f"Bearer {self.settings.github_token}"})
-        self.session.headers.update({"Accept": "application/vnd.github+json"})
+        self.session.headers.update(_default_headers(self.settings.github_token))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.settings.github_pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.limiter = _rate_limiter
+        self.etags = _etag_cache()
+
+    def _request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs: Any) -> _Response:
+        with tracing.span("github.request", method=method, path=url[len(self.base_url):]) as span:
+            resp = self._send(_Exchange(self, method, url, idempotent), **kwargs)
+            span.set(status=resp.status_code, from_cache=resp.from_cache)
+            return resp
+
+    def _send(self, exchange: _Exchange, **kwargs: Any) -> _Response:
+        while True:
+            wait = exchange.wait()
+            if wait:
+                time.sleep(wait)
+            started = time.perf_counter()
+            try:
+                resp = self.session.request(exchange.method, exchange.url, headers=exchange.headers, timeout=30, **kwargs)
+            except requests.RequestException:
+                delay = exchange.failed(time.perf_counter() - started)
+                if delay is None:
+                    raise
+            else:
+                delay = exchange.received(resp.status_code, resp.headers, time.perf_counter() - started)
+                if delay is None:
+                    return exchange.response(resp.status_code, resp.headers, resp.content, resp.json, resp.text)
+            time.sleep(delay)
 
     def create_branch(self, base_sha: str, branch: str) -> None:
         logger.info("[GitHub] create_branch %s -> %s", base_sha, branch)
@@ -24,7 +265,7 @@ class GitHubClient:
         owner_repo = self.settings.github_repo
         url = f"{self.base_url}/repos/{owner_repo}/git/refs"
         payload = {"ref": f"refs/heads/{branch}", "sha": base_sha}
-        resp = self.session.post(url, json=payload)
+        resp = self._request("POST", url, json=payload)
         if resp.status_code >= 400:
             raise RuntimeError(f"GitHub branch create failed: {resp.text}")
 
@@ -34,17 +275,17 @@ class GitHubClient:
             logger.warning("GITHUB_REPO not set; skipping PR")
             return None
         url = f"{self.base_url}/repos/{self.settings.github_repo}/pulls"
-        resp = self.session.post(url, json={"title": title, "head": head, "base": base, "body": body or ""})
+        resp = self._request("POST", url, json={"title": title, "head": head, "base": base, "body": body or ""})
         if resp.status_code >= 400:
             raise RuntimeError(f"GitHub PR create failed: {resp.text}")
-        return resp.json().get("number")
+        return resp.data.get("number")
 
     def comment_pull_request(self, pr_number: int, body: str) -> None:
         if not self.settings.github_repo:
             logger.warning("GITHUB_REPO not set; skipping PR comment")
             return
         url = f"{self.base_url}/repos/{self.settings.github_repo}/issues/{pr_number}/comments"
-        resp = self.session.post(url, json={"body": body})
+        resp = self._request("POST", url, json={"body": body})
         if resp.status_code >= 400:
             raise RuntimeError(f"GitHub comment failed: {resp.text}")
 
@@ -53,8 +294,101 @@ class GitHubClient:
             logger.warning("GITHUB_REPO not set; assuming checks green")
             return True
         url = f"{self.base_url}/repos/{self.settings.github_repo}/pulls/{pr_number}"
-        resp = self.session.get(url)
+        resp = self._request("GET", url)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"GitHub PR fetch failed: {resp.text}")
+        state = resp.data.get("mergeable_state")
+        return state in {"clean", "has_hooks"}
+
+    def bulk_pr_status(self, pr_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Mergeability and check rollup for many PRs, GITHUB_GRAPHQL_BATCH_SIZE per GraphQL request."""
+        if not self.settings.github_repo:
+            logger.warning("GITHUB_REPO not set; assuming checks green")
+            return {n: {"head_sha": None, "mergeable_state": "clean", "checks_status": None, "checks_conclusion": None} for n in pr_numbers}
+        owner, name = self.settings.github_repo.split("/", 1)
+        statuses: Dict[int, Dict[str, Any]] = {}
+        size = max(1, self.settings.github_graphql_batch_size)
+        for start in range(0, len(pr_numbers), size):
+            chunk = pr_numbers[start : start + size]
+            resp = self._request(
+                "POST",
+                f"{self.base_url}/graphql",
+                # A read-only query, so safe to resend like a GET.
+                idempotent=True,
+                json={"query": _bulk_status_query(chunk), "variables": {"owner": owner, "name": name}},
+            )
+            if resp.status_code >= 400 or not resp.data or not resp.data.get("data"):
+                raise RuntimeError(f"GitHub PR status query failed: {resp.text}")
+            repository = resp.data["data"].get("repository") or {}
+            for node in repository.values():
+                if node:
+                    statuses[node["number"]] = _parse_pr_status(node)
+        return statuses
+
+
+@lru_cache()
+def get_github_client() -> GitHubClient:
+    """Process-wide client so every caller shares one connection pool, limiter and ETag cache."""
+    return GitHubClient()
+
+
+class AsyncGitHubClient:
+    """httpx-based client for the async worker; shares the rate limiter and ETag cache with GitHubClient."""
+
+    def __init__(self, max_connections: int = 20) -> None:
+        self.settings = get_settings()
+        self.base_url = self.settings.github_api_url.rstrip("/")
+        self.client = httpx.AsyncClient(
+            headers=_default_headers(self.settings.github_token),
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=30.0,
+        )
+        self.limiter = _rate_limiter
+        self.etags = _etag_cache()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs: Any) -> _Response:
+        with tracing.span("github.request", method=method, path=url[len(self.base_url):]) as span:
+            resp = await self._send(_Exchange(self, method, url, idempotent), **kwargs)
+            span.set(status=resp.status_code, from_cache=resp.from_cache)
+            return resp
+
+    async def _send(self, exchange: _Exchange, **kwargs: Any) -> _Response:
+        while True:
+            wait = exchange.wait()
+            if wait:
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                resp = await self.client.request(exchange.method, exchange.url, headers=exchange.headers, **kwargs)
+            except httpx.TransportError:
+                delay = exchange.failed(time.perf_counter() - started)
+                if delay is None:
+                    raise
+            else:
+                delay = exchange.received(resp.status_code, resp.headers, time.perf_counter() - started)
+                if delay is None:
+                    return exchange.response(resp.status_code, resp.headers, resp.content, resp.json, resp.text)
+            await asyncio.sleep(delay)
+
+    async def comment_pull_request(self, pr_number: int, body: str) -> None:
+        if not self.settings.github_repo:
+            logger.warning("GITHUB_REPO not set; skipping PR comment")
+            return
+        url = f"{self.base_url}/repos/{self.settings.github_repo}/issues/{pr_number}/comments"
+        resp = await self._request("POST", url, json={"body": body})
+        if resp.status_code >= 400:
+            raise RuntimeError(f"GitHub comment failed: {resp.text}")
+
+    async def check_pr_status(self, pr_number: int) -> bool:
+        if not self.settings.github_repo:
+            logger.warning("GITHUB_REPO not set; assuming checks green")
+            return True
+        url = f"{self.base_url}/repos/{self.settings.github_repo}/pulls/{pr_number}"
+        resp = await self._request("GET", url)
         if resp.status_code >= 400:
             raise RuntimeError(f"GitHub PR fetch failed: {resp.text}")
-        state = resp.json().get("mergeable_state")
+        state = resp.data.get("mergeable_state")
         return state in {"clean", "has_hooks"}
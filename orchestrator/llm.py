@@ -1,13 +1,220 @@
 """LLM call wrapper for role-specific prompts."""
-from typing import Any, Dict
+import asyncio
+import json
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
+import httpx
+import requests
+from sqlalchemy.orm import Session
+
+from orchestrator import llm_cache, tracing
+from orchestrator.config import get_settings
+from orchestrator.llm_batch import LLMBatcher
+from orchestrator.metrics import LLM_REQUEST_DURATION, CallbackMetric
 from orchestrator.prompts import ROLE_PROMPTS
 from orchestrator.util import logger, safe_json
 
+settings = get_settings()
 
-def call(role: str, input_json: Dict[str, Any]) -> Dict[str, Any]:
-    """Simulate an LLM call; in production replace with OpenAI call."""
-    prompt = ROLE_PROMPTS.get(role, "")
-    logger.info("LLM call role=%s prompt=%s input=%s", role, prompt[:60], safe_json(input_json))
+BATCH_PATH = "/v1/batch"
+STREAM_PATH = "/v1/stream"
+PLACEHOLDER_CHUNK_CHARS = 256
+
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMBatcher]" = weakref.WeakKeyDictionary()
+
+
+def _complete(role: str, prompt: str, input_json: Dict[str, Any]) -> Dict[str, Any]:
     # Placeholder deterministic response for demo purposes
     return {"role": role, "received": input_json, "prompt": prompt}
+
+
+def _batch_body(role: str, prompt: str, inputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"role": role, "prompt": prompt, "inputs": inputs}
+
+
+def _complete_batch(role: str, prompt: str, inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not settings.llm_endpoint:
+        return [_complete(role, prompt, input_json) for input_json in inputs]
+    resp = requests.post(
+        settings.llm_endpoint.rstrip("/") + BATCH_PATH,
+        json=_batch_body(role, prompt, inputs),
+        timeout=settings.llm_timeout_seconds,
+    )
+    if resp.status_code >= 400:
+        raise RuntimeError(f"LLM call failed: {resp.text}")
+    return resp.json()["outputs"]
+
+
+def _stream_text(role: str, prompt: str, input_json: Dict[str, Any]):
+    if not settings.llm_endpoint:
+        text = json.dumps(_complete(role, prompt, input_json), ensure_ascii=False)
+        for start in range(0, len(text), PLACEHOLDER_CHUNK_CHARS):
+            yield text[start : start + PLACEHOLDER_CHUNK_CHARS]
+        return
+    with requests.post(
+        settings.llm_endpoint.rstrip("/") + STREAM_PATH,
+        json={"role": role, "prompt": prompt, "input": input_json},
+        timeout=settings.llm_timeout_seconds,
+        stream=True,
+    ) as resp:
+        if resp.status_code >= 400:
+            raise RuntimeError(f"LLM stream failed: {resp.text}")
+        resp.encoding = resp.encoding or "utf-8"
+        for chunk in resp.iter_content(chunk_size=None, decode_unicode=True):
+            if chunk:
+                yield chunk
+
+
+class _AsyncTransport:
+    def __init__(self) -> None:
+        self.client = httpx.AsyncClient(timeout=settings.llm_timeout_seconds) if settings.llm_endpoint else None
+
+    async def __call__(self, role: str, prompt: str, inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.client is None:
+            return [_complete(role, prompt, input_json) for input_json in inputs]
+        resp = await self.client.post(settings.llm_endpoint.rstrip("/") + BATCH_PATH, json=_batch_body(role, prompt, inputs))
+        if resp.status_code >= 400:
+            raise RuntimeError(f"LLM call failed: {resp.text}")
+        return resp.json()["outputs"]
+
+    async def stream(self, role: str, prompt: str, input_json: Dict[str, Any]) -> AsyncIterator[str]:
+        if self.client is None:
+            for chunk in _stream_text(role, prompt, input_json):
+                yield chunk
+            return
+        url = settings.llm_endpoint.rstrip("/") + STREAM_PATH
+        async with self.client.stream("POST", url, json={"role": role, "prompt": prompt, "input": input_json}) as resp:
+            if resp.status_code >= 400:
+                await resp.aread()
+                raise RuntimeError(f"LLM stream failed: {resp.text}")
+            async for chunk in resp.aiter_text():
+                if chunk:
+                    yield chunk
+
+
+def get_batcher() -> LLMBatcher:
+    """The batcher for the running event loop (futures cannot cross loops)."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = LLMBatcher(_AsyncTransport(), settings.llm_batch_max_size, settings.llm_batch_max_wait_ms)
+        _batchers[loop] = batcher
+    return batcher
+
+
+def call(role: str, input_json: Dict[str, Any], session: Optional[Session] = None) -> Dict[str, Any]:
+    """Call the model at LLM_ENDPOINT, or the deterministic placeholder when none is configured.
+
+    ``session`` is the caller's open session, used for the durable response cache.
+    """
+    prompt = ROLE_PROMPTS.get(role, "")
+    key = llm_cache.key_for(role, prompt, input_json)
+    cached = llm_cache.lookup(role, key, session)
+    if cached is not None:
+        logger.info("LLM cache hit role=%s", role)
+        return cached
+    logger.info("LLM call role=%s prompt=%s input=%s", role, prompt[:60], safe_json(input_json))
+    with LLM_REQUEST_DURATION.time(role=role, mode="sync"), tracing.span("llm.call", role=role, mode="sync"):
+        result = _complete_batch(role, prompt, [input_json])[0]
+    llm_cache.store(role, key, result, session)
+    return result
+
+
+def stream_call(
+    role: str, input_json: Dict[str, Any], on_chunk: Callable[[str], None], session: Optional[Session] = None
+) -> Dict[str, Any]:
+    """Like :func:`call`, but hands the response text to ``on_chunk`` as it is generated."""
+    prompt = ROLE_PROMPTS.get(role, "")
+    key = llm_cache.key_for(role, prompt, input_json)
+    cached = llm_cache.lookup(role, key, session)
+    if cached is not None:
+        logger.info("LLM cache hit role=%s", role)
+        on_chunk(json.dumps(cached, ensure_ascii=False))
+        return cached
+    logger.info("LLM stream role=%s prompt=%s input=%s", role, prompt[:60], safe_json(input_json))
+    parts: List[str] = []
+    with LLM_REQUEST_DURATION.time(role=role, mode="stream"), tracing.span("llm.call", role=role, mode="stream"):
+        for chunk in _stream_text(role, prompt, input_json):
+            parts.append(chunk)
+            on_chunk(chunk)
+    result = json.loads("".join(parts))
+    llm_cache.store(role, key, result, session)
+    return result
+
+
+async def _alookup(role: str, key: Optional[str]) -> Optional[Dict[str, Any]]:
+    if key is None:
+        return None
+    cached = llm_cache.lookup_memory(role, key)
+    if cached is None:
+        cached = await asyncio.to_thread(llm_cache.lookup_durable, role, key)
+    if cached is not None:
+        logger.info("LLM cache hit role=%s", role)
+    return cached
+
+
+async def acall(role: str, input_json: Dict[str, Any]) -> Dict[str, Any]:
+    """Async counterpart of :func:`call`; concurrent calls are batched per role and coalesced."""
+    prompt = ROLE_PROMPTS.get(role, "")
+    key = llm_cache.key_for(role, prompt, input_json)
+    cached = await _alookup(role, key)
+    if cached is not None:
+        return cached
+    logger.info("LLM acall role=%s prompt=%s input=%s", role, prompt[:60], safe_json(input_json))
+    # Includes time spent waiting for the batch to fill, which is what the caller experiences.
+    with LLM_REQUEST_DURATION.time(role=role, mode="async"), tracing.span("llm.call", role=role, mode="async"):
+        result = await get_batcher().submit(role, prompt, input_json)
+    await asyncio.to_thread(llm_cache.store, role, key, result)
+    return result
+
+
+async def astream_call(
+    role: str, input_json: Dict[str, Any], on_chunk: Callable[[str], Awaitable[None]]
+) -> Dict[str, Any]:
+    """Async counterpart of :func:`stream_call`; ``on_chunk`` is awaited for each piece of text."""
+    prompt = ROLE_PROMPTS.get(role, "")
+    key = llm_cache.key_for(role, prompt, input_json)
+    cached = await _alookup(role, key)
+    if cached is not None:
+        await on_chunk(json.dumps(cached, ensure_ascii=False))
+        return cached
+    logger.info("LLM astream role=%s prompt=%s input=%s", role, prompt[:60], safe_json(input_json))
+    parts: List[str] = []
+    with LLM_REQUEST_DURATION.time(role=role, mode="stream"), tracing.span("llm.call", role=role, mode="stream"):
+        async for chunk in get_batcher().transport.stream(role, prompt, input_json):
+            parts.append(chunk)
+            await on_chunk(chunk)
+    result = json.loads("".join(parts))
+    await asyncio.to_thread(llm_cache.store, role, key, result)
+    return result
+
+
+def batch_stats() -> Dict[str, Dict[str, float]]:
+    """Batch counters and fill rate per role, summed over this process's event loops."""
+    merged: Dict[str, Dict[str, float]] = {}
+    for batcher in list(_batchers.values()):
+        for role, values in batcher.batch_stats().items():
+            totals = merged.setdefault(role, {"calls": 0, "coalesced": 0, "batches": 0, "items": 0})
+            for name in totals:
+                totals[name] += values[name]
+    for totals in merged.values():
+        capacity = totals["batches"] * settings.llm_batch_max_size
+        totals["fill_rate"] = totals["items"] / capacity if capacity else 0.0
+    return merged
+
+
+def _batch_samples():
+    for role, values in batch_stats().items():
+        for event in ("calls", "coalesced", "batches", "items"):
+            yield {"role": role, "event": event}, values[event]
+
+
+CallbackMetric(
+    "orchestrator_llm_batch_events_total", "Async LLM calls, coalesced calls, batches and batched items.", "counter",
+    ["role", "event"], _batch_samples,
+)
+CallbackMetric(
+    "orchestrator_llm_batch_fill_ratio", "Average batch size as a fraction of LLM_BATCH_MAX_SIZE.", "gauge",
+    ["role"], lambda: (({"role": role}, values["fill_rate"]) for role, values in batch_stats().items()),
+)
@@ -0,0 +1,103 @@
+"""Micro-batching and in-flight coalescing for concurrent LLM calls."""
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List
+
+from orchestrator.util import canonical_json, logger
+
+# (role, prompt, inputs) -> one output per input, in order.
+BatchTransport = Callable[[str, str, List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+@dataclass
+class _Item:
+    key: str
+    input_json: Dict[str, Any]
+    future: asyncio.Future
+
+
+class LLMBatcher:
+    """Collects calls per role for up to ``max_wait_ms`` or ``max_size`` items and sends them as one request.
+
+    Identical requests that are already queued or in flight share a single upstream call.
+    Bound to the event loop it was created on.
+    """
+
+    def __init__(self, transport: BatchTransport, max_size: int, max_wait_ms: int) -> None:
+        self.transport = transport
+        self.max_size = max(1, max_size)
+        self.max_wait = max_wait_ms / 1000
+        self.pending: Dict[str, List[_Item]] = {}
+        self.prompts: Dict[str, str] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+        self.inflight: Dict[str, asyncio.Future] = {}
+        # (stat, role) -> count; stats are calls, coalesced, batches, items.
+        self.stats: Counter = Counter()
+
+    async def submit(self, role: str, prompt: str, input_json: Dict[str, Any]) -> Dict[str, Any]:
+        self.stats["calls", role] += 1
+        key = hashlib.sha256(canonical_json({"role": role, "prompt": prompt, "input": input_json})).hexdigest()
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats["coalesced", role] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self.inflight[key] = future
+            batch = self.pending.setdefault(role, [])
+            self.prompts[role] = prompt
+            batch.append(_Item(key, input_json, future))
+            if len(batch) >= self.max_size:
+                self._flush(role)
+            elif len(batch) == 1:
+                self.timers[role] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, role)
+        # Every waiter gets its own copy so callers can't mutate each other's result.
+        return copy.deepcopy(await asyncio.shield(future))
+
+    def _flush(self, role: str) -> None:
+        timer = self.timers.pop(role, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(role, [])
+        if batch:
+            asyncio.get_running_loop().create_task(self._send(role, self.prompts[role], batch))
+
+    async def _send(self, role: str, prompt: str, batch: List[_Item]) -> None:
+        self.stats["batches", role] += 1
+        self.stats["items", role] += len(batch)
+        try:
+            outputs = await self.transport(role, prompt, [item.input_json for item in batch])
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"LLM batch for {role} returned {len(outputs)} outputs for {len(batch)} inputs")
+            for item, output in zip(batch, outputs):
+                item.future.set_result(output)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("LLM batch of %s for role %s failed", len(batch), role)
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+        finally:
+            for item in batch:
+                self.inflight.pop(item.key, None)
+
+    def batch_stats(self) -> Dict[str, Dict[str, float]]:
+        roles = {role for _, role in self.stats}
+        out: Dict[str, Dict[str, float]] = {}
+        for role in roles:
+            batches = self.stats["batches", role]
+            items = self.stats["items", role]
+            out[role] = {
+                "calls": self.stats["calls", role],
+                "coalesced": self.stats["coalesced", role],
+                "batches": batches,
+                "items": items,
+                "fill_rate": items / (batches * self.max_size) if batches else 0.0,
+            }
+        return out
+
+
+__all__ = ["LLMBatcher", "BatchTransport"]
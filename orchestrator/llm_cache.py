@@ -0,0 +1,164 @@
+"""Two-tier cache for LLM responses: in-process LRU in front of a durable database table."""
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from orchestrator.config import get_settings
+from orchestrator.db import session_scope
+from orchestrator.metrics import CallbackMetric
+from orchestrator.models import LLMCacheEntry
+from orchestrator.util import canonical_json, logger
+
+PRUNE_EVERY_PUTS = 100
+
+_memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_lock = threading.Lock()
+_puts = 0
+# (event, role) -> count; events are memory_hit, durable_hit, miss, bypass.
+stats: Counter = Counter()
+
+
+def _disabled_roles() -> set[str]:
+    return {r.strip() for r in get_settings().llm_cache_disabled_roles.split(",") if r.strip()}
+
+
+def key_for(role: str, prompt: str, input_json: Dict[str, Any]) -> Optional[str]:
+    """Cache key for a call, or None when caching is off for this role."""
+    settings = get_settings()
+    if not settings.llm_cache_enabled or role in _disabled_roles():
+        stats["bypass", role] += 1
+        return None
+    return hashlib.sha256(canonical_json({"role": role, "prompt": prompt, "input": input_json})).hexdigest()
+
+
+def lookup_memory(role: str, key: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.time():
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+    stats["memory_hit", role] += 1
+    return copy.deepcopy(response)
+
+
+def _remember(key: str, response: Dict[str, Any], expires_at: float) -> None:
+    with _lock:
+        _memory[key] = (expires_at, response)
+        _memory.move_to_end(key)
+        while len(_memory) > get_settings().llm_cache_memory_size:
+            _memory.popitem(last=False)
+
+
+@contextmanager
+def _using(session: Optional[Session]) -> Iterator[Session]:
+    """The caller's session if it has one open, so a run never holds a second pooled connection."""
+    if session is not None:
+        yield session
+        return
+    with session_scope() as own:
+        yield own
+
+
+def lookup_durable(role: str, key: str, session: Optional[Session] = None) -> Optional[Dict[str, Any]]:
+    with _using(session) as session:
+        entry = session.get(LLMCacheEntry, key)
+        if entry is None or entry.expires_at < datetime.utcnow():
+            stats["miss", role] += 1
+            return None
+        response, expires_at = entry.response, entry.expires_at
+    stats["durable_hit", role] += 1
+    _remember(key, response, expires_at.timestamp())
+    return copy.deepcopy(response)
+
+
+def lookup(role: str, key: Optional[str], session: Optional[Session] = None) -> Optional[Dict[str, Any]]:
+    if key is None:
+        return None
+    cached = lookup_memory(role, key)
+    if cached is not None:
+        return cached
+    return lookup_durable(role, key, session)
+
+
+def store(role: str, key: Optional[str], response: Dict[str, Any], session: Optional[Session] = None) -> None:
+    """Remember a response in memory and in the durable table.
+
+    With ``session`` the row is written in the caller's transaction, under a savepoint so a
+    failed cache write cannot abort it.
+    """
+    global _puts
+    if key is None:
+        return
+    settings = get_settings()
+    expires_at = datetime.utcnow() + timedelta(seconds=settings.llm_cache_ttl_seconds)
+    _remember(key, copy.deepcopy(response), time.time() + settings.llm_cache_ttl_seconds)
+    try:
+        with _using(session) as session, session.begin_nested():
+            session.merge(
+                LLMCacheEntry(
+                    key=key,
+                    role=role,
+                    response=response,
+                    size=len(canonical_json(response)),
+                    created_at=datetime.utcnow(),
+                    expires_at=expires_at,
+                )
+            )
+    except Exception:  # noqa: BLE001
+        # A cache write must never fail the stage that produced the response.
+        logger.exception("Failed to persist LLM cache entry for role %s", role)
+        return
+    with _lock:
+        _puts += 1
+        due = _puts % PRUNE_EVERY_PUTS == 0
+    if due:
+        prune()
+
+
+def prune() -> int:
+    """Drop expired entries, then the oldest ones beyond LLM_CACHE_MAX_ENTRIES."""
+    settings = get_settings()
+    with session_scope() as session:
+        removed = session.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at < datetime.utcnow())).rowcount
+        excess = (session.scalar(select(func.count()).select_from(LLMCacheEntry)) or 0) - settings.llm_cache_max_entries
+        if excess > 0:
+            oldest = select(LLMCacheEntry.key).order_by(LLMCacheEntry.created_at.asc()).limit(excess)
+            removed += session.execute(
+                delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)).execution_options(synchronize_session=False)
+            ).rowcount
+    return removed or 0
+
+
+def clear_memory() -> None:
+    with _lock:
+        _memory.clear()
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    out: Dict[str, Dict[str, int]] = {}
+    for (event, role), count in stats.items():
+        out.setdefault(role, {})[event] = count
+    return out
+
+
+CallbackMetric(
+    "orchestrator_llm_cache_events_total", "LLM cache lookups by outcome (memory_hit, durable_hit, miss, bypass).",
+    "counter", ["role", "event"], lambda: (({"role": role, "event": event}, count) for (event, role), count in stats.items()),
+)
+
+
+__all__ = ["key_for", "lookup", "lookup_memory", "lookup_durable", "store", "prune", "cache_stats", "clear_memory"]
@@ -1,82 +1,677 @@
 """FastAPI entrypoint for WMS orchestrator."""
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from orchestrator import archive, metrics, migrate, profiling, response_cache, tracing
+from orchestrator.blobstore import load_payload
 from orchestrator.config import get_settings
-from orchestrator.db import engine, session_scope
-from orchestrator.models import Base, Decision, DecisionKind, DecisionValue, Run, Stage, Task, TaskStatus
-from orchestrator.pipeline import create_initial_runs
-from orchestrator.schemas import TaskCreate, TaskOut
+from orchestrator.db import async_session_scope, get_async_engine
+from orchestrator.events import FETCH_LIMIT, SETTLE_SECONDS, broker, events_since
+from orchestrator.models import (
+    ArchivedTask,
+    Artifact,
+    Decision,
+    DecisionKind,
+    DecisionValue,
+    Run,
+    RunStatus,
+    Stage,
+    Task,
+    TaskStatus,
+)
+from orchestrator.notify import RUNS_CHANNEL, notify_on_commit
+from orchestrator.pipeline import (
+    artifact_data,
+    create_initial_runs,
+    create_tasks,
+    fail_run,
+    lock_task,
+    resume_waiting_runs,
+    set_task_status,
+    touch_tasks,
+    waiting_runs,
+)
+from orchestrator.schemas import (
+    ArtifactOut,
+    ArtifactPage,
+    DecisionOut,
+    RunOut,
+    RunPage,
+    TaskBatchOut,
+    TaskCreate,
+    TaskEventOut,
+    TaskEventPage,
+    TaskOut,
+    TaskPage,
+    TaskSummaryOut,
+    TaskTraceOut,
+)
+from orchestrator.security import verify_bearer_token, verify_github_signature
+from orchestrator.streaming import chunks_since
 from orchestrator.util import logger
-from orchestrator.worker import run_once
+from orchestrator.webhooks import record_github_event
 
 settings = get_settings()
 app = FastAPI(title="WMS Orchestrator")
 
+TASK_RELATIONS = ("runs", "artifacts", "decisions")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 
 @app.on_event("startup")
-def startup() -> None:
-    Base.metadata.create_all(bind=engine)
+async def startup() -> None:
+    if settings.db_migrate_on_startup:
+        applied = await asyncio.to_thread(migrate.upgrade)
+        if applied:
+            logger.info("Applied migrations %s", ", ".join(applied))
+    await broker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await broker.stop()
+    await get_async_engine().dispose()
+
+
+def _selection(value: str | None, allowed: Tuple[str, ...], name: str) -> Optional[Set[str]]:
+    """Parse a comma-separated ``fields``/``include`` parameter; None means the default selection."""
+    if value is None:
+        return None
+    selected = {part.strip() for part in value.split(",") if part.strip()}
+    unknown = selected - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {name}: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def _artifact_out(artifact: Artifact, with_data: bool = False) -> ArtifactOut:
+    out = ArtifactOut.from_orm(artifact)
+    # Rows written before the blob store still carry data inline; only return it when asked.
+    out.data = artifact_data(artifact) if with_data else None
+    return out
+
+
+def _task_out(task: Task) -> TaskOut:
+    # Serialize while the session is open; returning the ORM object would lazy-load after it closed.
+    return TaskOut(
+        **TaskSummaryOut.from_orm(task).dict(),
+        runs=[RunOut.from_orm(run) for run in sorted(task.runs, key=lambda r: r.id)],
+        artifacts=[_artifact_out(artifact) for artifact in sorted(task.artifacts, key=lambda a: a.id)],
+        decisions=[DecisionOut.from_orm(decision) for decision in sorted(task.decisions, key=lambda d: d.id)],
+    )
+
+
+def _archived_task_out(document: Dict[str, Any], selected: Optional[Set[str]], relations: Set[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = TaskSummaryOut.parse_obj(document["task"]).dict(include=selected)
+    if "runs" in relations:
+        out["runs"] = [RunOut.parse_obj(run) for run in document["runs"]]
+    if "artifacts" in relations:
+        out["artifacts"] = [ArtifactOut.parse_obj({**a, "data": None}) for a in document["artifacts"]]
+    if "decisions" in relations:
+        out["decisions"] = [DecisionOut.parse_obj(d) for d in document["decisions"]]
+    return out
+
+
+def _archived_artifact_out(archived: ArchivedTask, artifact_id: int) -> ArtifactOut:
+    for artifact in archive.archived_document(archived)["artifacts"]:
+        if artifact["id"] == artifact_id:
+            out = ArtifactOut.parse_obj(artifact)
+            # Archiving moves only inline data into the document; blob-backed bodies stay in the blob store.
+            if out.data is None and out.blob_sha256:
+                out.data = load_payload(out.blob_sha256)
+            return out
+    raise HTTPException(status_code=404, detail="Artifact not found")
+
+
+def _page(rows: List[Any], limit: int) -> Tuple[List[Any], Optional[int]]:
+    """Trim the extra row fetched to detect a next page and return the cursor for it."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def _task_by_key(session: Session, idempotency_key: str) -> Optional[Task]:
+    return session.scalars(select(Task).where(Task.idempotency_key == idempotency_key)).first()
+
+
+def _create_task(session: Session, payload: TaskCreate) -> TaskOut:
+    if payload.idempotency_key:
+        existing = _task_by_key(session, payload.idempotency_key)
+        if existing:
+            return _task_out(existing)
+    task = Task(
+        title=payload.title,
+        raw_request=payload.raw_request,
+        status=TaskStatus.PENDING,
+        idempotency_key=payload.idempotency_key,
+    )
+    session.add(task)
+    session.flush()
+    create_initial_runs(task, session, settings.max_attempts)
+    session.refresh(task)
+    return _task_out(task)
 
 
 @app.post("/tasks", response_model=TaskOut)
-def create_task(payload: TaskCreate):
-    with session_scope() as session:
-        task = Task(title=payload.title, raw_request=payload.raw_request, status=TaskStatus.PENDING)
-        session.add(task)
-        session.flush()
-        create_initial_runs(task, session, settings.max_attempts)
-        session.refresh(task)
-        return task
-
-
-@app.get("/tasks/{task_id}", response_model=TaskOut)
-def get_task(task_id: int):
-    with session_scope() as session:
-        task = session.get(Task, task_id)
+async def create_task(payload: TaskCreate):
+    try:
+        async with async_session_scope() as session:
+            return await session.run_sync(_create_task, payload)
+    except IntegrityError:
+        if not payload.idempotency_key:
+            raise
+        # A concurrent request inserted this key first; retrying returns that task.
+        async with async_session_scope() as session:
+            return await session.run_sync(_create_task, payload)
+
+
+async def _insert_task_chunk(items: List[TaskCreate]) -> List[Tuple[int, bool]]:
+    try:
+        async with async_session_scope() as session:
+            return await session.run_sync(create_tasks, items, settings.max_attempts)
+    except IntegrityError:
+        # A concurrent import inserted one of these keys first; retrying resolves it to that task.
+        async with async_session_scope() as session:
+            return await session.run_sync(create_tasks, items, settings.max_attempts)
+
+
+async def _batch_items(request: Request) -> AsyncIterator[Any]:
+    """Yield task objects from a JSON array body or, incrementally, from an NDJSON stream."""
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+        return
+    items = json.loads(await request.body())
+    if not isinstance(items, list):
+        raise ValueError("expected a JSON array of tasks")
+    for item in items:
+        yield item
+
+
+@app.post("/tasks:batch", response_model=TaskBatchOut)
+async def create_tasks_batch(request: Request):
+    """Create many tasks from a JSON array or NDJSON, TASK_BATCH_CHUNK_SIZE per transaction.
+
+    IDs come back in input order. Chunks commit independently, so on a bad item the error lists
+    what was already created; retrying the import with idempotency keys is safe.
+    """
+    results: List[Tuple[int, bool]] = []
+    chunk: List[TaskCreate] = []
+    try:
+        async for raw in _batch_items(request):
+            chunk.append(TaskCreate.parse_obj(raw))
+            if len(chunk) >= settings.task_batch_chunk_size:
+                results += await _insert_task_chunk(chunk)
+                chunk = []
+    except (ValueError, ValidationError) as exc:
+        # Parsing stops at the first bad item, so everything before it was either committed or is in ``chunk``.
+        detail = {"index": len(results) + len(chunk), "error": str(exc), "created_ids": [i for i, _ in results]}
+        raise HTTPException(status_code=422, detail=detail)
+    if chunk:
+        results += await _insert_task_chunk(chunk)
+    created = sum(1 for _, is_new in results if is_new)
+    return TaskBatchOut(ids=[task_id for task_id, _ in results], created=created, existing=len(results) - created)
+
+
+@app.get("/tasks")
+async def list_tasks(
+    status: TaskStatus | None = None,
+    after: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+):
+    """Tasks in id order, ``limit`` at a time; ``fields=id,status`` trims each item."""
+    selected = _selection(fields, tuple(TaskSummaryOut.__fields__), "fields")
+    async with async_session_scope() as session:
+        stmt = select(Task).order_by(Task.id.asc()).limit(limit + 1)
+        if status is not None:
+            stmt = stmt.where(Task.status == status)
+        if after is not None:
+            stmt = stmt.where(Task.id > after)
+        tasks, next_cursor = _page(list(await session.scalars(stmt)), limit)
+        items = [TaskSummaryOut.from_orm(task).dict(include=selected) for task in tasks]
+    if selected is None:
+        return TaskPage(items=items, next_cursor=next_cursor)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _task_etag(task_id: int, version: int) -> str:
+    return f'"task-{task_id}-v{version}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(
+    task_id: int,
+    fields: str | None = None,
+    include: str | None = None,
+    if_none_match: str | None = Header(default=None),
+):
+    """A task with all its runs, artifacts and decisions by default.
+
+    ``fields`` picks task columns and ``include`` picks relations, so ``?fields=id,status&include=``
+    is a status-only poll. Artifact bodies are never inlined; fetch them per artifact.
+    The ETag is the task version: pollers sending ``If-None-Match`` get a 304 from one primary-key
+    lookup, and unchanged tasks are served from already-serialized bytes. Tasks moved to the
+    archive (orchestrator.archive) are served from it with ``X-Archived: true``.
+    """
+    selected = _selection(fields, tuple(TaskSummaryOut.__fields__), "fields")
+    relations = _selection(include, TASK_RELATIONS, "include")
+    if relations is None:
+        relations = set(TASK_RELATIONS)
+    cache_key = (task_id, tuple(sorted(selected)) if selected is not None else None, tuple(sorted(relations)))
+    async with async_session_scope() as session:
+        version = await session.scalar(select(Task.version).where(Task.id == task_id))
+        if version is None:
+            return await _get_archived_task(session, task_id, selected, relations, cache_key, if_none_match)
+        etag = _task_etag(task_id, version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        body = response_cache.get(cache_key, version)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=headers)
+        stmt = select(Task).where(Task.id == task_id)
+        # One query per included relation instead of one lazy load per relation access.
+        stmt = stmt.options(*(selectinload(getattr(Task, name)) for name in sorted(relations)))
+        task = (await session.scalars(stmt)).first()
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
-        return task
+        if selected is None and relations == set(TASK_RELATIONS):
+            out: Any = _task_out(task)
+        else:
+            out = TaskSummaryOut.from_orm(task).dict(include=selected)
+            if "runs" in relations:
+                out["runs"] = [RunOut.from_orm(run) for run in sorted(task.runs, key=lambda r: r.id)]
+            if "artifacts" in relations:
+                out["artifacts"] = [_artifact_out(a) for a in sorted(task.artifacts, key=lambda a: a.id)]
+            if "decisions" in relations:
+                out["decisions"] = [DecisionOut.from_orm(d) for d in sorted(task.decisions, key=lambda d: d.id)]
+        # The relations may have been read after a concurrent commit, so tag them with the version
+        # loaded alongside them; at worst the next poll re-renders once.
+        version = task.version
+    body = json.dumps(jsonable_encoder(out), separators=(",", ":")).encode()
+    response_cache.put(cache_key, version, body)
+    headers["ETag"] = _task_etag(task_id, version)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
-@app.post("/tasks/{task_id}/approve", response_model=TaskOut)
-def approve_task(task_id: int, comment: str | None = None):
-    with session_scope() as session:
-        task = session.get(Task, task_id)
+async def _get_archived_task(
+    session: AsyncSession,
+    task_id: int,
+    selected: Optional[Set[str]],
+    relations: Set[str],
+    cache_key: Tuple[Any, ...],
+    if_none_match: str | None,
+) -> Response:
+    archived = await session.get(ArchivedTask, task_id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # Archived tasks never change again, so their version keeps validating clients' ETags.
+    headers = {"ETag": _task_etag(task_id, archived.version), "Cache-Control": "no-cache", "X-Archived": "true"}
+    if _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    body = response_cache.get(cache_key, archived.version)
+    if body is None:
+        out = _archived_task_out(archive.archived_document(archived), selected, relations)
+        body = json.dumps(jsonable_encoder(out), separators=(",", ":")).encode()
+        response_cache.put(cache_key, archived.version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _require_task(session: AsyncSession, task_id: int) -> None:
+    if await session.get(Task, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+
+@app.get("/tasks/{task_id}/runs", response_model=RunPage)
+async def list_runs(
+    task_id: int,
+    stage: Stage | None = None,
+    after: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    async with async_session_scope() as session:
+        await _require_task(session, task_id)
+        stmt = select(Run).where(Run.task_id == task_id).order_by(Run.id.asc()).limit(limit + 1)
+        if stage is not None:
+            stmt = stmt.where(Run.stage == stage)
+        if after is not None:
+            stmt = stmt.where(Run.id > after)
+        runs, next_cursor = _page(list(await session.scalars(stmt)), limit)
+        return RunPage(items=[RunOut.from_orm(run) for run in runs], next_cursor=next_cursor)
+
+
+@app.get("/tasks/{task_id}/artifacts", response_model=ArtifactPage)
+async def list_artifacts(
+    task_id: int,
+    kind: str | None = None,
+    after: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include: str | None = None,
+):
+    """Artifact metadata and summaries; ``include=data`` also loads each body from the blob store."""
+    with_data = "data" in (_selection(include, ("data",), "include") or set())
+    async with async_session_scope() as session:
+        await _require_task(session, task_id)
+        stmt = select(Artifact).where(Artifact.task_id == task_id).order_by(Artifact.id.asc()).limit(limit + 1)
+        if kind is not None:
+            stmt = stmt.where(Artifact.kind == kind)
+        if after is not None:
+            stmt = stmt.where(Artifact.id > after)
+        artifacts, next_cursor = _page(list(await session.scalars(stmt)), limit)
+    # Blob reads are file or network I/O; keep them off the event loop.
+    items = [await asyncio.to_thread(_artifact_out, artifact, with_data) for artifact in artifacts]
+    return ArtifactPage(items=items, next_cursor=next_cursor)
+
+
+@app.get("/tasks/{task_id}/artifacts/{artifact_id}", response_model=ArtifactOut)
+async def get_artifact(task_id: int, artifact_id: int):
+    async with async_session_scope() as session:
+        artifact = await session.get(Artifact, artifact_id)
+        if artifact is None:
+            # Archiving deletes the task's artifact rows; the archive document still lists them.
+            archived = await session.get(ArchivedTask, task_id)
+            if archived is not None:
+                return await asyncio.to_thread(_archived_artifact_out, archived, artifact_id)
+        if artifact is None or artifact.task_id != task_id:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+    return await asyncio.to_thread(_artifact_out, artifact, True)
+
+
+async def _run_output_since(task_id: int, run_id: int, after_seq: int) -> tuple[list[tuple[int, str]], RunStatus]:
+    async with async_session_scope() as session:
+        run = await session.get(Run, run_id)
+        if not run or run.task_id != task_id:
+            raise HTTPException(status_code=404, detail="Run not found")
+        chunks = await session.run_sync(chunks_since, run_id, after_seq)
+        return [(chunk.seq, chunk.content) for chunk in chunks], run.status
+
+
+@app.get("/tasks/{task_id}/runs/{run_id}/stream")
+async def stream_run_output(task_id: int, run_id: int, last_event_id: str | None = Header(default=None)):
+    """Server-sent events with a run's model output as it is generated, ending when the run settles.
+
+    A ``reset`` event means the run was restarted (e.g. re-claimed after a worker died): output
+    already received should be discarded, and the chunks that follow are the new output.
+    """
+    after_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+    # Resolve 404s before the response starts streaming.
+    first = await _run_output_since(task_id, run_id, after_seq)
+
+    async def events():
+        nonlocal after_seq
+        chunks, status = first
+        while True:
+            for seq, content in chunks:
+                if after_seq >= 0 and seq != after_seq + 1:
+                    # Chunks of one attempt are numbered without gaps; a gap marks a restart.
+                    yield "event: reset\ndata: {}\n\n"
+                after_seq = seq
+                yield f"id: {seq}\nevent: chunk\ndata: {json.dumps(content)}\n\n"
+            if status not in (RunStatus.PENDING, RunStatus.RUNNING):
+                yield f"event: end\ndata: {json.dumps({'status': status.value})}\n\n"
+                return
+            await asyncio.sleep(settings.stream_poll_seconds)
+            chunks, status = await _run_output_since(task_id, run_id, after_seq)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+TERMINAL_TASK_STATUSES = {TaskStatus.DONE.value, TaskStatus.FAILED.value}
+
+
+@app.get("/tasks/{task_id}/events")
+async def task_events(
+    request: Request,
+    task_id: int,
+    since: int = 0,
+    timeout: float = Query(25.0, ge=0, le=settings.events_long_poll_max_seconds),
+    last_event_id: str | None = Header(default=None),
+):
+    """Task transitions as server-sent events, or as a long poll returning events after ``since``.
+
+    SSE is chosen by ``Accept: text/event-stream`` and resumes from ``Last-Event-ID``. Watchers are
+    fed by the process-wide broker, so they cost no queries of their own after the initial catch-up.
+    Events from parallel branches can commit out of id order and are still delivered late rather
+    than dropped, so delivery is at least once: deduplicate by event id.
+    """
+    async with async_session_scope() as session:
+        task = await session.get(Task, task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
-        decision = Decision(task_id=task.id, kind=DecisionKind.HUMAN_APPROVAL, decision=DecisionValue.APPROVE, comment=comment)
-        session.add(decision)
-        session.refresh(task)
-        return task
+        finished = task.status.value in TERMINAL_TASK_STATUSES
+    # Subscribe before reading the backlog so an event committed in between is not lost.
+    queue = broker.subscribe(task_id)
+    if "text/event-stream" not in request.headers.get("accept", ""):
+        try:
+            events = await events_since(task_id, since)
+            if not events and timeout > 0 and not finished:
+                try:
+                    events = [await asyncio.wait_for(queue.get(), timeout)]
+                except asyncio.TimeoutError:
+                    pass
+            if events:
+                # Let transactions holding lower ids commit, so the cursor does not pass over them.
+                await broker.settled(max(event.id for event in events), SETTLE_SECONDS)
+            by_id = {event.id: event for event in events}
+            while not queue.empty():
+                event = queue.get_nowait()
+                by_id.setdefault(event.id, event)
+            events = [by_id[event_id] for event_id in sorted(by_id)]
+        finally:
+            broker.unsubscribe(task_id, queue)
+        return TaskEventPage(events=events, cursor=max([since] + [event.id for event in events]))
+
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else since
+
+    async def stream():
+        nonlocal cursor
+        # Ids already sent on this connection; the broker may hand over a late, lower id at any time.
+        delivered: Set[int] = set()
+
+        def message(event: TaskEventOut) -> str:
+            nonlocal cursor
+            delivered.add(event.id)
+            # The SSE id is the resume point, so it never moves backwards.
+            cursor = max(cursor, event.id)
+            return f"id: {cursor}\nevent: {event.kind}\ndata: {event.json()}\n\n"
+
+        try:
+            while True:
+                backlog = await events_since(task_id, cursor)
+                for event in backlog:
+                    yield message(event)
+                if len(backlog) < FETCH_LIMIT:
+                    break
+            if finished:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event.id in delivered:
+                    continue
+                yield message(event)
+                if event.kind == "task_status" and event.status in TERMINAL_TASK_STATUSES:
+                    return
+        finally:
+            broker.unsubscribe(task_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/tasks/{task_id}/trace", response_model=TaskTraceOut)
+async def get_task_trace(task_id: int, spans: bool = False):
+    """Critical path through the task's run spans, read from the local JSONL trace files."""
+    async with async_session_scope() as session:
+        await _require_task(session, task_id)
+    trace_id = tracing.trace_id_for(task_id)
+    found = await asyncio.to_thread(tracing.load_trace, trace_id)
+    finished = [s for s in found if s.get("end") is not None]
+    duration = max((s["end"] for s in finished), default=0.0) - min((s["start"] for s in finished), default=0.0)
+    return TaskTraceOut(
+        trace_id=trace_id,
+        sampled=tracing.sampled(trace_id),
+        span_count=len(found),
+        duration=duration,
+        critical_path=tracing.critical_path(found),
+        spans=found if spans else None,
+    )
+
+
+def _approve_task(session: Session, task_id: int, comment: str | None) -> TaskOut:
+    task = session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    lock_task(session, task)
+    decision = Decision(task_id=task.id, kind=DecisionKind.HUMAN_APPROVAL, decision=DecisionValue.APPROVE, comment=comment)
+    session.add(decision)
+    resume_waiting_runs(session, task, Stage.HUMAN_APPROVAL)
+    session.flush()
+    session.refresh(task)
+    return _task_out(task)
+
+
+@app.post("/tasks/{task_id}/approve", response_model=TaskOut)
+async def approve_task(task_id: int, comment: str | None = None):
+    async with async_session_scope() as session:
+        return await session.run_sync(_approve_task, task_id, comment)
+
+
+def _reject_task(session: Session, task_id: int, comment: str) -> TaskOut:
+    task = session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    lock_task(session, task)
+    decision = Decision(task_id=task.id, kind=DecisionKind.HUMAN_APPROVAL, decision=DecisionValue.REJECT, comment=comment)
+    session.add(decision)
+    set_task_status(session, task, TaskStatus.FAILED)
+    # The task is failed outright, so close the parked run here instead of waking a worker for it.
+    for run in waiting_runs(session, task, Stage.HUMAN_APPROVAL):
+        fail_run(session, run, comment)
+    session.flush()
+    session.refresh(task)
+    return _task_out(task)
 
 
 @app.post("/tasks/{task_id}/reject", response_model=TaskOut)
-def reject_task(task_id: int, comment: str):
+async def reject_task(task_id: int, comment: str):
     if not comment:
         raise HTTPException(status_code=400, detail="Comment required")
-    with session_scope() as session:
-        task = session.get(Task, task_id)
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        decision = Decision(task_id=task.id, kind=DecisionKind.HUMAN_APPROVAL, decision=DecisionValue.REJECT, comment=comment)
-        task.status = TaskStatus.FAILED
-        session.add(decision)
-        session.add(task)
-        session.refresh(task)
-        return task
+    async with async_session_scope() as session:
+        return await session.run_sync(_reject_task, task_id, comment)
+
+
+def _kick(session: Session, task_id: int) -> int:
+    if session.get(Task, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    stmt = (
+        update(Run)
+        .where(Run.task_id == task_id, Run.status == RunStatus.PENDING, Run.not_before.is_not(None))
+        .values(not_before=None)
+        .execution_options(synchronize_session=False)
+    )
+    due = session.execute(stmt).rowcount or 0
+    if due:
+        # A Core UPDATE bypasses the unit of work, and the runs' updated_at changed with it.
+        touch_tasks(session, [task_id])
+    notify_on_commit(session, RUNS_CHANNEL)
+    return due
 
 
 @app.post("/tasks/{task_id}/kick")
-def kick_worker(task_id: int):
-    # Run worker once for manual trigger
-    if run_once():
-        return {"status": "processed"}
-    return {"status": "no_work"}
+async def kick_worker(task_id: int):
+    """Make the task's deferred runs due now and wake the workers; processing stays in the worker."""
+    async with async_session_scope() as session:
+        rescheduled = await session.run_sync(_kick, task_id)
+    return {"status": "signalled", "rescheduled_runs": rescheduled}
+
+
+@app.post("/webhooks/github")
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(...),
+    x_hub_signature_256: str | None = Header(default=None),
+):
+    if not settings.github_webhook_secret:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+    body = await request.body()
+    if not verify_github_signature(settings.github_webhook_secret, body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    if x_github_event == "ping":
+        return {"status": "pong"}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    async with async_session_scope() as session:
+        woken = await session.run_sync(record_github_event, x_github_event, payload)
+    if woken is None:
+        return {"status": "ignored"}
+    return {"status": "recorded", "woken_runs": woken}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of this process's metrics plus current queue depth."""
+    active = (RunStatus.PENDING, RunStatus.RUNNING, RunStatus.WAITING)
+    async with async_session_scope() as session:
+        stmt = select(Run.stage, Run.status, func.count()).where(Run.status.in_(active)).group_by(Run.stage, Run.status)
+        rows = (await session.execute(stmt)).all()
+    metrics.RUNS_ACTIVE.set_all(({"stage": stage.value, "status": status.value}, count) for stage, status, count in rows)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _require_admin(authorization: str | None) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=503, detail="Admin token not configured")
+    if not verify_bearer_token(settings.admin_token, authorization):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/admin/profiles")
+async def handler_profiles(
+    stage: str | None = None,
+    sort: str = Query(default="cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(default=30, ge=1, le=500),
+    authorization: str | None = Header(default=None),
+):
+    """Aggregated handler profiles per stage from every worker's periodic dumps; needs ADMIN_TOKEN."""
+    _require_admin(authorization)
+    stages = await asyncio.to_thread(profiling.summary, stage, sort, limit)
+    return {"sample_rate": profiling.sample_rate(), "max_sample_rate": profiling.MAX_SAMPLE_RATE, "stages": stages}
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
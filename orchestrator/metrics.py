@@ -0,0 +1,254 @@
+"""In-process Prometheus metrics: counters, gauges and histograms rendered in text format."""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from orchestrator.util import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for both millisecond DB work and multi-minute LLM stages.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Sample lines for this metric; the registry adds the HELP/TYPE header."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def set_all(self, samples: Iterable[Sample]) -> None:
+        """Replace every series at once, so label sets that disappeared stop being reported."""
+        values = {self._key(labels): value for labels, value in samples}
+        with self.lock:
+            self.values = values
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, with +Inf last; sum)
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self.values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Values computed at scrape time, e.g. from stats another module already keeps."""
+
+    def __init__(
+        self, name: str, documentation: str, kind: str, labelnames: Sequence[str], fn: Callable[[], Iterable[Sample]]
+    ) -> None:
+        self.kind = kind
+        self.fn = fn
+        super().__init__(name, documentation, labelnames)
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, value in self.fn():
+            key = self._key(labels)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        with self.lock:
+            self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                body = metric.render()
+            except Exception:  # noqa: BLE001
+                # A failing callback must not take the rest of the scrape down with it.
+                logger.exception("Failed to render metric %s", metric.name)
+                continue
+            lines += metric.header() + body
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return None
+
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread, for processes without an API (the worker)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+# Pipeline
+RUN_QUEUE_WAIT = Histogram(
+    "orchestrator_run_queue_wait_seconds", "Time from a run becoming claimable to being claimed.", ["stage"]
+)
+STAGE_DURATION = Histogram(
+    "orchestrator_stage_duration_seconds", "Time spent processing a claimed run, by outcome.", ["stage", "outcome"]
+)
+RUNS_ACTIVE = Gauge("orchestrator_runs", "Runs currently pending, running or waiting.", ["stage", "status"])
+RUN_TRANSITIONS = Counter("orchestrator_run_transitions_total", "Run status changes.", ["stage", "status"])
+RUN_RETRIES = Counter("orchestrator_run_retries_total", "Failed runs retried at the same stage.", ["stage"])
+RUN_REWORKS = Counter("orchestrator_run_reworks_total", "Earlier stages re-enqueued by a failing review.", ["stage"])
+
+# External calls
+LLM_REQUEST_DURATION = Histogram(
+    "orchestrator_llm_request_seconds", "Upstream LLM request latency (cache hits excluded).", ["role", "mode"]
+)
+GITHUB_REQUEST_DURATION = Histogram(
+    "orchestrator_github_request_seconds", "GitHub API request latency per attempt.", ["method", "status"]
+)
+
+# Database
+DB_SESSION_DURATION = Histogram(
+    "orchestrator_db_session_seconds", "Lifetime of a database session scope.", ["mode", "outcome"]
+)
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "CallbackMetric",
+    "REGISTRY",
+    "render",
+    "start_http_server",
+    "RUN_QUEUE_WAIT",
+    "RUNS_ACTIVE",
+    "STAGE_DURATION",
+    "RUN_TRANSITIONS",
+    "RUN_RETRIES",
+    "RUN_REWORKS",
+    "LLM_REQUEST_DURATION",
+    "GITHUB_REQUEST_DURATION",
+    "DB_SESSION_DURATION",
+]
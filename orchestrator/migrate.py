@@ -0,0 +1,279 @@
+"""Versioned schema migrations: applies migrations/NNN_*.sql once each, in order, under an advisory lock."""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from orchestrator.config import get_settings
+from orchestrator.db import engine as default_engine
+from orchestrator.models import Base, SchemaMigration
+from orchestrator.util import logger
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+# Arbitrary constant identifying the migration runner's Postgres advisory lock.
+MIGRATE_LOCK_KEY = 0x4D494752
+PARTITIONABLE_TABLES = ("runs", "artifacts")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), path))
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def _applied(conn: Connection) -> Dict[str, str]:
+    return dict(conn.execute(select(SchemaMigration.version, SchemaMigration.checksum)).all())
+
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(
+        insert(SchemaMigration).values(
+            version=migration.version, name=migration.name, checksum=migration.checksum, applied_at=datetime.utcnow()
+        )
+    )
+
+
+def upgrade(engine: Optional[Engine] = None) -> List[str]:
+    """Apply pending migrations; returns the versions applied.
+
+    The SQL files target Postgres. Other databases (SQLite in development and benchmarks) get the
+    ORM schema from ``create_all`` and every migration is stamped as applied.
+    """
+    engine = engine or default_engine
+    if engine.dialect.name != "postgresql":
+        return _create_all_and_stamp(engine)
+    settings = get_settings()
+    applied_now: List[str] = []
+    with engine.connect() as conn:
+        # Session-level lock: held across the per-migration transactions, so concurrent boots
+        # of the API wait here and then find nothing left to do.
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATE_LOCK_KEY})
+        conn.commit()
+        try:
+            with conn.begin():
+                SchemaMigration.__table__.create(conn, checkfirst=True)
+                applied = _applied(conn)
+            for migration in discover():
+                if migration.version in applied:
+                    if applied[migration.version] != migration.checksum:
+                        logger.warning("Migration %s_%s changed after it was applied", migration.version, migration.name)
+                    continue
+                logger.info("Applying migration %s_%s", migration.version, migration.name)
+                with conn.begin():
+                    conn.execution_options(no_parameters=True).exec_driver_sql(migration.sql)
+                    _record(conn, migration)
+                applied_now.append(migration.version)
+            for table in partitioned_tables():
+                # Not fatal: the schema is usable without new partitions (rows fall into the default
+                # one), and the worker retries ensure_all_partitions periodically.
+                try:
+                    with conn.begin():
+                        if not is_partitioned(conn, table):
+                            partition_table(conn, table, settings.db_partition_months_ahead)
+                        ensure_partitions(conn, table, settings.db_partition_months_ahead)
+                except Exception:  # noqa: BLE001
+                    logger.exception("Partitioning %s failed", table)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATE_LOCK_KEY})
+            conn.commit()
+    return applied_now
+
+
+def _create_all_and_stamp(engine: Engine) -> List[str]:
+    Base.metadata.create_all(bind=engine)
+    stamped: List[str] = []
+    with engine.begin() as conn:
+        applied = _applied(conn)
+        for migration in discover():
+            if migration.version not in applied:
+                _record(conn, migration)
+                stamped.append(migration.version)
+    return stamped
+
+
+def status(engine: Optional[Engine] = None) -> List[Tuple[str, str, bool]]:
+    """(version, name, applied) for every migration file."""
+    engine = engine or default_engine
+    with engine.connect() as conn:
+        applied = _applied(conn) if engine.dialect.has_table(conn, SchemaMigration.__tablename__) else {}
+    return [(m.version, m.name, m.version in applied) for m in discover()]
+
+
+# Monthly range partitioning (Postgres only) -------------------------------------------------
+
+
+def partitioned_tables() -> List[str]:
+    tables = [t.strip() for t in get_settings().db_partitioned_tables.split(",") if t.strip()]
+    unknown = set(tables) - set(PARTITIONABLE_TABLES)
+    if unknown:
+        raise RuntimeError(f"DB_PARTITIONED_TABLES may only name {', '.join(PARTITIONABLE_TABLES)}; got {sorted(unknown)}")
+    # runs first: artifacts' foreign key to runs is dropped when runs is converted.
+    return [t for t in PARTITIONABLE_TABLES if t in tables]
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return conn.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}) == "p"
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _create_month(conn: Connection, table: str, start: date) -> None:
+    end = _month_start(start, 1)
+    conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {table}_y{start.year}m{start.month:02d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(conn: Connection, table: str, months_ahead: int) -> None:
+    """Create this month's and the next ``months_ahead`` monthly partitions if missing.
+
+    Rows outside every monthly range land in the ``<table>_default`` partition, so inserts never
+    fail; but a month's partition can only be created while the default holds none of its rows,
+    hence creating them ahead of time.
+    """
+    today = datetime.utcnow().date()
+    for offset in range(months_ahead + 1):
+        _create_month(conn, table, _month_start(today, offset))
+
+
+def ensure_all_partitions(engine: Optional[Engine] = None) -> None:
+    """Run ensure_partitions for every partitioned table; a no-op outside Postgres."""
+    engine = engine or default_engine
+    if engine.dialect.name != "postgresql":
+        return
+    for table in partitioned_tables():
+        with engine.begin() as conn:
+            if is_partitioned(conn, table):
+                ensure_partitions(conn, table, get_settings().db_partition_months_ahead)
+
+
+def partition_table(conn: Connection, table: str, months_ahead: int) -> None:
+    """Rebuild ``table`` as a table range-partitioned by month on created_at, keeping its rows.
+
+    The primary key becomes (id, created_at), as Postgres requires the partition key in unique
+    constraints; foreign keys from other tables into ``table`` are dropped for the same reason.
+    Takes an ACCESS EXCLUSIVE lock and copies every row, so run it in a maintenance window.
+    """
+    logger.warning("Converting %s to monthly range partitions", table)
+    conn.exec_driver_sql(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    old = f"{table}_unpartitioned"
+    indexes = conn.execute(
+        text(
+            "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+            "WHERE x.indrelid = to_regclass(:t) AND NOT x.indisprimary"
+        ),
+        {"t": table},
+    ).all()
+    outgoing = conn.execute(
+        text(
+            "SELECT conname, pg_get_constraintdef(oid), confrelid::regclass::text FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:t) AND contype = 'f'"
+        ),
+        {"t": table},
+    ).all()
+    incoming = conn.execute(
+        text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = to_regclass(:t) AND contype = 'f'"
+        ),
+        {"t": table},
+    ).all()
+    pkey = conn.scalar(text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'p'"), {"t": table})
+    sequence = conn.scalar(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table})
+
+    for referencing, name in incoming:
+        logger.warning("Dropping foreign key %s on %s (it cannot reference a partitioned table)", name, referencing)
+        conn.exec_driver_sql(f'ALTER TABLE {referencing} DROP CONSTRAINT "{name}"')
+    for name, _ in indexes:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    conn.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {old}")
+    if pkey:
+        conn.exec_driver_sql(f'ALTER TABLE {old} RENAME CONSTRAINT "{pkey}" TO "{old}_pkey"')
+
+    conn.exec_driver_sql(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    conn.exec_driver_sql(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)")
+    conn.exec_driver_sql(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    oldest = conn.scalar(text(f"SELECT min(created_at) FROM {old}"))
+    today = datetime.utcnow().date()
+    month = _month_start(oldest.date() if oldest else today)
+    while month <= _month_start(today, months_ahead):
+        _create_month(conn, table, month)
+        month = _month_start(month, 1)
+    conn.exec_driver_sql(f"INSERT INTO {table} SELECT * FROM {old}")
+    if sequence:
+        conn.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+
+    for _, definition in indexes:
+        conn.exec_driver_sql(definition)
+    for name, definition, target in outgoing:
+        if is_partitioned(conn, target):
+            logger.warning("Not restoring foreign key %s on %s: %s is partitioned", name, table, target)
+            continue
+        conn.exec_driver_sql(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "ensure-partitions"])
+    args = parser.parse_args(argv)
+    if args.command == "status":
+        for version, name, applied in status():
+            print(f"{version} {'applied' if applied else 'pending'}  {name}")
+        return
+    if args.command == "ensure-partitions":
+        ensure_all_partitions()
+        return
+    applied = upgrade()
+    print(f"Applied {len(applied)} migration(s){': ' + ', '.join(applied) if applied else ''}")
+
+
+__all__ = [
+    "Migration",
+    "discover",
+    "upgrade",
+    "status",
+    "partitioned_tables",
+    "is_partitioned",
+    "ensure_partitions",
+    "ensure_all_partitions",
+    "partition_table",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Integer, JSON, String, Text
+from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Index, Integer, JSON, LargeBinary, String, Text, text
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -19,6 +19,7 @@ class TaskStatus(str, Enum):
 class RunStatus(str, Enum):
     PENDING = "PENDING"
     RUNNING = "RUNNING"
+    WAITING = "WAITING"
     PASS = "PASS"
     FAIL = "FAIL"
 
@@ -49,13 +50,19 @@ class DecisionValue(str, Enum):
     REJECT = "REJECT"
 
 
+# Enum columns are VARCHAR, as created by migrations/001_init.sql. A native enum type here would make
+# asyncpg cast parameters to types (e.g. ``$1::taskstatus``) that no migration creates.
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
     raw_request = Column(Text, nullable=False)
-    status = Column(SAEnum(TaskStatus), default=TaskStatus.PENDING, nullable=False)
+    status = Column(SAEnum(TaskStatus, native_enum=False, length=32), default=TaskStatus.PENDING, nullable=False)
+    pr_number = Column(Integer, nullable=True, index=True)
+    idempotency_key = Column(String(255), nullable=True, unique=True, index=True)
+    # Incremented once per committed transaction that changes the task or its runs, artifacts or decisions.
+    version = Column(Integer, default=1, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -63,47 +70,196 @@ class Task(Base):
     artifacts = relationship("Artifact", back_populates="task", cascade="all, delete-orphan")
     decisions = relationship("Decision", back_populates="task", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_tasks_status_id", "status", "id"),
+        Index(
+            "ix_tasks_finished_updated_at",
+            "updated_at",
+            postgresql_where=text("status IN ('DONE', 'FAILED')"),
+            sqlite_where=text("status IN ('DONE', 'FAILED')"),
+        ),
+    )
+
 
 class Run(Base):
     __tablename__ = "runs"
 
     id = Column(Integer, primary_key=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
-    stage = Column(SAEnum(Stage), nullable=False)
-    status = Column(SAEnum(RunStatus), default=RunStatus.PENDING, nullable=False)
+    stage = Column(SAEnum(Stage, native_enum=False, length=64), nullable=False)
+    status = Column(SAEnum(RunStatus, native_enum=False, length=32), default=RunStatus.PENDING, nullable=False)
     attempt = Column(Integer, default=1, nullable=False)
     max_attempts = Column(Integer, default=3, nullable=False)
     payload = Column(JSON, nullable=True)
     result = Column(JSON, nullable=True)
     error = Column(Text, nullable=True)
+    claimed_by = Column(String(128), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    not_before = Column(DateTime, nullable=True)
+    trace_id = Column(String(32), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     task = relationship("Task", back_populates="runs")
 
+    __table_args__ = (
+        Index("ix_runs_task_id_id", "task_id", "id"),
+        # Partial indexes keep the claim query and the stale-claim sweep independent of history size.
+        Index(
+            "ix_runs_pending_queue",
+            "status",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        Index(
+            "ix_runs_running_claimed_at",
+            "claimed_at",
+            postgresql_where=text("status = 'RUNNING'"),
+            sqlite_where=text("status = 'RUNNING'"),
+        ),
+        Index("ix_runs_task_id_stage_status", "task_id", "stage", "status"),
+        Index(
+            "ix_runs_pending_not_before",
+            "not_before",
+            postgresql_where=text("status = 'PENDING' AND not_before IS NOT NULL"),
+            sqlite_where=text("status = 'PENDING' AND not_before IS NOT NULL"),
+        ),
+        Index(
+            "ix_runs_active_stage_status",
+            "stage",
+            "status",
+            postgresql_where=text("status IN ('PENDING', 'RUNNING', 'WAITING')"),
+            sqlite_where=text("status IN ('PENDING', 'RUNNING', 'WAITING')"),
+        ),
+    )
+
 
 class Artifact(Base):
     __tablename__ = "artifacts"
 
     id = Column(Integer, primary_key=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
-    run_id = Column(Integer, ForeignKey("runs.id"), nullable=True)
+    run_id = Column(Integer, ForeignKey("runs.id"), nullable=True, index=True)
     kind = Column(String(64), nullable=False)
-    data = Column(JSON, nullable=False)
+    # Payloads live in the blob store under blob_sha256; data is only set on rows written before it.
+    data = Column(JSON, nullable=True)
+    blob_sha256 = Column(String(64), nullable=True)
+    size = Column(Integer, nullable=True)
+    summary = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     task = relationship("Task", back_populates="artifacts")
     run = relationship("Run")
 
+    __table_args__ = (
+        # Serves the incremental "artifacts of task X newer than id N" context query and kind lookups.
+        Index("ix_artifacts_task_id_id", "task_id", "id"),
+        Index("ix_artifacts_task_id_kind", "task_id", "kind"),
+    )
+
 
 class Decision(Base):
     __tablename__ = "decisions"
 
     id = Column(Integer, primary_key=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
-    kind = Column(SAEnum(DecisionKind), nullable=False)
-    decision = Column(SAEnum(DecisionValue), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    kind = Column(SAEnum(DecisionKind, native_enum=False, length=64), nullable=False)
+    decision = Column(SAEnum(DecisionValue, native_enum=False, length=32), nullable=False)
     comment: Optional[str] = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     task = relationship("Task", back_populates="decisions")
+
+
+class PullRequestStatus(Base):
+    """Latest CI/mergeability state of a PR as reported by GitHub webhooks."""
+
+    __tablename__ = "pull_request_statuses"
+
+    pr_number = Column(Integer, primary_key=True)
+    head_sha = Column(String(64), nullable=True)
+    mergeable_state = Column(String(32), nullable=True)
+    checks_status = Column(String(32), nullable=True)
+    checks_conclusion = Column(String(32), nullable=True)
+    # Per check suite (keyed by GitHub app id) status and conclusion for head_sha; checks_* combine them.
+    check_suites = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class LLMCacheEntry(Base):
+    """Durable tier of the LLM response cache, shared by all workers."""
+
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), primary_key=True)
+    role = Column(String(64), nullable=False)
+    response = Column(JSON, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RunOutputChunk(Base):
+    """Partial model output persisted while a streaming run is still generating."""
+
+    __tablename__ = "run_output_chunks"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("runs.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_run_output_chunks_run_id_seq", "run_id", "seq", unique=True),)
+
+
+class TaskEvent(Base):
+    """Append-only log of pipeline transitions, read by event-stream watchers."""
+
+    __tablename__ = "task_events"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    run_id = Column(Integer, ForeignKey("runs.id"), nullable=True, index=True)
+    kind = Column(String(32), nullable=False)
+    stage = Column(String(32), nullable=True)
+    status = Column(String(32), nullable=True)
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    run = relationship("Run")
+
+    __table_args__ = (Index("ix_task_events_task_id_id", "task_id", "id"),)
+
+
+class ArchivedTask(Base):
+    """A finished task moved out of the hot tables: one compressed JSON document per task.
+
+    The document holds the task with its runs, artifact rows (payloads stay in the blob store),
+    decisions and events, as written by orchestrator.archive.
+    """
+
+    __tablename__ = "archived_tasks"
+
+    task_id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    status = Column(String(32), nullable=False)
+    version = Column(Integer, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    codec = Column(String(8), nullable=False)
+    # Uncompressed size of the document.
+    size = Column(Integer, nullable=False)
+    document = Column(LargeBinary, nullable=False)
+
+
+class SchemaMigration(Base):
+    """Files from migrations/ that have been applied, written by orchestrator.migrate."""
+
+    __tablename__ = "schema_migrations"
+
+    version = Column(String(32), primary_key=True)
+    name = Column(String(255), nullable=False)
+    checksum = Column(String(64), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
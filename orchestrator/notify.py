@@ -0,0 +1,175 @@
+"""Commit-time notifications that wake idle workers."""
+from __future__ import annotations
+
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Protocol
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from orchestrator.util import logger
+
+RUNS_CHANNEL = "orchestrator_runs"
+TASK_EVENTS_CHANNEL = "orchestrator_task_events"
+
+_PENDING_KEY = "pending_notifications"
+
+
+class Subscription(Protocol):
+    def wait(self, timeout: float) -> bool:
+        """Block until a notification arrives or ``timeout`` elapses; True if notified."""
+
+    def close(self) -> None:
+        ...
+
+
+class InProcessSubscription:
+    def __init__(self, notifier: "InProcessNotifier", channel: str) -> None:
+        self.notifier = notifier
+        self.channel = channel
+        self.seen = notifier.counter(channel)
+
+    def wait(self, timeout: float) -> bool:
+        with self.notifier.cond:
+            notified = self.notifier.cond.wait_for(lambda: self.notifier.counters[self.channel] != self.seen, timeout)
+            self.seen = self.notifier.counters[self.channel]
+        return notified
+
+    def close(self) -> None:
+        return None
+
+
+class InProcessNotifier:
+    """Condition-variable notifier for SQLite and single-process setups."""
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def counter(self, channel: str) -> int:
+        with self.cond:
+            return self.counters[channel]
+
+    def notify(self, channel: str, payload: str = "") -> None:
+        with self.cond:
+            self.counters[channel] += 1
+            self.cond.notify_all()
+
+    def subscribe(self, channel: str) -> InProcessSubscription:
+        return InProcessSubscription(self, channel)
+
+
+class PostgresSubscription:
+    def __init__(self, engine: Engine, channel: str) -> None:
+        self.engine = engine
+        self.channel = channel
+        self.conn = None
+        try:
+            self._connect()
+        except Exception:  # noqa: BLE001
+            # wait() retries the connection; until then callers poll on their timeout.
+            logger.exception("LISTEN on %s failed; falling back to polling", self.channel)
+
+    def _connect(self) -> None:
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        self._raw = raw
+        self.conn = conn
+
+    def wait(self, timeout: float) -> bool:
+        try:
+            if self.conn is None:
+                self._connect()
+            if not self.conn.notifies:
+                ready, _, _ = select.select([self.conn], [], [], timeout)
+                if ready:
+                    self.conn.poll()
+            notified = bool(self.conn.notifies)
+            self.conn.notifies.clear()
+            return notified
+        except Exception:  # noqa: BLE001
+            logger.exception("LISTEN connection for %s failed; falling back to polling", self.channel)
+            self.close()
+            # Returning at once would make every caller's wait loop spin while LISTEN keeps failing
+            # (e.g. behind a transaction-mode pgbouncer); block for the timeout like a plain poll.
+            time.sleep(timeout)
+            return False
+
+    def close(self) -> None:
+        if self.conn is not None:
+            try:
+                self._raw.invalidate()
+            except Exception:  # noqa: BLE001
+                pass
+        self.conn = None
+
+
+class PostgresNotifier:
+    """LISTEN/NOTIFY notifier that reaches workers in other processes and containers.
+
+    Notifications are sent by ``notify_on_commit`` inside the committing transaction.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+
+    def subscribe(self, channel: str) -> PostgresSubscription:
+        return PostgresSubscription(self.engine, channel)
+
+
+@lru_cache()
+def get_notifier() -> InProcessNotifier | PostgresNotifier:
+    from orchestrator.db import engine
+
+    if engine.dialect.name == "postgresql":
+        return PostgresNotifier(engine)
+    return InProcessNotifier()
+
+
+def notify_on_commit(session: Session, channel: str, payload: str = "") -> None:
+    """Queue a notification that is delivered only if the session's transaction commits."""
+    session.info.setdefault(_PENDING_KEY, set()).add((channel, payload))
+
+
+@event.listens_for(Session, "before_commit")
+def _send_pg_notifications(session: Session) -> None:
+    pending = session.info.get(_PENDING_KEY)
+    if not pending or session.get_bind().dialect.name != "postgresql":
+        return
+    # NOTIFY is transactional in Postgres: listeners see it only once the new rows are visible.
+    for channel, payload in pending:
+        session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+@event.listens_for(Session, "after_commit")
+def _send_local_notifications(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    notifier = get_notifier()
+    if isinstance(notifier, InProcessNotifier):
+        for channel, payload in pending:
+            notifier.notify(channel, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_notifications(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+__all__ = [
+    "RUNS_CHANNEL",
+    "TASK_EVENTS_CHANNEL",
+    "InProcessNotifier",
+    "PostgresNotifier",
+    "get_notifier",
+    "notify_on_commit",
+]
@@ -1,10 +1,14 @@
 """Pipeline orchestration logic."""
 from __future__ import annotations
 
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
+from sqlalchemy import event, insert, select, update
 from sqlalchemy.orm import Session
 
+from orchestrator.blobstore import load_payload, store_payload, summarize
+from orchestrator.metrics import RUN_REWORKS, RUN_RETRIES, RUN_TRANSITIONS, Counter
 from orchestrator.models import (
     Artifact,
     Decision,
@@ -14,46 +18,260 @@ from orchestrator.models import (
     RunStatus,
     Stage,
     Task,
+    TaskEvent,
     TaskStatus,
 )
-from orchestrator.schemas import ContextPack, GateDecision, ReviewResult, TaskSpec, WorkItem
+from orchestrator.notify import RUNS_CHANNEL, TASK_EVENTS_CHANNEL, notify_on_commit
+from orchestrator.schemas import ContextPack, GateDecision, ReviewResult, TaskCreate, TaskSpec, WorkItem
+from orchestrator.tracing import trace_id_for
 from orchestrator.util import logger
 
 
+_TOUCHED_KEY = "touched_task_ids"
+_COUNTS_KEY = "pending_metric_counts"
+
+
+def touch_tasks(session: Session, task_ids: Iterable[int]) -> None:
+    """Bump these tasks' version when the transaction commits.
+
+    ORM changes to a task or its runs, artifacts and decisions are tracked automatically;
+    call this after bulk UPDATEs that bypass the unit of work.
+    """
+    session.info.setdefault(_TOUCHED_KEY, set()).update(task_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_touched_tasks(session: Session, flush_context, instances) -> None:
+    touched = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Task):
+            # New tasks start at version 1; only changes to existing ones need a bump.
+            if obj.id is not None and (obj in session.deleted or session.is_modified(obj)):
+                touched.add(obj.id)
+        elif isinstance(obj, (Run, Artifact, Decision)) and obj.task_id is not None:
+            if obj in session.new or obj in session.deleted or session.is_modified(obj):
+                touched.add(obj.task_id)
+    if touched:
+        touch_tasks(session, touched)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_task_versions(session: Session) -> None:
+    # before_commit runs ahead of the final flush; flush now so its changes are counted too.
+    session.flush()
+    touched = session.info.pop(_TOUCHED_KEY, None)
+    if not touched:
+        return
+    # One bump per task per transaction, however many rows of it changed.
+    session.execute(
+        update(Task)
+        .where(Task.id.in_(sorted(touched)))
+        .values(version=Task.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_touched_tasks(session: Session) -> None:
+    session.info.pop(_TOUCHED_KEY, None)
+
+
+def count_on_commit(session: Session, counter: Counter, amount: float = 1.0, **labels: str) -> None:
+    """Increment ``counter`` once the transaction commits; rolled-back work is never counted."""
+    session.info.setdefault(_COUNTS_KEY, []).append((counter, amount, labels))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_counts(session: Session) -> None:
+    for counter, amount, labels in session.info.pop(_COUNTS_KEY, ()):
+        counter.inc(amount, **labels)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_counts(session: Session) -> None:
+    session.info.pop(_COUNTS_KEY, None)
+
+
+def emit_event(session: Session, task_id: int, kind: str, run: Run | None = None, status: str | None = None, **data: Any) -> None:
+    """Append to the task's event log; watchers are woken once the transaction commits."""
+    session.add(
+        TaskEvent(
+            task_id=task_id,
+            run=run,
+            kind=kind,
+            stage=run.stage.value if run is not None else None,
+            status=status,
+            data=data or None,
+        )
+    )
+    notify_on_commit(session, TASK_EVENTS_CHANNEL)
+    if run is not None and status is not None:
+        count_on_commit(session, RUN_TRANSITIONS, stage=run.stage.value, status=status)
+
+
+def set_task_status(session: Session, task: Task, status: TaskStatus) -> None:
+    if task.status == status:
+        return
+    task.status = status
+    session.add(task)
+    emit_event(session, task.id, "task_status", status=status.value)
+
+
+def enqueue_run(session: Session, run: Run) -> None:
+    """Add a pending run and wake idle workers once the transaction commits."""
+    if run.trace_id is None:
+        run.trace_id = trace_id_for(run.task_id)
+    if run.id is None:
+        emit_event(session, run.task_id, "run_enqueued", run, RunStatus.PENDING.value, attempt=run.attempt)
+    session.add(run)
+    notify_on_commit(session, RUNS_CHANNEL)
+
+
 def create_initial_runs(task: Task, session: Session, max_attempts: int) -> None:
     """Seed the pipeline with the Product stage."""
     run = Run(task_id=task.id, stage=Stage.PRODUCT, status=RunStatus.PENDING, attempt=1, max_attempts=max_attempts)
-    session.add(run)
+    enqueue_run(session, run)
+
+
+def create_tasks(session: Session, items: Sequence[TaskCreate], max_attempts: int) -> List[Tuple[int, bool]]:
+    """Insert tasks and their Product runs with one multi-row INSERT each.
+
+    Returns ``(task_id, created)`` per item, in order. Items whose idempotency key already exists
+    (or repeats earlier in ``items``) resolve to the existing task instead of creating another.
+    """
+    keys = {item.idempotency_key for item in items if item.idempotency_key}
+    known: Dict[str, int] = {}
+    if keys:
+        rows = session.execute(select(Task.idempotency_key, Task.id).where(Task.idempotency_key.in_(keys)))
+        known = {key: task_id for key, task_id in rows}
+    new_items: List[TaskCreate] = []
+    for item in items:
+        if item.idempotency_key and item.idempotency_key in known:
+            continue
+        if item.idempotency_key:
+            known[item.idempotency_key] = -1  # claimed by this batch; id filled in below
+        new_items.append(item)
+    new_ids: List[int] = []
+    if new_items:
+        now = datetime.utcnow()
+        stmt = insert(Task).returning(Task.id, sort_by_parameter_order=True)
+        new_ids = list(
+            session.scalars(
+                stmt,
+                [
+                    {
+                        "title": item.title,
+                        "raw_request": item.raw_request,
+                        "status": TaskStatus.PENDING,
+                        "idempotency_key": item.idempotency_key,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for item in new_items
+                ],
+            )
+        )
+        run_ids = list(
+            session.scalars(
+                insert(Run).returning(Run.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "task_id": task_id,
+                        "stage": Stage.PRODUCT,
+                        "status": RunStatus.PENDING,
+                        "attempt": 1,
+                        "max_attempts": max_attempts,
+                        "trace_id": trace_id_for(task_id),
+                    }
+                    for task_id in new_ids
+                ],
+            )
+        )
+        # The same run_enqueued events enqueue_run emits, written in one INSERT.
+        session.execute(
+            insert(TaskEvent),
+            [
+                {
+                    "task_id": task_id,
+                    "run_id": run_id,
+                    "kind": "run_enqueued",
+                    "stage": Stage.PRODUCT.value,
+                    "status": RunStatus.PENDING.value,
+                    "data": {"attempt": 1},
+                }
+                for task_id, run_id in zip(new_ids, run_ids)
+            ],
+        )
+        notify_on_commit(session, TASK_EVENTS_CHANNEL)
+        notify_on_commit(session, RUNS_CHANNEL)
+        count_on_commit(
+            session, RUN_TRANSITIONS, len(run_ids), stage=Stage.PRODUCT.value, status=RunStatus.PENDING.value
+        )
+    created = dict(zip(map(id, new_items), new_ids))
+    for item, task_id in zip(new_items, new_ids):
+        if item.idempotency_key:
+            known[item.idempotency_key] = task_id
+    results: List[Tuple[int, bool]] = []
+    for item in items:
+        if id(item) in created:
+            results.append((created[id(item)], True))
+        else:
+            results.append((known[item.idempotency_key], False))
+    return results
 
 
-def next_stage_after(stage: Stage) -> Optional[Stage]:
-    order = [
-        Stage.PRODUCT,
-        Stage.ORCHESTRATE,
-        Stage.BACKEND,
-        Stage.QA_BACKEND,
-        Stage.SECURITY,
-        Stage.BACKEND_GATE,
-        Stage.FRONTEND,
-        Stage.QA_FRONTEND,
-        Stage.FRONTEND_GATE,
-        Stage.DOCS,
-        Stage.DOCS_GATE,
-        Stage.CI_WAIT,
-        Stage.HUMAN_APPROVAL,
-        Stage.MERGE,
-    ]
-    try:
-        idx = order.index(stage)
-    except ValueError:
-        return None
-    if idx == len(order) - 1:
-        return None
-    return order[idx + 1]
+# The pipeline as a dependency graph: a stage is enqueued once the latest run of every
+# stage it depends on has passed. Independent branches (backend, frontend) run in parallel
+# and join stages wait for all of their parents.
+STAGE_DEPENDENCIES: Dict[Stage, Tuple[Stage, ...]] = {
+    Stage.PRODUCT: (),
+    Stage.ORCHESTRATE: (Stage.PRODUCT,),
+    Stage.BACKEND: (Stage.ORCHESTRATE,),
+    Stage.QA_BACKEND: (Stage.BACKEND,),
+    Stage.SECURITY: (Stage.BACKEND,),
+    Stage.BACKEND_GATE: (Stage.QA_BACKEND, Stage.SECURITY),
+    Stage.FRONTEND: (Stage.ORCHESTRATE,),
+    Stage.QA_FRONTEND: (Stage.FRONTEND,),
+    Stage.FRONTEND_GATE: (Stage.QA_FRONTEND,),
+    Stage.DOCS: (Stage.BACKEND_GATE, Stage.FRONTEND_GATE),
+    Stage.DOCS_GATE: (Stage.DOCS,),
+    Stage.CI_WAIT: (Stage.BACKEND_GATE, Stage.FRONTEND_GATE, Stage.DOCS_GATE),
+    Stage.HUMAN_APPROVAL: (Stage.CI_WAIT,),
+    Stage.MERGE: (Stage.HUMAN_APPROVAL,),
+}
+
+ACTIVE_RUN_STATUSES = (RunStatus.PENDING, RunStatus.RUNNING, RunStatus.WAITING)
+
+
+def next_stages_after(stage: Stage) -> List[Stage]:
+    return [child for child, parents in STAGE_DEPENDENCIES.items() if stage in parents]
+
+
+def latest_runs_by_stage(session: Session, task: Task) -> Dict[Stage, Run]:
+    latest: Dict[Stage, Run] = {}
+    for run in session.scalars(select(Run).where(Run.task_id == task.id).order_by(Run.id.asc())):
+        latest[run.stage] = run
+    return latest
 
 
 def record_artifact(session: Session, task: Task, run: Run, kind: str, data: dict) -> None:
-    session.add(Artifact(task_id=task.id, run_id=run.id, kind=kind, data=data))
+    digest, size = store_payload(data)
+    session.add(
+        Artifact(task_id=task.id, run_id=run.id, kind=kind, blob_sha256=digest, size=size, summary=summarize(data))
+    )
+
+
+def artifact_data(artifact: Artifact) -> dict:
+    if artifact.data is not None:
+        return artifact.data
+    return load_payload(artifact.blob_sha256)
+
+
+def artifact_summary(artifact: Artifact) -> dict:
+    """Row-local view of an artifact that never touches the blob store."""
+    if artifact.summary is not None:
+        return artifact.summary
+    return artifact.data or {}
 
 
 def record_decision(session: Session, task: Task, decision_value: DecisionValue, comment: str | None = None) -> Decision:
@@ -62,34 +280,98 @@ def record_decision(session: Session, task: Task, decision_value: DecisionValue,
     return decision
 
 
+def latest_decision(session: Session, task: Task) -> Decision | None:
+    stmt = (
+        select(Decision)
+        .where(Decision.task_id == task.id, Decision.kind == DecisionKind.HUMAN_APPROVAL)
+        .order_by(Decision.id.desc())
+        .limit(1)
+    )
+    return session.scalars(stmt).first()
+
+
+def lock_task(session: Session, task: Task) -> None:
+    """Serialize concurrent pipeline decisions about one task on its row lock."""
+    session.execute(select(Task.id).where(Task.id == task.id).with_for_update())
+
+
+def park_run(session: Session, run: Run) -> None:
+    """Take a run off the queue until something external resumes it."""
+    run.status = RunStatus.WAITING
+    run.claimed_by = None
+    session.add(run)
+    emit_event(session, run.task_id, "run_waiting", run, RunStatus.WAITING.value)
+
+
+def defer_run(session: Session, run: Run, delay_seconds: float, payload: dict[str, Any] | None = None) -> None:
+    """Put a run back on the queue, invisible to claimers until ``delay_seconds`` have passed."""
+    run.status = RunStatus.PENDING
+    run.not_before = datetime.utcnow() + timedelta(seconds=delay_seconds)
+    run.claimed_by = None
+    run.claimed_at = None
+    if payload is not None:
+        run.payload = payload
+    session.add(run)
+
+
+def waiting_runs(session: Session, task: Task, stage: Stage) -> list[Run]:
+    stmt = select(Run).where(Run.task_id == task.id, Run.stage == stage, Run.status == RunStatus.WAITING)
+    return list(session.scalars(stmt))
+
+
+def resume_waiting_runs(session: Session, task: Task, stage: Stage) -> list[Run]:
+    runs = waiting_runs(session, task, stage)
+    for run in runs:
+        run.status = RunStatus.PENDING
+        enqueue_run(session, run)
+        emit_event(session, run.task_id, "run_resumed", run, RunStatus.PENDING.value)
+    return runs
+
+
 def fail_run(session: Session, run: Run, error: str) -> None:
     run.status = RunStatus.FAIL
     run.error = error
     session.add(run)
+    emit_event(session, run.task_id, "run_failed", run, RunStatus.FAIL.value, error=error[:500])
+
+
+def supersede_run(session: Session, run: Run, by: Run) -> None:
+    """Retire a queued or in-flight run whose input ``by`` has just replaced.
+
+    The run is failed without a retry, so a worker still holding it drops its result, and its
+    stage is enqueued again for the new input.
+    """
+    run.status = RunStatus.FAIL
+    run.error = f"Superseded by {by.stage.value} run {by.id}"
+    run.claimed_by = None
+    session.add(run)
+    emit_event(session, run.task_id, "run_superseded", run, RunStatus.FAIL.value, by_run_id=by.id)
 
 
 def pass_run(session: Session, run: Run, result: dict | None = None) -> None:
     run.status = RunStatus.PASS
     run.result = result
     session.add(run)
+    emit_event(session, run.task_id, "run_passed", run, RunStatus.PASS.value)
 
 
 def spawn_retry_or_fail_task(session: Session, task: Task, run: Run) -> None:
     if run.attempt < run.max_attempts:
         logger.info("Retrying stage %s for task %s (attempt %s)", run.stage, task.id, run.attempt + 1)
-        session.add(
+        count_on_commit(session, RUN_RETRIES, stage=run.stage.value)
+        enqueue_run(
+            session,
             Run(
                 task_id=task.id,
                 stage=run.stage,
                 status=RunStatus.PENDING,
                 attempt=run.attempt + 1,
                 max_attempts=run.max_attempts,
-            )
+            ),
         )
     else:
-        task.status = TaskStatus.FAILED
+        set_task_status(session, task, TaskStatus.FAILED)
         logger.error("Task %s failed at stage %s after max attempts", task.id, run.stage)
-        session.add(task)
 
 
 def spawn_rework_or_fail_task(session: Session, task: Task, target_stage: Stage, max_attempts: int) -> None:
@@ -97,40 +379,59 @@ def spawn_rework_or_fail_task(session: Session, task: Task, target_stage: Stage,
     attempts = max((r.attempt for r in task.runs if r.stage == target_stage), default=0)
     if attempts < max_attempts:
         logger.info("Reworking stage %s for task %s (attempt %s)", target_stage, task.id, attempts + 1)
-        session.add(
+        count_on_commit(session, RUN_REWORKS, stage=target_stage.value)
+        enqueue_run(
+            session,
             Run(
                 task_id=task.id,
                 stage=target_stage,
                 status=RunStatus.PENDING,
                 attempt=attempts + 1,
                 max_attempts=max_attempts,
-            )
+            ),
         )
-        task.status = TaskStatus.RUNNING
-        session.add(task)
+        set_task_status(session, task, TaskStatus.RUNNING)
     else:
-        task.status = TaskStatus.FAILED
+        set_task_status(session, task, TaskStatus.FAILED)
         logger.error("Task %s exhausted attempts for stage %s", task.id, target_stage)
-        session.add(task)
 
 
 def enqueue_next(session: Session, task: Task, current: Run, max_attempts: int) -> None:
-    next_stage = next_stage_after(current.stage)
-    if not next_stage:
-        task.status = TaskStatus.DONE
-        session.add(task)
+    """Enqueue every dependent of ``current`` whose parents have now all passed."""
+    if task.status == TaskStatus.FAILED:
+        # A parallel branch already failed the task; don't start new work for it.
         return
-    session.add(
-        Run(
-            task_id=task.id,
-            stage=next_stage,
-            status=RunStatus.PENDING,
-            attempt=1,
-            max_attempts=max_attempts,
+    next_stages = next_stages_after(current.stage)
+    if not next_stages:
+        set_task_status(session, task, TaskStatus.DONE)
+        return
+    # Parents of a join stage may pass concurrently in different workers; the task lock makes
+    # the last one to commit see all the others, so the join is enqueued exactly once.
+    lock_task(session, task)
+    session.flush()
+    latest = latest_runs_by_stage(session, task)
+    for stage in next_stages:
+        parents = STAGE_DEPENDENCIES[stage]
+        if not all(p in latest and latest[p].status == RunStatus.PASS for p in parents):
+            continue
+        active = latest.get(stage)
+        if active is not None and active.status in ACTIVE_RUN_STATUSES:
+            if active.id > current.id:
+                continue
+            # Enqueued before ``current`` existed, i.e. for a result a rework has since replaced
+            # (e.g. SECURITY still reviewing the previous BackendPlan).
+            supersede_run(session, active, current)
+        enqueue_run(
+            session,
+            Run(
+                task_id=task.id,
+                stage=stage,
+                status=RunStatus.PENDING,
+                attempt=1,
+                max_attempts=max_attempts,
+            ),
         )
-    )
-    task.status = TaskStatus.RUNNING
-    session.add(task)
+    set_task_status(session, task, TaskStatus.RUNNING)
 
 
 def is_backend_gate_ready(task: Task) -> GateDecision:
@@ -166,12 +467,29 @@ def should_wait_for_ci(task: Task) -> bool:
 
 
 __all__ = [
+    "touch_tasks",
+    "count_on_commit",
+    "emit_event",
+    "set_task_status",
+    "enqueue_run",
     "create_initial_runs",
-    "next_stage_after",
+    "create_tasks",
+    "STAGE_DEPENDENCIES",
+    "next_stages_after",
+    "latest_runs_by_stage",
     "record_artifact",
+    "artifact_data",
+    "artifact_summary",
     "record_decision",
+    "latest_decision",
+    "lock_task",
+    "park_run",
+    "defer_run",
+    "waiting_runs",
+    "resume_waiting_runs",
     "fail_run",
     "pass_run",
+    "supersede_run",
     "spawn_retry_or_fail_task",
     "spawn_rework_or_fail_task",
     "enqueue_next",
@@ -0,0 +1,206 @@
+"""Sampled cProfile of stage handlers, aggregated per stage and dumped to disk."""
+from __future__ import annotations
+
+import atexit
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from orchestrator.config import get_settings
+from orchestrator.util import logger
+
+# Ceiling on PROFILING_SAMPLE_RATE so profiling can be left on in production.
+MAX_SAMPLE_RATE = 0.1
+SORT_KEYS = {"cumulative": 3, "tottime": 2, "calls": 1}
+
+_lock = threading.Lock()
+# Only one handler is profiled at a time per process; concurrent candidates are simply not sampled.
+_active = threading.Lock()
+_stats: Dict[str, pstats.Stats] = {}
+_samples: Counter = Counter()
+_last_dump = time.monotonic()
+# Set by ``sampled`` so every part of a handler split across threads shares one sampling decision.
+_decision: ContextVar[Optional[bool]] = ContextVar("profiling_decision", default=None)
+
+
+def _stages() -> set[str]:
+    return {s.strip().upper() for s in get_settings().profiling_stages.split(",") if s.strip()}
+
+
+def sample_rate() -> float:
+    return min(max(get_settings().profiling_sample_rate, 0.0), MAX_SAMPLE_RATE)
+
+
+def should_profile(stage: str) -> bool:
+    rate = sample_rate()
+    if rate <= 0:
+        return False
+    stages = _stages()
+    if stages and stage.upper() not in stages:
+        return False
+    return random.random() < rate
+
+
+@contextmanager
+def sampled(stage: str) -> Iterator[None]:
+    """Decide once whether ``profile`` blocks inside this context (and threads it spawns) are sampled."""
+    token = _decision.set(should_profile(stage))
+    try:
+        yield
+    finally:
+        _decision.reset(token)
+
+
+@contextmanager
+def profile(stage: str, count: bool = True) -> Iterator[None]:
+    """Run the body under cProfile if this invocation is sampled, folding the result into ``stage``.
+
+    ``count=False`` adds to the stage's aggregate without counting another sample, for the parts of
+    one handler invocation that run before its main ``profile`` block.
+    """
+    decision = _decision.get()
+    if not (should_profile(stage) if decision is None else decision) or not _active.acquire(blocking=False):
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+    finally:
+        _active.release()
+        _record(stage, profiler, count)
+
+
+def _record(stage: str, profiler: cProfile.Profile, count: bool = True) -> None:
+    with _lock:
+        if stage in _stats:
+            _stats[stage].add(profiler)
+        else:
+            _stats[stage] = pstats.Stats(profiler)
+        if count:
+            _samples[stage] += 1
+    dump_if_due()
+
+
+def _dump_dir() -> Path:
+    settings = get_settings()
+    return Path(settings.profiling_dir) / settings.worker_id
+
+
+def dump() -> List[Path]:
+    """Write each stage's aggregate to ``PROFILING_DIR/<worker_id>/<stage>.prof`` (pstats format)."""
+    directory = _dump_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    with _lock:
+        for stage, stats in _stats.items():
+            path = directory / f"{stage}.prof"
+            tmp = path.with_suffix(".prof.tmp")
+            stats.dump_stats(str(tmp))
+            os.replace(tmp, path)
+            written.append(path)
+        (directory / "samples.txt").write_text("".join(f"{stage} {n}\n" for stage, n in _samples.items()))
+    return written
+
+
+def dump_if_due() -> None:
+    global _last_dump
+    interval = get_settings().profiling_dump_interval_seconds
+    if interval <= 0 or time.monotonic() - _last_dump < interval:
+        return
+    _last_dump = time.monotonic()
+    try:
+        dump()
+    except OSError:
+        logger.exception("Failed to dump handler profiles")
+
+
+def _flush_at_exit() -> None:
+    if _stats:
+        try:
+            dump()
+        except OSError:
+            logger.exception("Failed to dump handler profiles")
+
+
+atexit.register(_flush_at_exit)
+
+
+def _load_dumps(stage: Optional[str]) -> Dict[str, pstats.Stats]:
+    """Merge every process's dumped aggregates with this process's own, per stage."""
+    merged: Dict[str, pstats.Stats] = {}
+    root = Path(get_settings().profiling_dir)
+    own = _dump_dir()
+    for path in sorted(root.glob("*/*.prof")):
+        name = path.stem
+        if path.parent == own or (stage and name != stage.upper()):
+            continue
+        try:
+            merged.setdefault(name, pstats.Stats()).add(str(path))
+        except (OSError, EOFError, ValueError, TypeError):
+            logger.warning("Skipping unreadable profile dump %s", path)
+    with _lock:
+        for name, stats in _stats.items():
+            if stage and name != stage.upper():
+                continue
+            merged.setdefault(name, pstats.Stats()).add(stats)
+    return merged
+
+
+def _sample_counts() -> Counter:
+    counts: Counter = Counter()
+    own = _dump_dir()
+    for path in Path(get_settings().profiling_dir).glob("*/samples.txt"):
+        if path.parent == own:
+            continue
+        for line in path.read_text().splitlines():
+            name, _, n = line.partition(" ")
+            if n.isdigit():
+                counts[name] += int(n)
+    with _lock:
+        counts.update(_samples)
+    return counts
+
+
+def summary(stage: Optional[str] = None, sort: str = "cumulative", limit: int = 30) -> Dict[str, Any]:
+    """Top ``limit`` functions per stage, across all workers that dumped to PROFILING_DIR."""
+    index = SORT_KEYS.get(sort, SORT_KEYS["cumulative"])
+    counts = _sample_counts()
+    out: Dict[str, Any] = {}
+    for name, stats in sorted(_load_dumps(stage).items()):
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][index], reverse=True)[:limit]
+        out[name] = {
+            "samples": counts.get(name, 0),
+            "total_seconds": stats.total_tt,
+            "functions": [
+                {
+                    "function": pstats.func_std_string(func),
+                    "calls": calls,
+                    "primitive_calls": primitive,
+                    "tottime": tottime,
+                    "cumtime": cumtime,
+                }
+                for func, (primitive, calls, tottime, cumtime, _callers) in rows
+            ],
+        }
+    return out
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+        _samples.clear()
+
+
+__all__ = ["MAX_SAMPLE_RATE", "sample_rate", "should_profile", "sampled", "profile", "dump", "dump_if_due", "summary", "reset"]
@@ -0,0 +1,44 @@
+"""In-process cache of serialized task responses, validated by task version."""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from orchestrator.config import get_settings
+
+_entries: "OrderedDict[Hashable, Tuple[int, bytes]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get(key: Hashable, version: int) -> Optional[bytes]:
+    """The cached body for ``key`` if it was rendered at ``version``."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            # Versions only grow, so an older rendering can never be served again.
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return entry[1]
+
+
+def put(key: Hashable, version: int, body: bytes) -> None:
+    with _lock:
+        current = _entries.get(key)
+        if current is not None and current[0] > version:
+            return
+        _entries[key] = (version, body)
+        _entries.move_to_end(key)
+        while len(_entries) > get_settings().task_response_cache_size:
+            _entries.popitem(last=False)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+__all__ = ["get", "put", "clear"]
@@ -11,6 +11,14 @@ from orchestrator.models import DecisionKind, DecisionValue, RunStatus, Stage, T
 class TaskCreate(BaseModel):
     title: str
     raw_request: str
+    # Client-chosen; resubmitting a key returns the task it created instead of a duplicate.
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)
+
+
+class TaskBatchOut(BaseModel):
+    ids: List[int]
+    created: int
+    existing: int
 
 
 class TaskSpec(BaseModel):
@@ -49,9 +57,16 @@ class GateDecision(BaseModel):
 class ArtifactOut(BaseModel):
     id: int
     kind: str
-    data: dict[str, Any]
+    # None unless the body was requested; fetch it from GET /tasks/{id}/artifacts/{artifact_id}.
+    data: Optional[dict[str, Any]]
+    blob_sha256: Optional[str]
+    size: Optional[int]
+    summary: Optional[dict[str, Any]]
     created_at: datetime
 
+    class Config:
+        orm_mode = True
+
 
 class RunOut(BaseModel):
     id: int
@@ -65,6 +80,9 @@ class RunOut(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    class Config:
+        orm_mode = True
+
 
 class DecisionOut(BaseModel):
     id: int
@@ -73,17 +91,83 @@ class DecisionOut(BaseModel):
     comment: Optional[str]
     created_at: datetime
 
+    class Config:
+        orm_mode = True
+
 
-class TaskOut(BaseModel):
+class TaskSummaryOut(BaseModel):
     id: int
     title: str
     raw_request: str
     status: TaskStatus
+    pr_number: Optional[int]
+    version: int
     created_at: datetime
     updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class TaskOut(TaskSummaryOut):
     runs: List[RunOut]
     artifacts: List[ArtifactOut]
     decisions: List[DecisionOut]
 
+
+class TaskEventOut(BaseModel):
+    id: int
+    task_id: int
+    run_id: Optional[int]
+    kind: str
+    stage: Optional[str]
+    status: Optional[str]
+    data: Optional[dict[str, Any]]
+    created_at: datetime
+
     class Config:
         orm_mode = True
+
+
+class TaskEventPage(BaseModel):
+    events: List[TaskEventOut]
+    # Pass as ``since`` on the next poll.
+    cursor: int
+
+
+class TaskPage(BaseModel):
+    items: List[TaskSummaryOut]
+    # Pass as ``after`` to fetch the next page; None on the last page.
+    next_cursor: Optional[int]
+
+
+class RunPage(BaseModel):
+    items: List[RunOut]
+    next_cursor: Optional[int]
+
+
+class ArtifactPage(BaseModel):
+    items: List[ArtifactOut]
+    next_cursor: Optional[int]
+
+
+class TraceStepOut(BaseModel):
+    name: str
+    span_id: str
+    attributes: dict[str, Any]
+    start: float
+    duration: float
+    # Idle time since the previous step ended: queueing, backoff or waiting on CI/humans.
+    wait_before: float
+    error: Optional[str]
+    # Seconds spent in descendant spans (llm.call, github.request, db.session, ...) by name.
+    breakdown: dict[str, float]
+
+
+class TaskTraceOut(BaseModel):
+    trace_id: str
+    sampled: bool
+    span_count: int
+    duration: float
+    critical_path: List[TraceStepOut]
+    spans: Optional[List[dict[str, Any]]]
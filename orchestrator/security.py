@@ -1,4 +1,6 @@
 """Security policy checks."""
+import hashlib
+import hmac
 import re
 from typing import List
 
@@ -19,3 +21,18 @@ def evaluate_security(diff_summary: str) -> ReviewResult:
     issues = scan_text(diff_summary)
     passed = len(issues) == 0
     return ReviewResult(stage=Stage.SECURITY, passed=passed, issues=issues, suggestions=[])
+
+
+def verify_github_signature(secret: str, body: bytes, signature_header: str | None) -> bool:
+    """Check an ``X-Hub-Signature-256`` header against the raw request body."""
+    if not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+def verify_bearer_token(token: str, authorization_header: str | None) -> bool:
+    """Check an ``Authorization: Bearer <token>`` header in constant time."""
+    if not authorization_header or not authorization_header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(token.encode(), authorization_header[len("Bearer "):].encode())
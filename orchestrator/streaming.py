@@ -0,0 +1,74 @@
+"""Incremental persistence of streamed LLM output."""
+from __future__ import annotations
+
+from typing import List
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from orchestrator.config import get_settings
+from orchestrator.db import session_scope
+from orchestrator.models import RunOutputChunk, Stage
+
+
+def streams_output(stage: Stage) -> bool:
+    stages = {s.strip() for s in get_settings().llm_stream_stages.split(",") if s.strip()}
+    return stage.value in stages
+
+
+class RunOutputWriter:
+    """Buffers streamed text and commits it in increments of at least LLM_STREAM_FLUSH_BYTES.
+
+    Each increment is written in its own short transaction so watchers see it while the run's
+    own session is still open. A re-claimed run starts its output over: its first increment
+    replaces the earlier chunks and is numbered past them, leaving one gap in ``seq`` so
+    resuming readers can tell the output restarted.
+    """
+
+    def __init__(self, run_id: int) -> None:
+        self.run_id = run_id
+        self.flush_bytes = get_settings().llm_stream_flush_bytes
+        self.buffer: List[str] = []
+        self.buffered = 0
+        self.seq: int | None = None
+
+    def append(self, chunk: str) -> bool:
+        """Buffer ``chunk``; True once enough is buffered that the caller should flush."""
+        self.buffer.append(chunk)
+        self.buffered += len(chunk)
+        return self.buffered >= self.flush_bytes
+
+    def write(self, chunk: str) -> None:
+        if self.append(chunk):
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        content = "".join(self.buffer)
+        with session_scope() as session:
+            seq = self.seq
+            if seq is None:
+                last = select(func.max(RunOutputChunk.seq)).where(RunOutputChunk.run_id == self.run_id)
+                previous = session.scalar(last)
+                seq = 0 if previous is None else previous + 2
+                session.execute(delete(RunOutputChunk).where(RunOutputChunk.run_id == self.run_id))
+            session.add(RunOutputChunk(run_id=self.run_id, seq=seq, content=content))
+        self.seq = seq + 1
+        self.buffer = []
+        self.buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+
+
+def chunks_since(session: Session, run_id: int, after_seq: int) -> List[RunOutputChunk]:
+    stmt = (
+        select(RunOutputChunk)
+        .where(RunOutputChunk.run_id == run_id, RunOutputChunk.seq > after_seq)
+        .order_by(RunOutputChunk.seq.asc())
+    )
+    return list(session.scalars(stmt))
+
+
+__all__ = ["streams_output", "RunOutputWriter", "chunks_since"]
@@ -0,0 +1,313 @@
+"""Lightweight tracing: spans per run, LLM call, GitHub request and DB session, exported locally."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from orchestrator.config import get_settings
+from orchestrator.util import logger
+
+OTLP_TRACES_PATH = "/v1/traces"
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("orchestrator_span", default=None)
+
+
+def trace_id_for(task_id: int) -> str:
+    """Every run of a task belongs to one trace, derivable from the task id alone."""
+    return hashlib.sha256(f"orchestrator-task-{task_id}".encode()).hexdigest()[:32]
+
+
+def sampled(trace_id: str) -> bool:
+    # Decided by the trace id, so all processes agree on whether a given task is traced.
+    rate = get_settings().tracing_sample_rate
+    if rate <= 0:
+        return False
+    return rate >= 1 or int(trace_id[:8], 16) < rate * 2**32
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+class _NoopSpan:
+    """Stands in for both the scope and the span, so ``with span(...) as s: s.set(...)`` costs nothing."""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def set(self, **attributes: Any) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanScope:
+    def __init__(self, span: Span, activate: bool = True) -> None:
+        self.span = span
+        self.activate = activate
+        self.token = None
+
+    def __enter__(self) -> Span:
+        if self.activate:
+            self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.end = time.time()
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"[:500]
+        if self.token is not None:
+            _current.reset(self.token)
+        try:
+            get_exporter().export(self.span)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to export span %s", self.span.name)
+
+
+def span(name: str, **attributes: Any):
+    """Child of the current span; a shared no-op when nothing is being traced."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    return _SpanScope(Span(parent.trace_id, secrets.token_hex(8), parent.span_id, name, time.time(), attributes=attributes))
+
+
+def leaf_span(name: str, **attributes: Any):
+    """Like :func:`span`, but work inside it stays parented to the enclosing span.
+
+    For scopes such as DB sessions that wrap, rather than contain, the operations of interest.
+    """
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    span_ = Span(parent.trace_id, secrets.token_hex(8), parent.span_id, name, time.time(), attributes=attributes)
+    return _SpanScope(span_, activate=False)
+
+
+def start_trace(trace_id: Optional[str], name: str, **attributes: Any):
+    """Top-level span in ``trace_id`` if the trace is sampled (a child span if one is already open)."""
+    if _current.get() is not None:
+        return span(name, **attributes)
+    if not trace_id or not sampled(trace_id):
+        return _NOOP
+    return _SpanScope(Span(trace_id, secrets.token_hex(8), None, name, time.time(), attributes=attributes))
+
+
+class Exporter(ABC):
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Hand a finished span to the backend."""
+
+
+class NullExporter(Exporter):
+    def export(self, span: Span) -> None:
+        return None
+
+
+class JsonlExporter(Exporter):
+    """Appends one JSON object per span, rotating to ``.1`` … ``.N`` past ``max_bytes``.
+
+    Each process writes its own file so rotation never races another writer.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backups: int) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span), default=str) + "\n"
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size + len(line) > self.max_bytes:
+                self._rotate()
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+def _trace_files() -> List[Path]:
+    return sorted(Path(get_settings().tracing_dir).glob("spans-*.jsonl*"))
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter(Exporter):
+    """Buffers spans and posts them as OTLP/JSON to a collector from a background thread."""
+
+    def __init__(self, endpoint: str, batch_size: int = 256, flush_seconds: float = 5.0) -> None:
+        self.url = endpoint.rstrip("/") + OTLP_TRACES_PATH
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.buffer: List[Span] = []
+        self.cond = threading.Condition()
+        threading.Thread(target=self._loop, name="otlp-exporter", daemon=True).start()
+
+    def export(self, span: Span) -> None:
+        with self.cond:
+            self.buffer.append(span)
+            if len(self.buffer) >= self.batch_size:
+                self.cond.notify()
+
+    def _loop(self) -> None:
+        session = requests.Session()
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.buffer) >= self.batch_size, self.flush_seconds)
+                batch, self.buffer = self.buffer, []
+            if not batch:
+                continue
+            try:
+                session.post(self.url, json=self._payload(batch), timeout=10)
+            except requests.RequestException:
+                logger.warning("Dropped %s spans: collector at %s unreachable", len(batch), self.url)
+
+    def _payload(self, batch: List[Span]) -> Dict[str, Any]:
+        spans = [
+            {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "startTimeUnixNano": str(int(s.start * 1e9)),
+                "endTimeUnixNano": str(int((s.end or s.start) * 1e9)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            for s in batch
+        ]
+        resource = {"attributes": [{"key": "service.name", "value": {"stringValue": "orchestrator"}}]}
+        return {"resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": {"name": "orchestrator"}, "spans": spans}]}]}
+
+
+@lru_cache()
+def get_exporter() -> Exporter:
+    settings = get_settings()
+    if settings.tracing_exporter == "jsonl":
+        path = Path(settings.tracing_dir) / f"spans-{settings.worker_id}.jsonl"
+        return JsonlExporter(str(path), settings.tracing_file_max_bytes, settings.tracing_file_backups)
+    if settings.tracing_exporter == "otlp" and settings.tracing_otlp_endpoint:
+        return OTLPExporter(settings.tracing_otlp_endpoint)
+    return NullExporter()
+
+
+def load_trace(trace_id: str) -> List[Dict[str, Any]]:
+    """Spans of one trace from every process's local JSONL files, oldest first."""
+    needle = f'"trace_id": "{trace_id}"'
+    spans = []
+    for path in _trace_files():
+        with path.open(encoding="utf-8") as fh:
+            spans += [json.loads(line) for line in fh if needle in line]
+    return sorted(spans, key=lambda s: s["start"])
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Top-level (run) spans that determined the trace's end, each gated by the one before it.
+
+    Walks back from the last span to finish, each time to the span that finished most recently
+    before the current one started, and reports the idle gap between them as queue/wait time.
+    """
+    roots = [s for s in spans if s.get("parent_id") is None and s.get("end") is not None]
+    path: List[Dict[str, Any]] = []
+    current = max(roots, key=lambda s: s["end"], default=None)
+    while current is not None:
+        path.append(current)
+        before = [s for s in roots if s["end"] <= current["start"]]
+        current = max(before, key=lambda s: s["end"], default=None)
+    path.reverse()
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    for s in spans:
+        if s.get("parent_id"):
+            children.setdefault(s["parent_id"], []).append(s)
+    out = []
+    previous_end: Optional[float] = None
+    for s in path:
+        breakdown: Dict[str, float] = {}
+        for child in _descendants(s["span_id"], children):
+            breakdown[child["name"]] = breakdown.get(child["name"], 0.0) + (child["end"] or child["start"]) - child["start"]
+        out.append(
+            {
+                "name": s["name"],
+                "span_id": s["span_id"],
+                "attributes": s.get("attributes", {}),
+                "start": s["start"],
+                "duration": s["end"] - s["start"],
+                "wait_before": s["start"] - previous_end if previous_end is not None else 0.0,
+                "error": s.get("error"),
+                "breakdown": breakdown,
+            }
+        )
+        previous_end = s["end"]
+    return out
+
+
+def _descendants(span_id: str, children: Dict[str, List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    for child in children.get(span_id, []):
+        yield child
+        yield from _descendants(child["span_id"], children)
+
+
+__all__ = [
+    "Span",
+    "trace_id_for",
+    "sampled",
+    "current_span",
+    "span",
+    "leaf_span",
+    "start_trace",
+    "JsonlExporter",
+    "OTLPExporter",
+    "get_exporter",
+    "load_trace",
+    "critical_path",
+]
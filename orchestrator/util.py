@@ -12,3 +12,8 @@ def safe_json(obj: Any) -> str:
         return json.dumps(obj, ensure_ascii=False)
     except Exception:
         return str(obj)
+
+
+def canonical_json(obj: Any) -> bytes:
+    """Stable JSON encoding for hashing: sorted keys, no whitespace."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode()
@@ -0,0 +1,128 @@
+"""GitHub webhook ingestion for PR and check-suite status."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from orchestrator.models import PullRequestStatus, Run, RunStatus, Stage, Task
+from orchestrator.pipeline import enqueue_run
+from orchestrator.util import logger
+
+GREEN_CONCLUSIONS = {"success", "neutral", "skipped"}
+FAILED_CONCLUSIONS = {"failure", "timed_out", "cancelled", "action_required", "startup_failure"}
+
+
+def _status_for(session: Session, pr_number: int, head_sha: str | None) -> PullRequestStatus:
+    status = session.get(PullRequestStatus, pr_number)
+    if status is None:
+        status = PullRequestStatus(pr_number=pr_number)
+        session.add(status)
+    if head_sha and status.head_sha != head_sha:
+        # New commits invalidate whatever the checks said about the previous head.
+        status.head_sha = head_sha
+        status.mergeable_state = None
+        status.checks_status = None
+        status.checks_conclusion = None
+        status.check_suites = None
+    return status
+
+
+def record_pr_state(session: Session, pr_number: int, state: Dict[str, Any]) -> PullRequestStatus:
+    """Store a full PR state snapshot (e.g. from the bulk GraphQL sweep)."""
+    status = _status_for(session, pr_number, state.get("head_sha"))
+    status.mergeable_state = state.get("mergeable_state")
+    status.checks_status = state.get("checks_status")
+    status.checks_conclusion = state.get("checks_conclusion")
+    # Touch the row even when nothing changed: freshness is what spares the REST fallback.
+    status.updated_at = datetime.utcnow()
+    return status
+
+
+def combine_suites(suites: Dict[str, Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
+    """(checks_status, checks_conclusion) over every check suite reported for the head commit.
+
+    Any failed suite fails the PR; it is green only once every known suite completed green.
+    """
+    for suite in suites.values():
+        if suite.get("conclusion") in FAILED_CONCLUSIONS:
+            return "completed", suite["conclusion"]
+    for suite in suites.values():
+        if suite.get("status") != "completed" or suite.get("conclusion") not in GREEN_CONCLUSIONS:
+            return suite.get("status") or "queued", None
+    return ("completed", "success") if suites else (None, None)
+
+
+def record_check_suite(session: Session, payload: Dict[str, Any]) -> List[int]:
+    suite = payload.get("check_suite") or {}
+    # One suite per app (Actions, a third-party CI, ...) runs against each head commit.
+    key = str((suite.get("app") or {}).get("id") or suite.get("id"))
+    pr_numbers = []
+    for pr in suite.get("pull_requests") or []:
+        pr_number = pr.get("number")
+        if pr_number is None:
+            continue
+        status = _status_for(session, pr_number, suite.get("head_sha"))
+        suites = dict(status.check_suites or {})
+        suites[key] = {"status": suite.get("status"), "conclusion": suite.get("conclusion")}
+        status.check_suites = suites
+        status.checks_status, status.checks_conclusion = combine_suites(suites)
+        pr_numbers.append(pr_number)
+    return pr_numbers
+
+
+def record_pull_request(session: Session, payload: Dict[str, Any]) -> List[int]:
+    pr = payload.get("pull_request") or {}
+    pr_number = pr.get("number")
+    if pr_number is None:
+        return []
+    status = _status_for(session, pr_number, (pr.get("head") or {}).get("sha"))
+    status.mergeable_state = pr.get("mergeable_state")
+    return [pr_number]
+
+
+RECORDERS = {
+    "check_suite": record_check_suite,
+    "pull_request": record_pull_request,
+}
+
+
+def wake_ci_waits(session: Session, pr_numbers: Iterable[int]) -> List[int]:
+    """Make CI_WAIT runs for these PRs claimable now instead of at their next scheduled check."""
+    pr_numbers = list(set(pr_numbers))
+    if not pr_numbers:
+        return []
+    stmt = (
+        select(Run)
+        .join(Task, Task.id == Run.task_id)
+        .where(Task.pr_number.in_(pr_numbers), Run.stage == Stage.CI_WAIT, Run.status == RunStatus.PENDING)
+    )
+    runs = list(session.scalars(stmt))
+    for run in runs:
+        run.not_before = None
+        enqueue_run(session, run)
+    return [run.id for run in runs]
+
+
+def record_github_event(session: Session, event: str, payload: Dict[str, Any]) -> List[int] | None:
+    """Store the status carried by a webhook and return the CI_WAIT runs it woke (None if ignored)."""
+    recorder = RECORDERS.get(event)
+    if recorder is None:
+        return None
+    pr_numbers = recorder(session, payload)
+    session.flush()
+    woken = wake_ci_waits(session, pr_numbers)
+    logger.info("GitHub %s event for PRs %s woke runs %s", event, pr_numbers, woken)
+    return woken
+
+
+__all__ = [
+    "GREEN_CONCLUSIONS",
+    "FAILED_CONCLUSIONS",
+    "combine_suites",
+    "record_github_event",
+    "record_pr_state",
+    "wake_ci_waits",
+]
@@ -1,87 +1,287 @@
-"""Polling worker that advances pipeline runs."""
+"""Worker that claims and advances pipeline runs."""
 from __future__ import annotations
 
+import argparse
+import asyncio
+import threading
 import time
-from typing import Callable, Dict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, update
 from sqlalchemy.orm import Session
 
-from orchestrator import llm
-from orchestrator.ci_gate import wait_for_checks
+from orchestrator import archive, llm, migrate, profiling, tracing
+from orchestrator.ci_gate import CI_FAILED, CI_GREEN, ci_state, next_check_delay, sweep_ci_waits
 from orchestrator.config import get_settings
+from orchestrator.context import build_context
 from orchestrator.db import session_scope
-from orchestrator.github_client import GitHubClient
+from orchestrator.github_client import get_github_client
+from orchestrator.metrics import RUN_QUEUE_WAIT, STAGE_DURATION, start_http_server
 from orchestrator.models import Decision, DecisionKind, DecisionValue, Run, RunStatus, Stage, Task, TaskStatus
+from orchestrator.notify import RUNS_CHANNEL, get_notifier, notify_on_commit
 from orchestrator.pipeline import (
+    artifact_summary,
     create_initial_runs,
+    defer_run,
     enqueue_next,
     fail_run,
     is_backend_gate_ready,
     is_docs_gate_ready,
     is_frontend_gate_ready,
+    latest_decision,
+    lock_task,
+    park_run,
     pass_run,
     record_artifact,
+    set_task_status,
     spawn_retry_or_fail_task,
     spawn_rework_or_fail_task,
+    touch_tasks,
 )
-from orchestrator.schemas import ContextPack, GateDecision, ReviewResult, TaskSpec, WorkItem
+from orchestrator.schemas import ContextPack, GateDecision, ReviewResult
 from orchestrator.security import evaluate_security
-from orchestrator.util import logger
+from orchestrator.streaming import RunOutputWriter, streams_output
+from orchestrator.util import logger, safe_json
 
 settings = get_settings()
 
+Handler = Callable[[Session, Task, Run], None]
+
+MERGE_COMMENT = "Merging after approval"
+
+_last_ci_sweep = float("-inf")
+_last_archive = float("-inf")
+_last_partition_check = float("-inf")
+_last_release = float("-inf")
+
+
+def claim_runs(session: Session, limit: int = 1) -> List[Run]:
+    """Atomically mark up to ``limit`` of the oldest pending runs as RUNNING for this worker.
+
+    Rows locked by a concurrent claimer are skipped rather than waited on, so any number of
+    workers can claim from the queue without handing out the same run twice.
+    """
+    now = datetime.utcnow()
+    stmt = (
+        select(Run)
+        .where(Run.status == RunStatus.PENDING, or_(Run.not_before.is_(None), Run.not_before <= now))
+        .order_by(Run.created_at.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    runs = list(session.scalars(stmt))
+    for run in runs:
+        ready_at = max(run.created_at, run.not_before) if run.not_before else run.created_at
+        RUN_QUEUE_WAIT.observe(max((now - ready_at).total_seconds(), 0.0), stage=run.stage.value)
+        run.status = RunStatus.RUNNING
+        run.claimed_by = settings.worker_id
+        run.claimed_at = now
+    session.flush()
+    return runs
+
 
 def get_next_run(session: Session) -> Run | None:
-    stmt = select(Run).where(Run.status == RunStatus.PENDING).order_by(Run.created_at.asc())
-    return session.scalars(stmt).first()
-
-
-def _context_for(task: Task, stage: Stage) -> ContextPack:
-    artifacts = [
-        {"kind": a.kind, "data": a.data, "run_id": a.run_id}
-        for a in sorted(task.artifacts, key=lambda a: a.id)
-    ]
-    task_spec_artifact = next((a for a in task.artifacts if a.kind == "TaskSpec"), None)
-    task_spec_data = task_spec_artifact.data if task_spec_artifact else {
-        "goal": task.title,
-        "acceptance_criteria": [],
-        "constraints": [],
-    }
-    task_spec = TaskSpec(**task_spec_data)
-    return ContextPack(task_id=task.id, title=task.title, task_spec=task_spec, stage=stage, artifacts=artifacts)
-
-
-def handle_product(session: Session, task: Task, run: Run) -> None:
-    result = llm.call("Product", {"raw_request": task.raw_request})
-    record_artifact(session, task, run, "TaskSpec", result)
-    pass_run(session, run, result)
+    runs = claim_runs(session, 1)
+    return runs[0] if runs else None
+
+
+def seconds_until_next_due(session: Session) -> float | None:
+    """How long until the earliest deferred run becomes claimable, if any is scheduled."""
+    now = datetime.utcnow()
+    stmt = select(func.min(Run.not_before)).where(Run.status == RunStatus.PENDING, Run.not_before > now)
+    next_due = session.scalar(stmt)
+    if next_due is None:
+        return None
+    return max((next_due - now).total_seconds(), 0.0)
+
+
+def idle_wait_seconds(session: Session) -> float:
+    timeout = settings.worker_poll_interval_seconds
+    if settings.ci_sweep_interval_seconds > 0:
+        timeout = min(timeout, settings.ci_sweep_interval_seconds)
+    due_in = seconds_until_next_due(session)
+    if due_in is None:
+        return timeout
+    return min(timeout, max(due_in, 0.05))
+
+
+def sweep_ci_if_due() -> None:
+    """Run the bulk CI status sweep at most once per CI_SWEEP_INTERVAL_SECONDS in this process."""
+    global _last_ci_sweep
+    interval = settings.ci_sweep_interval_seconds
+    if interval <= 0 or time.monotonic() - _last_ci_sweep < interval:
+        return
+    _last_ci_sweep = time.monotonic()
+    try:
+        with session_scope() as session:
+            sweep_ci_waits(session)
+    except Exception:  # noqa: BLE001
+        logger.exception("CI status sweep failed")
 
 
-def handle_orchestrate(session: Session, task: Task, run: Run) -> None:
-    ctx = _context_for(task, run.stage)
-    result = llm.call("Orchestrator", ctx.dict())
-    record_artifact(session, task, run, "ContextPack", result)
-    pass_run(session, run, result)
+def archive_if_due() -> None:
+    """Archive long-finished tasks at most once per ARCHIVE_INTERVAL_SECONDS in this process."""
+    global _last_archive
+    if settings.archive_after_days <= 0 or time.monotonic() - _last_archive < settings.archive_interval_seconds:
+        return
+    _last_archive = time.monotonic()
+    try:
+        archive.archive_finished()
+    except Exception:  # noqa: BLE001
+        logger.exception("Task archival failed")
 
 
-def handle_backend(session: Session, task: Task, run: Run) -> None:
-    ctx = _context_for(task, run.stage)
-    result = llm.call("Backend", ctx.dict())
-    record_artifact(session, task, run, "BackendPlan", result)
-    pass_run(session, run, result)
+def ensure_partitions_if_due() -> None:
+    """Create upcoming monthly partitions at most once per DB_PARTITION_INTERVAL_SECONDS in this process."""
+    global _last_partition_check
+    interval = settings.db_partition_interval_seconds
+    if not settings.db_partitioned_tables or interval <= 0 or time.monotonic() - _last_partition_check < interval:
+        return
+    _last_partition_check = time.monotonic()
+    try:
+        migrate.ensure_all_partitions()
+    except Exception:  # noqa: BLE001
+        logger.exception("Creating monthly partitions failed")
+
+
+def release_stale_claims(session: Session) -> int:
+    """Return runs whose worker disappeared mid-flight to the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.worker_claim_timeout_seconds)
+    stmt = (
+        update(Run)
+        .where(Run.status == RunStatus.RUNNING, Run.claimed_at < cutoff)
+        .values(status=RunStatus.PENDING, claimed_by=None, claimed_at=None)
+        .returning(Run.task_id)
+        .execution_options(synchronize_session=False)
+    )
+    task_ids = list(session.scalars(stmt))
+    released = len(task_ids)
+    if released:
+        touch_tasks(session, task_ids)
+        notify_on_commit(session, RUNS_CHANNEL)
+        logger.warning("Released %s stale run claims older than %ss", released, settings.worker_claim_timeout_seconds)
+    return released
+
+
+def heartbeat_interval_seconds() -> float:
+    return max(settings.worker_claim_timeout_seconds / 3, 1.0)
+
+
+def release_stale_claims_if_due() -> None:
+    """Release dead workers' claims on a schedule, so it happens even while every worker is busy."""
+    global _last_release
+    if time.monotonic() - _last_release < heartbeat_interval_seconds():
+        return
+    _last_release = time.monotonic()
+    try:
+        with session_scope() as session:
+            release_stale_claims(session)
+    except Exception:  # noqa: BLE001
+        logger.exception("Releasing stale run claims failed")
+
+
+class ClaimHeartbeat:
+    """Keeps ``claimed_at`` fresh on the runs this process is working on.
+
+    release_stale_claims then takes only runs whose worker stopped heartbeating, not runs whose
+    handler is merely slow (a long LLM call, a CI check).
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.run_ids: Set[int] = set()
+        self._thread: threading.Thread | None = None
+
+    @contextmanager
+    def track(self, run_ids: Iterable[int]) -> Iterator[None]:
+        run_ids = set(run_ids)
+        with self.lock:
+            self.run_ids |= run_ids
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.run_ids -= run_ids
+
+    def beat(self) -> int:
+        """Refresh the claims still held by this worker; returns how many were refreshed."""
+        with self.lock:
+            run_ids = sorted(self.run_ids)
+        if not run_ids:
+            return 0
+        # Rows locked right now are being completed by their handler and need no heartbeat.
+        held = (
+            select(Run.id)
+            .where(Run.id.in_(run_ids), Run.status == RunStatus.RUNNING, Run.claimed_by == settings.worker_id)
+            .with_for_update(skip_locked=True)
+        )
+        with session_scope() as session:
+            result = session.execute(
+                update(Run)
+                .where(Run.id.in_(held))
+                .values(claimed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount
+
+    def start(self) -> None:
+        with self.lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="claim-heartbeat", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(heartbeat_interval_seconds())
+            try:
+                self.beat()
+            except Exception:  # noqa: BLE001
+                logger.exception("Run claim heartbeat failed")
+
+
+heartbeat = ClaimHeartbeat()
+
+
+def _context_for(session: Session, task: Task, stage: Stage) -> ContextPack:
+    return build_context(session, task, stage)
+
+
+# LLM-backed stages: role and artifact kind. Splitting request building from result handling
+# lets the async runtime await the model call without holding a database session.
+LLM_STAGES: Dict[Stage, Tuple[str, str]] = {
+    Stage.PRODUCT: ("Product", "TaskSpec"),
+    Stage.ORCHESTRATE: ("Orchestrator", "ContextPack"),
+    Stage.BACKEND: ("Backend", "BackendPlan"),
+    Stage.FRONTEND: ("Frontend", "FrontendPlan"),
+    Stage.DOCS: ("Docs", "Docs"),
+}
+QA_TARGETS: Dict[Stage, Stage] = {Stage.QA_BACKEND: Stage.BACKEND, Stage.QA_FRONTEND: Stage.FRONTEND}
+
+
+def is_llm_stage(stage: Stage) -> bool:
+    return stage in LLM_STAGES or stage in QA_TARGETS
 
 
-def handle_frontend(session: Session, task: Task, run: Run) -> None:
-    ctx = _context_for(task, run.stage)
-    result = llm.call("Frontend", ctx.dict())
-    record_artifact(session, task, run, "FrontendPlan", result)
+def llm_request_for(session: Session, task: Task, run: Run) -> Tuple[str, Dict[str, Any]]:
+    if run.stage == Stage.PRODUCT:
+        return "Product", {"raw_request": task.raw_request}
+    ctx = _context_for(session, task, run.stage)
+    if run.stage in QA_TARGETS:
+        return "QA", {"context": ctx.dict(), "target_stage": QA_TARGETS[run.stage].value}
+    return LLM_STAGES[run.stage][0], ctx.dict()
+
+
+def apply_llm_result(session: Session, task: Task, run: Run, result: Dict[str, Any]) -> None:
+    if run.stage in QA_TARGETS:
+        apply_review(session, task, run, QA_TARGETS[run.stage], result)
+        return
+    record_artifact(session, task, run, LLM_STAGES[run.stage][1], result)
     pass_run(session, run, result)
 
 
-def handle_qa(session: Session, task: Task, run: Run, target_stage: Stage) -> None:
-    ctx = _context_for(task, run.stage)
-    result = llm.call("QA", {"context": ctx.dict(), "target_stage": target_stage.value})
+def apply_review(session: Session, task: Task, run: Run, target_stage: Stage, result: Dict[str, Any]) -> None:
     passed = bool(result.get("passed", True))
     issues = result.get("issues", [])
     suggestions = result.get("suggestions", [])
@@ -95,9 +295,23 @@ def handle_qa(session: Session, task: Task, run: Run, target_stage: Stage) -> No
         spawn_rework_or_fail_task(session, task, target_stage, run.max_attempts)
 
 
+def handle_llm_stage(session: Session, task: Task, run: Run) -> None:
+    role, payload = llm_request_for(session, task, run)
+    if streams_output(run.stage):
+        writer = RunOutputWriter(run.id)
+        try:
+            result = llm.stream_call(role, payload, writer.write, session)
+        finally:
+            writer.close()
+    else:
+        result = llm.call(role, payload, session)
+    apply_llm_result(session, task, run, result)
+
+
 def handle_security(session: Session, task: Task, run: Run) -> None:
-    ctx = _context_for(task, run.stage)
-    diff_summary = "\n".join(plan for plan in ctx.artifacts[-1:]) if ctx.artifacts else ""
+    ctx = _context_for(session, task, run.stage)
+    plan = next((a for a in reversed(ctx.artifacts) if a["kind"] == "BackendPlan"), None)
+    diff_summary = safe_json(plan["data"]) if plan else ""
     review = evaluate_security(diff_summary)
     record_artifact(session, task, run, "SecurityReview", review.dict())
     if review.passed:
@@ -119,35 +333,47 @@ def handle_gate(
         spawn_rework_or_fail_task(session, task, rework_stage, run.max_attempts)
 
 
-def handle_docs(session: Session, task: Task, run: Run) -> None:
-    ctx = _context_for(task, run.stage)
-    result = llm.call("Docs", ctx.dict())
-    record_artifact(session, task, run, "Docs", result)
-    pass_run(session, run, result)
-
-
 def handle_ci_wait(session: Session, task: Task, run: Run) -> None:
-    pr_number = None
-    try:
-        pr_number = task.artifacts[-1].data.get("pr_number") if task.artifacts else None
-    except Exception:
-        pr_number = None
-    if pr_number:
-        ok = wait_for_checks(pr_number)
-    else:
-        ok = True
-    if ok:
-        pass_run(session, run, {"checks": "green"})
-    else:
+    """Check CI once; if it is not green yet, reschedule this run instead of sleeping in the worker."""
+    pr_number = pr_number_for(task)
+    if not pr_number:
+        pass_run(session, run, {"checks": "green", "pr_number": None})
+        return
+    if task.pr_number != pr_number:
+        # Lets GitHub webhooks find and wake this run.
+        task.pr_number = pr_number
+        session.add(task)
+    state = ci_state(session, pr_number)
+    if state == CI_GREEN:
+        pass_run(session, run, {"checks": "green", "pr_number": pr_number})
+        return
+    if state == CI_FAILED:
+        fail_run(session, run, "CI checks failed")
+        spawn_retry_or_fail_task(session, task, run)
+        return
+    payload = dict(run.payload or {})
+    now = datetime.utcnow()
+    deadline = datetime.fromisoformat(
+        payload.setdefault("ci_deadline", (now + timedelta(seconds=settings.ci_timeout_seconds)).isoformat())
+    )
+    if now >= deadline:
         fail_run(session, run, "CI checks failed or timeout")
         spawn_retry_or_fail_task(session, task, run)
+        return
+    checks = payload.get("ci_checks", 0)
+    payload["ci_checks"] = checks + 1
+    payload["pr_number"] = pr_number
+    defer_run(session, run, next_check_delay(checks), payload)
 
 
 def handle_human_approval(session: Session, task: Task, run: Run) -> None:
-    decision = next((d for d in task.decisions if d.kind == DecisionKind.HUMAN_APPROVAL), None)
+    decision = latest_decision(session, task)
+    if not decision:
+        # approve/reject take the same lock, so a decision is either visible now or will find the parked run.
+        lock_task(session, task)
+        decision = latest_decision(session, task)
     if not decision:
-        run.status = RunStatus.PENDING
-        session.add(run)
+        park_run(session, run)
         return
     if decision.decision == DecisionValue.APPROVE:
         pass_run(session, run, {"decision": decision.decision.value, "comment": decision.comment})
@@ -156,31 +382,38 @@ def handle_human_approval(session: Session, task: Task, run: Run) -> None:
         spawn_retry_or_fail_task(session, task, run)
 
 
+def pr_number_for(task: Task) -> Optional[int]:
+    for art in sorted(task.artifacts, key=lambda a: a.id, reverse=True):
+        summary = artifact_summary(art)
+        if summary.get("pr_number"):
+            return summary["pr_number"]
+    return None
+
+
+def complete_merge(session: Session, task: Task, run: Run, pr_number: Optional[int]) -> None:
+    pass_run(session, run, {"merged": True, "pr_number": pr_number})
+    set_task_status(session, task, TaskStatus.DONE)
+
+
 def handle_merge(session: Session, task: Task, run: Run) -> None:
-    client = GitHubClient()
-    pr_number = None
-    for art in reversed(task.artifacts):
-        if "pr_number" in art.data:
-            pr_number = art.data["pr_number"]
-            break
+    client = get_github_client()
+    pr_number = pr_number_for(task)
     if pr_number:
-        client.comment_pull_request(pr_number, "Merging after approval")
-    pass_run(session, run, {"merged": True, "pr_number": pr_number})
-    task.status = TaskStatus.DONE
-    session.add(task)
+        client.comment_pull_request(pr_number, MERGE_COMMENT)
+    complete_merge(session, task, run, pr_number)
 
 
-HANDLERS: Dict[Stage, Callable[[Session, Task, Run], None]] = {
-    Stage.PRODUCT: handle_product,
-    Stage.ORCHESTRATE: handle_orchestrate,
-    Stage.BACKEND: handle_backend,
-    Stage.QA_BACKEND: lambda s, t, r: handle_qa(s, t, r, Stage.BACKEND),
+HANDLERS: Dict[Stage, Handler] = {
+    Stage.PRODUCT: handle_llm_stage,
+    Stage.ORCHESTRATE: handle_llm_stage,
+    Stage.BACKEND: handle_llm_stage,
+    Stage.QA_BACKEND: handle_llm_stage,
     Stage.SECURITY: handle_security,
     Stage.BACKEND_GATE: lambda s, t, r: handle_gate(s, t, r, is_backend_gate_ready, Stage.BACKEND),
-    Stage.FRONTEND: handle_frontend,
-    Stage.QA_FRONTEND: lambda s, t, r: handle_qa(s, t, r, Stage.FRONTEND),
+    Stage.FRONTEND: handle_llm_stage,
+    Stage.QA_FRONTEND: handle_llm_stage,
     Stage.FRONTEND_GATE: lambda s, t, r: handle_gate(s, t, r, is_frontend_gate_ready, Stage.FRONTEND),
-    Stage.DOCS: handle_docs,
+    Stage.DOCS: handle_llm_stage,
     Stage.DOCS_GATE: lambda s, t, r: handle_gate(s, t, r, is_docs_gate_ready, Stage.DOCS),
     Stage.CI_WAIT: handle_ci_wait,
     Stage.HUMAN_APPROVAL: handle_human_approval,
@@ -188,13 +421,29 @@ HANDLERS: Dict[Stage, Callable[[Session, Task, Run], None]] = {
 }
 
 
-def process_run(session: Session, run: Run) -> None:
+def process_run(session: Session, run: Run, handler: Handler | None = None) -> None:
     task = session.get(Task, run.task_id)
     if not task:
         return
+    # From the claim, so the async runtime's awaited LLM/GitHub time before this call is included.
+    started = run.claimed_at or datetime.utcnow()
+    try:
+        # Under the async runtime the run's span is already open around the awaited I/O; this is the apply step.
+        name = f"run.{run.stage.value}" if tracing.current_span() is None else "run.apply"
+        with tracing.start_trace(
+            run.trace_id, name, task_id=task.id, run_id=run.id, stage=run.stage.value, attempt=run.attempt
+        ) as span, profiling.profile(run.stage.value):
+            _advance(session, task, run, handler)
+            span.set(status=run.status.value)
+    finally:
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        STAGE_DURATION.observe(elapsed, stage=run.stage.value, outcome=run.status.value)
+
+
+def _advance(session: Session, task: Task, run: Run, handler: Handler | None) -> None:
     run.status = RunStatus.RUNNING
     session.add(run)
-    handler = HANDLERS.get(run.stage)
+    handler = handler or HANDLERS.get(run.stage)
     if not handler:
         fail_run(session, run, f"No handler for stage {run.stage}")
         spawn_retry_or_fail_task(session, task, run)
@@ -210,25 +459,68 @@ def process_run(session: Session, run: Run) -> None:
         enqueue_next(session, task, run, run.max_attempts)
 
 
+def process_claimed_run(run_id: int, handler: Handler | None = None) -> None:
+    with session_scope() as session:
+        run = session.get(Run, run_id)
+        # A run released and re-claimed elsewhere belongs to that worker now; drop this result.
+        if not run or run.status != RunStatus.RUNNING or run.claimed_by != settings.worker_id:
+            return
+        process_run(session, run, handler)
+
+
 def run_once() -> bool:
+    # Claim in a short transaction of its own so row locks are never held while a handler runs.
     with session_scope() as session:
-        run = get_next_run(session)
-        if not run:
-            return False
-        process_run(session, run)
-        return True
+        run_ids = [run.id for run in claim_runs(session, settings.worker_claim_batch_size)]
+    with heartbeat.track(run_ids):
+        for run_id in run_ids:
+            process_claimed_run(run_id)
+    return bool(run_ids)
 
 
 def worker_loop() -> None:
-    logger.info("Starting worker loop")
-    while True:
-        has_work = run_once()
-        if not has_work:
-            time.sleep(settings.worker_poll_interval_seconds)
+    logger.info("Starting worker loop as %s", settings.worker_id)
+    # Subscribe before the first claim so a run enqueued in between still wakes us.
+    subscription = get_notifier().subscribe(RUNS_CHANNEL)
+    heartbeat.start()
+    try:
+        while True:
+            sweep_ci_if_due()
+            archive_if_due()
+            ensure_partitions_if_due()
+            release_stale_claims_if_due()
+            has_work = run_once()
+            if not has_work:
+                with session_scope() as session:
+                    timeout = idle_wait_seconds(session)
+                # New runs notify on commit; deferred runs bound the wait, and polling is only a safety net.
+                subscription.wait(timeout)
+    finally:
+        subscription.close()
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Advance pipeline runs.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.worker_concurrency,
+        help="Runs processed at once; values above 1 use the asyncio runtime.",
+    )
+    args = parser.parse_args(argv)
+    if settings.metrics_port:
+        start_http_server(settings.metrics_port)
+        logger.info("Serving worker metrics on :%s/metrics", settings.metrics_port)
+    if args.concurrency > 1:
+        from orchestrator.async_worker import run_async_worker
+
+        asyncio.run(run_async_worker(args.concurrency))
+    else:
+        worker_loop()
 
 
-__all__ = ["worker_loop", "run_once", "create_initial_runs"]
+__all__ = ["worker_loop", "run_once", "claim_runs", "get_next_run", "process_claimed_run", "create_initial_runs"]
 
 
 if __name__ == "__main__":
-    worker_loop()
+    main()
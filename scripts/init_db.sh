@@ -1,3 +1,4 @@
 #!/usr/bin/env bash
 set -euo pipefail
-psql "$DATABASE_URL" -f migrations/001_init.sql
+# Applies pending migrations/*.sql once each and records them in schema_migrations.
+python -m orchestrator.migrate upgrade
@@ -0,0 +1,52 @@
+"""Shared fixtures: every test runs against a throwaway SQLite database and blob store."""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="orchestrator-tests-")
+# Settings are read at import time, so point them at the sandbox before importing orchestrator.
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/orchestrator.db",
+    BLOB_STORE_PATH=os.path.join(_tmp, "blobs"),
+    TRACING_DIR=os.path.join(_tmp, "traces"),
+    PROFILING_DIR=os.path.join(_tmp, "profiles"),
+    GITHUB_WEBHOOK_SECRET="test-secret",
+    GITHUB_REPO="acme/widgets",
+    GITHUB_TOKEN="test-token",
+)
+os.environ.pop("LLM_ENDPOINT", None)
+
+import pytest  # noqa: E402
+
+from orchestrator import context, migrate  # noqa: E402
+from orchestrator.db import engine, session_scope  # noqa: E402
+from orchestrator.models import Base  # noqa: E402
+from orchestrator.pipeline import create_tasks  # noqa: E402
+from orchestrator.schemas import TaskCreate  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrate.upgrade(engine)
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clean_db(schema):
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            if table.name != "schema_migrations":
+                conn.execute(table.delete())
+    context.invalidate()
+
+
+@pytest.fixture
+def new_task():
+    """Create a task with its pending Product run; returns the task id."""
+
+    def create(title: str = "Add an endpoint", raw_request: str = "Expose stock levels over HTTP") -> int:
+        with session_scope() as session:
+            [(task_id, _)] = create_tasks(session, [TaskCreate(title=title, raw_request=raw_request)], 3)
+        return task_id
+
+    return create
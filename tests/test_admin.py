@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+from orchestrator import main
+
+
+def test_profiles_require_the_admin_token(monkeypatch):
+    with TestClient(main.app) as client:
+        monkeypatch.setattr(main.settings, "admin_token", None)
+        assert client.get("/admin/profiles").status_code == 503
+        monkeypatch.setattr(main.settings, "admin_token", "s3cret")
+        assert client.get("/admin/profiles").status_code == 401
+        assert client.get("/admin/profiles", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        reply = client.get("/admin/profiles", params={"sort": "tottime"}, headers={"Authorization": "Bearer s3cret"})
+        assert reply.status_code == 200
+        assert "stages" in reply.json()
+        bad_sort = client.get("/admin/profiles", params={"sort": "name"}, headers={"Authorization": "Bearer s3cret"})
+        assert bad_sort.status_code == 422
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from orchestrator import archive
+from orchestrator.db import session_scope
+from orchestrator.main import app
+from orchestrator.models import Artifact, Run, Task, TaskStatus
+from orchestrator.pipeline import record_artifact
+
+
+def test_archived_artifacts_stay_readable(new_task):
+    task_id = new_task()
+    other_id = new_task()
+    with session_scope() as session:
+        task = session.get(Task, task_id)
+        run = session.scalars(select(Run).where(Run.task_id == task_id)).one()
+        record_artifact(session, task, run, "spec", {"goal": "Expose stock levels"})
+        session.add(Artifact(task_id=task_id, run_id=run.id, kind="legacy", data={"inline": True}))
+    with session_scope() as session:
+        blob_id, inline_id = session.scalars(select(Artifact.id).where(Artifact.task_id == task_id).order_by(Artifact.id))
+        session.execute(
+            update(Task)
+            .where(Task.id == task_id)
+            .values(status=TaskStatus.DONE, updated_at=datetime.utcnow() - timedelta(days=60))
+        )
+    with session_scope() as session:
+        assert archive.archive_batch(session, datetime.utcnow() - timedelta(days=30), 10) == [task_id]
+
+    with TestClient(app) as client:
+        blob = client.get(f"/tasks/{task_id}/artifacts/{blob_id}")
+        assert blob.status_code == 200
+        assert (blob.json()["kind"], blob.json()["data"]) == ("spec", {"goal": "Expose stock levels"})
+        assert client.get(f"/tasks/{task_id}/artifacts/{inline_id}").json()["data"] == {"inline": True}
+        assert client.get(f"/tasks/{task_id}/artifacts/{inline_id + 100}").status_code == 404
+        # The artifact id is only served under the task it belonged to.
+        assert client.get(f"/tasks/{other_id}/artifacts/{blob_id}").status_code == 404
@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import select
+
+from orchestrator import async_worker, profiling
+from orchestrator.db import session_scope
+from orchestrator.models import Run, RunStatus, Stage
+from orchestrator.worker import claim_runs, settings
+
+
+def test_prepare_failure_fails_the_run_and_schedules_a_retry(new_task, monkeypatch):
+    task_id = new_task()
+    with session_scope() as session:
+        [run] = claim_runs(session, 1)
+        run_id = run.id
+
+    def broken_request(session, task, run):
+        raise ValueError("cannot build context")
+
+    monkeypatch.setattr(async_worker, "llm_request_for", broken_request)
+    asyncio.run(async_worker.process_run_async(run_id, github=None))
+
+    with session_scope() as session:
+        runs = list(session.scalars(select(Run).where(Run.task_id == task_id).order_by(Run.id)))
+        assert [(r.status, r.attempt) for r in runs] == [(RunStatus.FAIL, 1), (RunStatus.PENDING, 2)]
+        assert runs[0].error == "cannot build context"
+
+
+def test_async_profile_covers_request_building(new_task, monkeypatch):
+    task_id = new_task()
+    with session_scope() as session:
+        run = Run(
+            task_id=task_id,
+            stage=Stage.ORCHESTRATE,
+            status=RunStatus.RUNNING,
+            attempt=1,
+            max_attempts=3,
+            claimed_by=settings.worker_id,
+        )
+        session.add(run)
+        session.flush()
+        run_id = run.id
+    profiling.reset()
+    monkeypatch.setattr(profiling, "should_profile", lambda stage: True)
+    asyncio.run(async_worker.process_run_async(run_id, github=None, stage=Stage.ORCHESTRATE))
+
+    summary = profiling.summary("ORCHESTRATE", limit=10_000)["ORCHESTRATE"]
+    functions = [f["function"] for f in summary["functions"]]
+    assert summary["samples"] == 1
+    assert any("(_context_for)" in name for name in functions)
+    assert any("(apply_llm_result)" in name for name in functions)
+    profiling.reset()
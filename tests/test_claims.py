@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from orchestrator.db import session_scope
+from orchestrator.models import Run, RunStatus, Stage
+from orchestrator.pipeline import pass_run
+from orchestrator.worker import ClaimHeartbeat, claim_runs, process_claimed_run, release_stale_claims, settings
+
+
+def _age_claim(run_id: int, seconds: float) -> None:
+    with session_scope() as session:
+        session.get(Run, run_id).claimed_at = datetime.utcnow() - timedelta(seconds=seconds)
+
+
+def test_claims_hand_out_each_pending_run_once(new_task):
+    task_ids = [new_task(title=f"Task {i}") for i in range(3)]
+    with session_scope() as session:
+        first = [run.id for run in claim_runs(session, 2)]
+    with session_scope() as session:
+        second = [run.id for run in claim_runs(session, 2)]
+        assert claim_runs(session, 2) == []
+
+    assert len(first) == 2 and len(second) == 1 and not set(first) & set(second)
+    with session_scope() as session:
+        runs = [session.get(Run, run_id) for run_id in first + second]
+        assert sorted(run.task_id for run in runs) == task_ids
+        assert {(run.status, run.claimed_by) for run in runs} == {(RunStatus.RUNNING, settings.worker_id)}
+
+
+def test_deferred_runs_are_claimed_only_once_due(new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        run = session.query(Run).filter_by(task_id=task_id).one()
+        run.not_before = datetime.utcnow() + timedelta(minutes=5)
+    with session_scope() as session:
+        assert claim_runs(session, 1) == []
+        session.query(Run).filter_by(task_id=task_id).one().not_before = datetime.utcnow() - timedelta(seconds=1)
+    with session_scope() as session:
+        assert [run.task_id for run in claim_runs(session, 1)] == [task_id]
+
+
+def test_only_claims_past_the_timeout_are_released(new_task):
+    new_task(title="Stale")
+    new_task(title="Fresh")
+    with session_scope() as session:
+        stale, fresh = [run.id for run in claim_runs(session, 2)]
+    _age_claim(stale, settings.worker_claim_timeout_seconds + 5)
+
+    with session_scope() as session:
+        assert release_stale_claims(session) == 1
+    with session_scope() as session:
+        released, kept = session.get(Run, stale), session.get(Run, fresh)
+        assert (released.status, released.claimed_by, released.claimed_at) == (RunStatus.PENDING, None, None)
+        assert kept.status == RunStatus.RUNNING
+
+
+def test_heartbeat_keeps_a_slow_run_claimed(new_task):
+    new_task(title="Slow")
+    new_task(title="Dropped")
+    with session_scope() as session:
+        slow, dropped = [run.id for run in claim_runs(session, 2)]
+    heartbeat = ClaimHeartbeat()
+    with heartbeat.track([slow]):
+        _age_claim(slow, settings.worker_claim_timeout_seconds + 5)
+        _age_claim(dropped, settings.worker_claim_timeout_seconds + 5)
+        assert heartbeat.beat() == 1
+        with session_scope() as session:
+            assert release_stale_claims(session) == 1
+    assert heartbeat.beat() == 0
+
+    with session_scope() as session:
+        assert session.get(Run, slow).status == RunStatus.RUNNING
+        assert session.get(Run, dropped).status == RunStatus.PENDING
+
+
+def test_result_is_dropped_once_another_worker_owns_the_run(new_task):
+    new_task()
+    with session_scope() as session:
+        [run] = claim_runs(session, 1)
+        run_id = run.id
+    with session_scope() as session:
+        session.get(Run, run_id).claimed_by = "other-worker"
+
+    process_claimed_run(run_id, lambda s, t, r: pass_run(s, r, {"late": True}))
+
+    with session_scope() as session:
+        run = session.get(Run, run_id)
+        assert (run.status, run.claimed_by) == (RunStatus.RUNNING, "other-worker")
+        assert session.query(Run).filter(Run.stage != Stage.PRODUCT).count() == 0
@@ -0,0 +1,44 @@
+from orchestrator import context
+from orchestrator.db import session_scope
+from orchestrator.models import Artifact, Stage, Task
+
+
+def add_artifact(task_id: int, kind: str, data: dict, artifact_id: int | None = None) -> None:
+    with session_scope() as session:
+        session.add(Artifact(id=artifact_id, task_id=task_id, kind=kind, data=data))
+
+
+def test_context_selects_latest_artifact_of_each_needed_kind(new_task):
+    task_id = new_task()
+    add_artifact(task_id, "TaskSpec", {"goal": "stock levels", "acceptance_criteria": [], "constraints": []})
+    add_artifact(task_id, "BackendPlan", {"summary": "v1"})
+    add_artifact(task_id, "BackendPlan", {"summary": "v2"})
+    add_artifact(task_id, "FrontendPlan", {"summary": "ui"})
+    with session_scope() as session:
+        ctx = context.build_context(session, session.get(Task, task_id), Stage.QA_BACKEND)
+    assert [(a["kind"], a["data"].get("summary")) for a in ctx.artifacts] == [("TaskSpec", None), ("BackendPlan", "v2")]
+
+
+def test_artifact_committed_with_a_lower_id_is_still_picked_up(new_task):
+    task_id = new_task()
+    add_artifact(task_id, "TaskSpec", {"goal": "stock levels", "acceptance_criteria": [], "constraints": []}, 1)
+    add_artifact(task_id, "FrontendPlan", {"summary": "ui"}, 10)
+    with session_scope() as session:
+        assert set(context.latest_artifacts(session, task_id)) == {"TaskSpec", "FrontendPlan"}
+    # A parallel branch's artifact whose id was allocated earlier but committed later.
+    add_artifact(task_id, "BackendPlan", {"summary": "api"}, 7)
+    with session_scope() as session:
+        ctx = context.build_context(session, session.get(Task, task_id), Stage.DOCS)
+    assert [a["kind"] for a in ctx.artifacts] == ["TaskSpec", "BackendPlan", "FrontendPlan"]
+
+
+def test_cached_payloads_are_reused_until_a_newer_artifact_of_the_kind_appears(new_task, monkeypatch):
+    task_id = new_task()
+    add_artifact(task_id, "BackendPlan", {"summary": "v1"})
+    with session_scope() as session:
+        first = context.latest_artifacts(session, task_id)
+    with session_scope() as session:
+        assert context.latest_artifacts(session, task_id)["BackendPlan"] is first["BackendPlan"]
+    add_artifact(task_id, "BackendPlan", {"summary": "v2"})
+    with session_scope() as session:
+        assert context.latest_artifacts(session, task_id)["BackendPlan"]["data"] == {"summary": "v2"}
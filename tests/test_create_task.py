@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from orchestrator import main
+from orchestrator.db import session_scope
+from orchestrator.models import Task
+
+
+def test_racing_create_with_the_same_key_returns_the_existing_task(monkeypatch):
+    payload = {"title": "Stock levels", "raw_request": "Expose stock levels", "idempotency_key": "import-1"}
+    with TestClient(main.app) as client:
+        first = client.post("/tasks", json=payload)
+        assert first.status_code == 200
+
+        lookups = []
+        task_by_key = main._task_by_key
+
+        def misses_once(session, key):
+            # The first lookup runs before the other request's insert is visible.
+            lookups.append(key)
+            return None if len(lookups) == 1 else task_by_key(session, key)
+
+        monkeypatch.setattr(main, "_task_by_key", misses_once)
+        second = client.post("/tasks", json=payload)
+
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert len(lookups) == 2
+    with session_scope() as session:
+        assert session.scalar(select(func.count()).select_from(Task)) == 1
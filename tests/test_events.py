@@ -0,0 +1,80 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from orchestrator.db import get_async_engine, session_scope
+from orchestrator.events import EventBroker
+from orchestrator.main import app
+from orchestrator.models import Run, TaskEvent
+
+
+def _enqueued(task_id):
+    with session_scope() as session:
+        run_id = session.scalar(select(Run.id).where(Run.task_id == task_id))
+        events = session.scalars(select(TaskEvent).where(TaskEvent.task_id == task_id)).all()
+        return run_id, [(e.kind, e.run_id, e.stage, e.status, e.data) for e in events]
+
+
+def test_bulk_and_single_creation_emit_the_same_events():
+    with TestClient(app) as client:
+        single = client.post("/tasks", json={"title": "One", "raw_request": "Do one thing"}).json()["id"]
+        batch = client.post(
+            "/tasks:batch", json=[{"title": "Two", "raw_request": "Do two"}, {"title": "Three", "raw_request": "Do three"}]
+        ).json()["ids"]
+    for task_id in [single] + batch:
+        run_id, events = _enqueued(task_id)
+        assert events == [("run_enqueued", run_id, "PRODUCT", "PENDING", {"attempt": 1})]
+
+
+def _add_event(task_id, event_id):
+    with session_scope() as session:
+        session.execute(insert(TaskEvent), [{"id": event_id, "task_id": task_id, "kind": "note"}])
+
+
+def test_broker_delivers_an_event_that_commits_below_the_cursor(new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        base = session.scalar(select(TaskEvent.id).where(TaskEvent.task_id == task_id))
+
+    async def scenario():
+        broker = EventBroker()
+        await broker.start()
+        try:
+            queue = broker.subscribe(task_id)
+            # base + 1 is allocated but not yet committed when base + 2 becomes visible.
+            _add_event(task_id, base + 2)
+            await broker.fetch()
+            assert broker.gaps.keys() == {base + 1}
+            waiter = asyncio.create_task(broker.settled(base + 2, 5))
+            await asyncio.sleep(0)
+            assert not waiter.done()
+            _add_event(task_id, base + 1)
+            await broker.fetch()
+            await asyncio.wait_for(waiter, 1)
+            return [queue.get_nowait().id for _ in range(queue.qsize())]
+        finally:
+            await broker.stop()
+            await get_async_engine().dispose()
+
+    assert asyncio.run(scenario()) == [base + 2, base + 1]
+
+
+def test_settled_gives_up_after_the_timeout(new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        base = session.scalar(select(TaskEvent.id).where(TaskEvent.task_id == task_id))
+
+    async def scenario():
+        broker = EventBroker()
+        await broker.start()
+        try:
+            _add_event(task_id, base + 2)
+            await broker.fetch()
+            await broker.settled(base + 2, 0.05)
+            return set(broker.gaps)
+        finally:
+            await broker.stop()
+            await get_async_engine().dispose()
+
+    assert asyncio.run(scenario()) == {base + 1}
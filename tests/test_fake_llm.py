@@ -0,0 +1,38 @@
+import dataclasses
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from orchestrator import fake_llm
+
+
+@pytest.fixture
+def client():
+    defaults = dataclasses.asdict(fake_llm.get_config())
+    yield TestClient(fake_llm.app)
+    fake_llm.configure(**defaults)
+
+
+def test_failure_and_qa_rejection_knobs(client):
+    fake_llm.configure(qa_reject_rate=1.0, payload_bytes=16, pr_numbers=True, seed=7)
+    [qa] = client.post("/v1/batch", json={"role": "QA", "inputs": [{}]}).json()["outputs"]
+    assert qa["passed"] is False and qa["issues"] == ["Synthetic QA rejection"]
+    assert qa["notes"] == "x" * 16
+    [backend] = client.post("/v1/batch", json={"role": "Backend", "inputs": [{"task_id": 12}]}).json()["outputs"]
+    assert backend["pr_number"] == 12
+
+    fake_llm.configure(failure_rate=1.0)
+    assert client.post("/v1/batch", json={"role": "Docs", "inputs": [{}]}).status_code == 500
+    assert client.post("/v1/stream", json={"role": "Docs", "input": {}}).status_code == 500
+    assert client.get("/stats").json()["by_endpoint"] == {"batch Docs": 1, "stream Docs": 1}
+
+
+def test_server_runs_in_process(client):
+    server = fake_llm.FakeLLMServer().start()
+    try:
+        reply = requests.post(f"{server.url}/v1/stream", json={"role": "Product", "input": {"raw_request": "hi"}})
+    finally:
+        server.stop()
+    assert reply.json()["goal"] == "hi"
+    assert not server.thread.is_alive()
@@ -0,0 +1,163 @@
+"""GitHub clients against a local stub server with scripted responses."""
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import requests
+
+from orchestrator import github_client
+from orchestrator.github_client import AsyncGitHubClient, ETagCache, GitHubClient, RateLimiter
+
+Reply = Tuple[int, Dict[str, str], Any]
+
+
+class StubGitHub:
+    def __init__(self) -> None:
+        self.replies: List[Reply] = []
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # noqa: A002
+                return None
+
+            def _reply(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                stub.requests.append((self.command, self.path, dict(self.headers)))
+                status, headers, body = stub.replies.pop(0) if stub.replies else (200, {}, {})
+                data = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _reply  # noqa: N815
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubGitHub()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def slept(monkeypatch):
+    delays: List[float] = []
+
+    async def fake_async_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(github_client.time, "sleep", delays.append)
+    monkeypatch.setattr(github_client.asyncio, "sleep", fake_async_sleep)
+    monkeypatch.setattr(github_client.get_settings(), "github_max_retries", 2)
+    return delays
+
+
+def make(cls, base_url: str):
+    client = cls()
+    client.base_url = base_url
+    client.limiter = RateLimiter()
+    client.etags = ETagCache(16)
+    return client
+
+
+def test_get_is_retried_on_server_errors(stub, slept):
+    stub.replies = [(502, {}, {"message": "bad gateway"}), (200, {}, {"mergeable_state": "clean"})]
+    assert make(GitHubClient, stub.url).check_pr_status(7) is True
+    assert len(stub.requests) == 2 and len(slept) == 1
+
+
+def test_post_is_not_retried_on_server_errors(stub, slept):
+    stub.replies = [(502, {}, {"message": "bad gateway"})]
+    with pytest.raises(RuntimeError):
+        make(GitHubClient, stub.url).comment_pull_request(7, "LGTM")
+    assert len(stub.requests) == 1 and slept == []
+
+
+def test_post_is_retried_when_rate_limited(stub, slept):
+    stub.replies = [(429, {"Retry-After": "3"}, {"message": "slow down"}), (201, {}, {"id": 1})]
+    make(GitHubClient, stub.url).comment_pull_request(7, "LGTM")
+    assert [r[0] for r in stub.requests] == ["POST", "POST"]
+    assert 3.0 in slept
+
+
+def test_post_is_not_retried_after_a_transport_error(slept):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        dead_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    client = make(GitHubClient, dead_url)
+    with pytest.raises(requests.ConnectionError):
+        client.comment_pull_request(7, "LGTM")
+    assert slept == []
+    with pytest.raises(requests.ConnectionError):
+        client.check_pr_status(7)
+    assert len(slept) == 2
+
+
+def test_conditional_get_serves_304_from_the_etag_cache(stub, slept):
+    stub.replies = [(200, {"ETag": '"v1"'}, {"mergeable_state": "clean"}), (304, {"ETag": '"v1"'}, None)]
+    client = make(GitHubClient, stub.url)
+    url = f"{stub.url}/repos/acme/widgets/pulls/7"
+    first = client._request("GET", url)
+    second = client._request("GET", url)
+    assert not first.from_cache and second.from_cache
+    assert second.data == {"mergeable_state": "clean"}
+    assert stub.requests[1][2].get("If-None-Match") == '"v1"'
+
+
+def test_exhausted_rate_limit_waits_for_the_reset(stub, slept):
+    reset_at = int(time.time()) + 30
+    stub.replies = [
+        (200, {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset_at)}, {}),
+        (200, {}, {"mergeable_state": "clean"}),
+    ]
+    client = make(GitHubClient, stub.url)
+    client.check_pr_status(7)
+    client.check_pr_status(7)
+    assert len(slept) == 1 and 25 < slept[0] <= 30
+
+
+def test_async_client_shares_the_retry_rules(stub, slept):
+    stub.replies = [
+        (503, {}, {"message": "unavailable"}),
+        (503, {}, {"message": "unavailable"}),
+        (200, {"ETag": '"v2"'}, {"mergeable_state": "blocked"}),
+        (304, {}, None),
+    ]
+
+    async def scenario():
+        client = make(AsyncGitHubClient, stub.url)
+        try:
+            with pytest.raises(RuntimeError):
+                await client.comment_pull_request(7, "LGTM")
+            first = await client.check_pr_status(7)
+            second = await client._request("GET", f"{stub.url}/repos/acme/widgets/pulls/7")
+        finally:
+            await client.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is False and second.from_cache
+    assert [r[0] for r in stub.requests] == ["POST", "GET", "GET", "GET"]
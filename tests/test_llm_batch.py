@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from orchestrator import fake_llm, llm
+from orchestrator.llm_batch import LLMBatcher
+
+FAKE_URL = "http://fake-llm"
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """llm's real batch transport, talking to orchestrator.fake_llm in-process."""
+    monkeypatch.setattr(llm.settings, "llm_endpoint", FAKE_URL)
+    fake_llm.batch_sizes.clear()
+    transport = llm._AsyncTransport()
+    transport.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_llm.app), base_url=FAKE_URL)
+    return transport
+
+
+def test_concurrent_calls_are_batched_and_duplicates_coalesced(transport):
+    async def scenario():
+        batcher = LLMBatcher(transport, max_size=4, max_wait_ms=50)
+        inputs = [{"task_id": n} for n in range(6)] + [{"task_id": 0}, {"task_id": 1}]
+        results = await asyncio.gather(*(batcher.submit("Backend", "plan", item) for item in inputs))
+        await transport.client.aclose()
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert results[6] == results[0] and results[7] == results[1]
+    assert all(r["summary"] == "Backend output" for r in results)
+    assert dict(fake_llm.batch_sizes) == {4: 1, 2: 1}
+    stats = batcher.batch_stats()["Backend"]
+    assert (stats["calls"], stats["coalesced"], stats["batches"], stats["items"]) == (8, 2, 2, 6)
+
+
+def test_roles_are_batched_separately(transport):
+    async def scenario():
+        batcher = LLMBatcher(transport, max_size=8, max_wait_ms=20)
+        product, qa = await asyncio.gather(
+            batcher.submit("Product", "", {"raw_request": "stock levels"}),
+            batcher.submit("QA", "", {"target_stage": "BACKEND"}),
+        )
+        await transport.client.aclose()
+        return product, qa
+
+    product, qa = asyncio.run(scenario())
+    assert product["goal"] == "stock levels"
+    assert qa["passed"] is True
+    assert dict(fake_llm.batch_sizes) == {1: 2}
+
+
+def test_batch_failure_reaches_every_waiter():
+    async def failing(role, prompt, inputs):
+        raise RuntimeError("LLM call failed: 503")
+
+    async def scenario():
+        batcher = LLMBatcher(failing, max_size=4, max_wait_ms=10)
+        return await asyncio.gather(
+            *(batcher.submit("Docs", "", {"task_id": n}) for n in range(3)), return_exceptions=True
+        ), batcher
+
+    results, batcher = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.inflight == {}
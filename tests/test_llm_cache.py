@@ -0,0 +1,46 @@
+from sqlalchemy import event, select, text
+
+from orchestrator import llm, llm_cache
+from orchestrator.db import engine, session_scope
+from orchestrator.models import LLMCacheEntry
+
+
+def max_checked_out(fn):
+    peak = [0]
+
+    def on_checkout(*args):
+        peak[0] = max(peak[0], engine.pool.checkedout())
+
+    event.listen(engine, "checkout", on_checkout)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "checkout", on_checkout)
+    return peak[0]
+
+
+def test_call_in_a_run_session_uses_that_sessions_connection():
+    llm_cache.clear_memory()
+
+    def run():
+        with session_scope() as session:
+            session.execute(text("SELECT 1"))
+            first = llm.call("Docs", {"task_id": 1}, session)
+            llm_cache.clear_memory()
+            assert llm.call("Docs", {"task_id": 1}, session) == first
+
+    assert max_checked_out(run) == 1
+    with session_scope() as session:
+        assert session.scalar(select(LLMCacheEntry.role)) == "Docs"
+    assert llm_cache.cache_stats()["Docs"]["durable_hit"] >= 1
+
+
+def test_failed_cache_write_does_not_abort_the_callers_transaction(monkeypatch):
+    def unserializable(value):
+        raise TypeError("not JSON")
+
+    monkeypatch.setattr(llm_cache, "canonical_json", unserializable)
+    with session_scope() as session:
+        session.execute(text("SELECT 1"))
+        llm_cache.store("Docs", "k" * 64, {"summary": "x"}, session)
+        assert session.scalar(text("SELECT 1")) == 1
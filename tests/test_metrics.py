@@ -0,0 +1,42 @@
+import logging
+
+import pytest
+
+from orchestrator.db import session_scope
+from orchestrator.metrics import RUN_TRANSITIONS, CallbackMetric, Counter, Registry
+from orchestrator.pipeline import create_tasks
+from orchestrator.schemas import TaskCreate
+
+
+def _enqueued() -> float:
+    return RUN_TRANSITIONS.values.get(("PRODUCT", "PENDING"), 0.0)
+
+
+def test_transitions_are_counted_on_commit_only():
+    before = _enqueued()
+    with pytest.raises(RuntimeError):
+        with session_scope() as session:
+            create_tasks(session, [TaskCreate(title="Rolled back", raw_request="Never happens")], 3)
+            assert _enqueued() == before
+            raise RuntimeError("abort")
+    assert _enqueued() == before
+    with session_scope() as session:
+        create_tasks(session, [TaskCreate(title=f"Task {i}", raw_request="Do it") for i in range(2)], 3)
+        assert _enqueued() == before
+    assert _enqueued() == before + 2
+
+
+def test_failing_callback_is_logged_and_skipped(caplog):
+    def broken():
+        raise ValueError("stats unavailable")
+
+    registry = Registry()
+    registry.register(CallbackMetric("broken_total", "Always fails.", "gauge", (), broken))
+    counter = Counter("ok_total", "Still rendered.")
+    counter.inc()
+    registry.register(counter)
+    with caplog.at_level(logging.ERROR, logger="wms-orchestrator"):
+        text = registry.render()
+    assert "ok_total 1" in text
+    assert "broken_total" not in text
+    assert "Failed to render metric broken_total" in caplog.text
@@ -0,0 +1,52 @@
+import threading
+
+from orchestrator import notify
+from orchestrator.db import session_scope
+from orchestrator.notify import InProcessNotifier, PostgresSubscription, notify_on_commit
+
+
+def test_in_process_wait_wakes_on_notify():
+    notifier = InProcessNotifier()
+    subscription = notifier.subscribe("runs")
+    timer = threading.Timer(0.05, notifier.notify, args=("runs",))
+    timer.start()
+    assert subscription.wait(5) is True
+    assert subscription.wait(0.01) is False
+
+
+def test_in_process_notifications_before_subscribe_are_not_replayed():
+    notifier = InProcessNotifier()
+    notifier.notify("runs")
+    assert notifier.subscribe("runs").wait(0.01) is False
+
+
+def test_notify_on_commit_delivers_only_after_commit(monkeypatch):
+    notifier = InProcessNotifier()
+    monkeypatch.setattr(notify, "get_notifier", lambda: notifier)
+    subscription = notifier.subscribe(notify.RUNS_CHANNEL)
+
+    try:
+        with session_scope() as session:
+            notify_on_commit(session, notify.RUNS_CHANNEL)
+            raise RuntimeError("roll back")
+    except RuntimeError:
+        pass
+    assert subscription.wait(0.01) is False
+
+    with session_scope() as session:
+        notify_on_commit(session, notify.RUNS_CHANNEL)
+    assert subscription.wait(0.01) is True
+
+
+class _BrokenEngine:
+    def raw_connection(self):
+        raise ConnectionError("LISTEN is not supported")
+
+
+def test_postgres_subscription_waits_out_timeout_when_listen_fails(monkeypatch):
+    slept = []
+    monkeypatch.setattr(notify.time, "sleep", slept.append)
+    subscription = PostgresSubscription(_BrokenEngine(), notify.RUNS_CHANNEL)
+    assert subscription.wait(2.5) is False
+    assert subscription.wait(2.5) is False
+    assert slept == [2.5, 2.5]
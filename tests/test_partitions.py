@@ -0,0 +1,31 @@
+import logging
+
+from orchestrator import migrate, worker
+
+
+def test_worker_retries_partition_creation_and_survives_failures(monkeypatch, caplog):
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("permission denied for table runs")
+
+    monkeypatch.setattr(migrate, "ensure_all_partitions", failing)
+    monkeypatch.setattr(worker.settings, "db_partitioned_tables", "runs")
+    monkeypatch.setattr(worker.settings, "db_partition_interval_seconds", 3600)
+    monkeypatch.setattr(worker, "_last_partition_check", float("-inf"))
+    with caplog.at_level(logging.ERROR, logger="wms-orchestrator"):
+        worker.ensure_partitions_if_due()
+        worker.ensure_partitions_if_due()
+    assert len(calls) == 1
+    assert "Creating monthly partitions failed" in caplog.text
+
+    monkeypatch.setattr(worker, "_last_partition_check", float("-inf"))
+    monkeypatch.setattr(worker.settings, "db_partitioned_tables", "")
+    worker.ensure_partitions_if_due()
+    assert len(calls) == 1
+
+
+def test_ensure_all_partitions_is_a_no_op_outside_postgres(monkeypatch):
+    monkeypatch.setattr(migrate.get_settings(), "db_partitioned_tables", "runs")
+    migrate.ensure_all_partitions()
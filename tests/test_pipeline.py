@@ -0,0 +1,57 @@
+from sqlalchemy import select
+
+from orchestrator.db import session_scope
+from orchestrator.models import Run, RunStatus, Stage, Task, TaskStatus
+from orchestrator.pipeline import pass_run
+from orchestrator.worker import process_claimed_run, process_run, settings
+
+
+def _run(session, task_id, stage, status, attempt=1):
+    run = Run(task_id=task_id, stage=stage, status=status, attempt=attempt, max_attempts=3)
+    if status == RunStatus.RUNNING:
+        run.claimed_by = settings.worker_id
+    session.add(run)
+    session.flush()
+    return run.id
+
+
+def test_rework_supersedes_a_sibling_still_reviewing_the_old_plan(new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        session.get(Task, task_id).status = TaskStatus.RUNNING
+        _run(session, task_id, Stage.BACKEND, RunStatus.PASS)
+        _run(session, task_id, Stage.QA_BACKEND, RunStatus.FAIL)
+        stale_security = _run(session, task_id, Stage.SECURITY, RunStatus.RUNNING)
+        # QA_BACKEND failed and reworked BACKEND while SECURITY#1 was still on the first plan.
+        rework = _run(session, task_id, Stage.BACKEND, RunStatus.RUNNING, attempt=2)
+
+    with session_scope() as session:
+        process_run(session, session.get(Run, rework), lambda s, t, r: pass_run(s, r, {"plan": 2}))
+
+    # The worker holding the stale review finishes afterwards; its result is dropped.
+    process_claimed_run(stale_security, lambda s, t, r: pass_run(s, r, {"plan": 1}))
+
+    with session_scope() as session:
+        stale = session.get(Run, stale_security)
+        assert (stale.status, stale.error) == (RunStatus.FAIL, f"Superseded by BACKEND run {rework}")
+        queued = session.scalars(
+            select(Run.stage).where(Run.task_id == task_id, Run.id > rework, Run.status == RunStatus.PENDING)
+        )
+        assert sorted(stage.value for stage in queued) == ["QA_BACKEND", "SECURITY"]
+
+
+def test_runs_enqueued_after_the_parent_are_left_alone(new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        session.get(Task, task_id).status = TaskStatus.RUNNING
+        _run(session, task_id, Stage.QA_BACKEND, RunStatus.PASS)
+        backend = _run(session, task_id, Stage.BACKEND, RunStatus.RUNNING)
+        security = _run(session, task_id, Stage.SECURITY, RunStatus.PENDING)
+
+    with session_scope() as session:
+        process_run(session, session.get(Run, backend), lambda s, t, r: pass_run(s, r, {}))
+
+    with session_scope() as session:
+        assert session.get(Run, security).status == RunStatus.PENDING
+        stages = session.scalars(select(Run.stage).where(Run.task_id == task_id, Run.id > security))
+        assert [stage.value for stage in stages] == ["QA_BACKEND"]
@@ -0,0 +1,87 @@
+"""Postgres compatibility. Statement compilation is checked offline; the round trip needs
+TEST_POSTGRES_URL (a psycopg2 URL) and migrates a throwaway schema it drops afterwards."""
+import asyncio
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from orchestrator import migrate
+from orchestrator.models import Decision, DecisionKind, DecisionValue, Run, RunStatus, Stage, Task, TaskStatus
+from orchestrator.pipeline import create_tasks
+from orchestrator.schemas import TaskCreate
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+STATUS_COLUMN_TYPE = text(
+    "SELECT data_type FROM information_schema.columns "
+    "WHERE table_schema = :schema AND table_name = 'tasks' AND column_name = 'status'"
+)
+
+needs_postgres = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture
+def pg_schema():
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(POSTGRES_URL)
+    with admin.begin() as conn:
+        conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    engine = create_engine(POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        migrate.upgrade(engine)
+        yield schema
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA {schema} CASCADE")
+        admin.dispose()
+
+
+@needs_postgres
+def test_asyncpg_reads_and_writes_the_migrated_schema(pg_schema):
+    url = make_url(POSTGRES_URL).set(drivername="postgresql+asyncpg")
+
+    async def scenario():
+        engine = create_async_engine(url, connect_args={"server_settings": {"search_path": pg_schema}})
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        try:
+            async with sessions() as session, session.begin():
+                [(task_id, created)] = await session.run_sync(
+                    create_tasks, [TaskCreate(title="Stock levels", raw_request="Expose stock levels")], 3
+                )
+                session.add(
+                    Decision(task_id=task_id, kind=DecisionKind.HUMAN_APPROVAL, decision=DecisionValue.APPROVE)
+                )
+            async with sessions() as session:
+                pending = await session.scalar(
+                    select(func.count()).select_from(Task).where(Task.status == TaskStatus.PENDING)
+                )
+                run = await session.scalar(
+                    select(Run).where(Run.stage == Stage.PRODUCT, Run.status == RunStatus.PENDING)
+                )
+                decision = await session.scalar(select(Decision.decision).where(Decision.task_id == task_id))
+                column_type = await session.scalar(STATUS_COLUMN_TYPE, {"schema": pg_schema})
+            return created, pending, run.task_id == task_id, decision, column_type
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == (True, 1, True, DecisionValue.APPROVE, "character varying")
+
+
+@pytest.mark.parametrize(
+    "stmt",
+    [
+        select(Task.id).where(Task.status == TaskStatus.PENDING),
+        select(Run.id).where(Run.stage == Stage.BACKEND, Run.status.in_([RunStatus.PENDING, RunStatus.RUNNING])),
+        insert(Task).values(title="t", raw_request="r", status=TaskStatus.PENDING),
+        insert(Decision).values(task_id=1, kind=DecisionKind.HUMAN_APPROVAL, decision=DecisionValue.REJECT),
+    ],
+)
+def test_asyncpg_binds_enums_as_plain_strings(stmt):
+    compiled = str(stmt.compile(dialect=asyncpg.dialect()))
+    for type_name in ("taskstatus", "runstatus", "stage", "decisionkind", "decisionvalue"):
+        assert f"::{type_name}" not in compiled
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from orchestrator import async_worker, worker
+from orchestrator.db import session_scope
+from orchestrator.main import app
+from orchestrator.models import Run, RunOutputChunk, RunStatus, Stage
+from orchestrator.streaming import RunOutputWriter
+
+
+@pytest.fixture
+def small_flushes(monkeypatch):
+    from orchestrator import streaming
+
+    monkeypatch.setattr(streaming.get_settings(), "llm_stream_flush_bytes", 64)
+
+
+def add_run(task_id: int, stage: Stage, status: RunStatus = RunStatus.RUNNING) -> int:
+    with session_scope() as session:
+        run = Run(
+            task_id=task_id,
+            stage=stage,
+            status=status,
+            attempt=1,
+            max_attempts=3,
+            claimed_by=worker.settings.worker_id,
+            claimed_at=datetime.utcnow(),
+        )
+        session.add(run)
+        session.flush()
+        return run.id
+
+
+def chunk_seqs(run_id: int):
+    with session_scope() as session:
+        stmt = select(RunOutputChunk.seq).where(RunOutputChunk.run_id == run_id).order_by(RunOutputChunk.seq)
+        return list(session.scalars(stmt))
+
+
+def test_streaming_stage_runs_on_the_async_path(new_task, monkeypatch, small_flushes):
+    def sync_stream(*args, **kwargs):
+        raise AssertionError("streamed inside process_claimed_run")
+
+    monkeypatch.setattr(worker.llm, "stream_call", sync_stream)
+    run_id = add_run(new_task(), Stage.BACKEND)
+    asyncio.run(async_worker.process_run_async(run_id, github=None))
+
+    with session_scope() as session:
+        assert session.get(Run, run_id).status == RunStatus.PASS
+    seqs = chunk_seqs(run_id)
+    assert len(seqs) > 1 and seqs == list(range(len(seqs)))
+
+
+def test_restarted_output_is_numbered_past_the_previous_attempt(new_task, small_flushes):
+    run_id = add_run(new_task(), Stage.DOCS)
+    first = RunOutputWriter(run_id)
+    for _ in range(3):
+        first.write("a" * 64)
+    assert chunk_seqs(run_id) == [0, 1, 2]
+
+    second = RunOutputWriter(run_id)
+    second.write("b" * 64)
+    second.close()
+    assert chunk_seqs(run_id) == [4]
+
+
+def test_resuming_sse_reader_is_told_about_a_restart(new_task, small_flushes):
+    task_id = new_task()
+    run_id = add_run(task_id, Stage.DOCS)
+    first = RunOutputWriter(run_id)
+    first.write("a" * 64)
+    first.write("a" * 64)
+    second = RunOutputWriter(run_id)
+    second.write("b" * 64)
+    with session_scope() as session:
+        session.get(Run, run_id).status = RunStatus.PASS
+
+    with TestClient(app) as client:
+        resumed = client.get(f"/tasks/{task_id}/runs/{run_id}/stream", headers={"Last-Event-ID": "1"}).text
+        fresh = client.get(f"/tasks/{task_id}/runs/{run_id}/stream").text
+    assert resumed.index("event: reset") < resumed.index("id: 3\n")
+    assert "event: reset" not in fresh and "id: 3\n" in fresh
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from orchestrator.db import session_scope
+from orchestrator.main import app
+from orchestrator.models import Run
+
+
+def test_kick_bumps_the_task_version_and_etag(new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        run = session.scalars(select(Run).where(Run.task_id == task_id)).one()
+        run.not_before = datetime.utcnow() + timedelta(minutes=10)
+    with TestClient(app) as client:
+        before = client.get(f"/tasks/{task_id}")
+        etag = before.headers["ETag"]
+        assert client.post(f"/tasks/{task_id}/kick").json()["rescheduled_runs"] == 1
+        after = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+        assert after.status_code == 200
+        assert after.json()["version"] == before.json()["version"] + 1
+        # Nothing left to reschedule: the version stays put.
+        assert client.post(f"/tasks/{task_id}/kick").json()["rescheduled_runs"] == 0
+        assert client.get(f"/tasks/{task_id}", headers={"If-None-Match": after.headers["ETag"]}).status_code == 304
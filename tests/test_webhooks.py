@@ -0,0 +1,121 @@
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from orchestrator.ci_gate import CI_FAILED, CI_GREEN, CI_PENDING, recorded_state
+from orchestrator.db import session_scope
+from orchestrator.main import app
+from orchestrator.models import PullRequestStatus, Run, RunStatus, Stage, Task
+
+FIXTURES = Path(__file__).parent / "fixtures" / "github"
+SECRET = "test-secret"
+PR = 42
+
+
+def recorded(name: str) -> bytes:
+    return (FIXTURES / f"{name}.json").read_bytes()
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def deliver(client: TestClient, event: str, body: bytes):
+    return client.post(
+        "/webhooks/github",
+        content=body,
+        headers={"X-GitHub-Event": event, "X-Hub-Signature-256": sign(body), "Content-Type": "application/json"},
+    )
+
+
+def pr_state() -> str:
+    with session_scope() as session:
+        return recorded_state(session.get(PullRequestStatus, PR))
+
+
+def test_rejects_missing_or_wrong_signature(client):
+    body = recorded("check_suite_actions_success")
+    headers = {"X-GitHub-Event": "check_suite"}
+    assert client.post("/webhooks/github", content=body, headers=headers).status_code == 401
+    headers["X-Hub-Signature-256"] = sign(body, "not-the-secret")
+    assert client.post("/webhooks/github", content=body, headers=headers).status_code == 401
+    headers["X-Hub-Signature-256"] = sign(body + b" ")
+    assert client.post("/webhooks/github", content=body, headers=headers).status_code == 401
+
+
+def test_ping_and_unknown_events(client):
+    assert deliver(client, "ping", b'{"zen": "Keep it logically awesome."}').json() == {"status": "pong"}
+    assert deliver(client, "issues", b"{}").json() == {"status": "ignored"}
+
+
+def test_one_green_suite_does_not_pass_while_another_is_queued(client):
+    deliver(client, "check_suite", recorded("check_suite_actions_requested"))
+    deliver(client, "check_suite", recorded("check_suite_ci_requested"))
+    assert pr_state() == CI_PENDING
+    deliver(client, "check_suite", recorded("check_suite_actions_success"))
+    assert pr_state() == CI_PENDING
+    deliver(client, "check_suite", recorded("check_suite_ci_success"))
+    assert pr_state() == CI_GREEN
+
+
+def test_a_failed_suite_fails_the_pr_even_if_a_later_suite_succeeds(client):
+    deliver(client, "check_suite", recorded("check_suite_ci_failure"))
+    deliver(client, "check_suite", recorded("check_suite_actions_success"))
+    assert pr_state() == CI_FAILED
+
+
+def test_new_head_commit_resets_suites(client):
+    deliver(client, "check_suite", recorded("check_suite_ci_failure"))
+    payload = json.loads(recorded("check_suite_actions_success"))
+    payload["check_suite"]["head_sha"] = "1" * 40
+    deliver(client, "check_suite", json.dumps(payload).encode())
+    with session_scope() as session:
+        status = session.get(PullRequestStatus, PR)
+        assert status.head_sha == "1" * 40
+        assert set(status.check_suites) == {"15368"}
+    assert pr_state() == CI_GREEN
+
+
+def test_pull_request_mergeable_state_is_recorded(client):
+    response = deliver(client, "pull_request", recorded("pull_request_synchronize"))
+    assert response.json() == {"status": "recorded", "woken_runs": []}
+    assert pr_state() == CI_GREEN
+
+
+def test_malformed_payloads_are_recorded_as_nothing(client):
+    assert deliver(client, "check_suite", b'{"check_suite": {"pull_requests": [{}]}}').status_code == 200
+    assert deliver(client, "pull_request", b'{"pull_request": {}}').status_code == 200
+    assert deliver(client, "check_suite", b"not json").status_code == 400
+
+
+def test_settled_checks_wake_the_ci_wait_run(client, new_task):
+    task_id = new_task()
+    with session_scope() as session:
+        session.get(Task, task_id).pr_number = PR
+        run = Run(
+            task_id=task_id,
+            stage=Stage.CI_WAIT,
+            status=RunStatus.PENDING,
+            attempt=1,
+            max_attempts=3,
+            not_before=datetime.utcnow() + timedelta(minutes=5),
+        )
+        session.add(run)
+        session.flush()
+        run_id = run.id
+    deliver(client, "check_suite", recorded("check_suite_actions_success"))
+    response = deliver(client, "check_suite", recorded("check_suite_ci_success"))
+    assert run_id in response.json()["woken_runs"]
+    with session_scope() as session:
+        assert session.get(Run, run_id).not_before is None